@@ -0,0 +1,81 @@
+"""
+Benchmark di BatchPongEnv rispetto alla fisica scalare PongCore.
+Verifica anche che, con lo stesso seed, l'ambiente vettorizzato con una sola partita
+produca esattamente le stesse osservazioni e ricompense di PongCore.
+
+Uso: python benchmarks/bench_batch_env.py [num_envs] [steps]
+"""
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pong_core import PongCore
+from pong_batch import BatchPongEnv
+
+
+def verifica_equivalenza(steps=20000, seed=0):
+    """
+    Confronta passo per passo PongCore e BatchPongEnv(1) con le stesse azioni casuali.
+    :return: Numero di episodi completati durante il confronto
+    """
+    actions = np.random.default_rng(seed).integers(0, 3, size=(steps, 2))
+
+    random.seed(seed)
+    env = PongCore()
+    batch = BatchPongEnv(1, seed=seed)
+
+    episodes = 0
+    for t in range(steps):
+        obs, rewards, done, _ = env.step(actions[t, 0], actions[t, 1])
+        b_obs, b_rewards, b_done, info = batch.step(actions[t, :1], actions[t, 1:])
+
+        assert np.array_equal(np.asarray(obs, dtype=np.float64), info["terminal_obs"][0]), f"obs diverse al passo {t}"
+        assert tuple(rewards) == tuple(b_rewards[0]), f"ricompense diverse al passo {t}"
+        assert done == b_done[0], f"done diverso al passo {t}"
+
+        if done:
+            assert env.touches == info["touches"][0]
+            episodes += 1
+            obs = env.reset()
+            assert np.array_equal(np.asarray(obs, dtype=np.float64), b_obs[0]), f"reset diverso al passo {t}"
+
+    return episodes
+
+
+def passi_al_secondo_scalare(steps):
+    env = PongCore()
+    actions = np.random.default_rng(1).integers(0, 3, size=(steps, 2)).tolist()
+    start = time.perf_counter()
+    for a1, a2 in actions:
+        _, _, done, _ = env.step(a1, a2)
+        if done:
+            env.reset()
+    return steps / (time.perf_counter() - start)
+
+
+def passi_al_secondo_batch(num_envs, steps):
+    env = BatchPongEnv(num_envs, seed=1)
+    rng = np.random.default_rng(1)
+    actions = rng.integers(0, 3, size=(steps, 2, num_envs))
+    start = time.perf_counter()
+    for t in range(steps):
+        env.step(actions[t, 0], actions[t, 1])
+    return steps * num_envs / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    num_envs = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    episodes = verifica_equivalenza()
+    print(f"[INFO] Equivalenza verificata su {episodes} episodi.")
+
+    scalare = passi_al_secondo_scalare(steps * 20)
+    batch = passi_al_secondo_batch(num_envs, steps)
+    print(f"PongCore:            {scalare:,.0f} passi/s")
+    print(f"BatchPongEnv({num_envs}): {batch:,.0f} passi/s ({batch / scalare:.1f}x)")
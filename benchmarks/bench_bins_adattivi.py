@@ -0,0 +1,129 @@
+"""
+Confronto tra bins uniformi (crea_bins) e bins ai quantili delle visite (bins_adattivi.py) con lo stesso numero
+di bins per dimensione, quindi la stessa memoria delle Q-Table.
+
+Addestra con il loop compilato due Q-Table con bins uniformi, raccoglie l'istogramma delle visite giocando con
+esse (epsilon 0.1) e ne ricava i bordi ai quantili. Da lì prosegue l'addestramento in tre modi: bins uniformi,
+Q-Table migrate sui quantili con ribina e Q-Table ai quantili addestrate da zero con lo stesso numero totale di
+episodi. A ogni livello riporta i tocchi medi per episodio in self-play greedy e le vittorie negli scontri diretti
+greedy tra quantili (migrate) e uniformi. Riporta anche il costo per passo di Discretizer.discretize, di
+IstogrammaVisite.aggiungi e la dimensione delle tabelle del Discretizer.
+
+Uso: python benchmarks/bench_bins_adattivi.py [episodi di valutazione] [max_steps] [frazione uniforme]
+"""
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bins_adattivi import IstogrammaVisite, bins_quantili, ribina
+from compiled_training import JIT_DISPONIBILE, esegui_episodi, seed
+from discretizer import Discretizer, crea_bins, process_observation_player2
+from parallel_training import epsilon_schedule
+from pong_core import N_ACTIONS, PongCore
+
+# Episodi con bins uniformi prima dell'istogramma e livelli successivi (ridotti senza Numba)
+INIZIALI = 20000 if JIT_DISPONIBILE else 500
+LIVELLI = (50000, 100000, 200000) if JIT_DISPONIBILE else (1000, 2000)
+EPISODI_ISTOGRAMMA = 300
+
+
+def tocchi(q, discretizer, episodi, max_steps):
+    # Tocchi medi per episodio in self-play greedy
+    seed(1)
+    _, _, touches, _, _ = esegui_episodi(q[0], q[1], np.zeros(episodi), 0.0, 0.0, discretizer, training=False,
+                                         max_steps=max_steps)
+    return touches.mean()
+
+
+def gioca(q1, d1, q2, d2, episodi, max_steps, epsilon=0.0, istogramma=None):
+    """
+    Episodi tra due coppie (Q-Table, Discretizer) anche con bordi diversi.
+    :return: Percentuale di vittorie del Player 1 e del Player 2
+    """
+    env = PongCore(max_steps, seed=1)
+    rng = random.Random(1)
+    vittorie = np.zeros(2)
+    for _ in range(episodi):
+        obs = env.reset()
+        done = False
+        ricompense = np.zeros(2)
+        while not done:
+            if istogramma is not None:
+                istogramma.aggiungi(obs)
+            action1 = rng.randrange(N_ACTIONS) if rng.random() < epsilon else int(np.argmax(q1[d1.discretize(obs)]))
+            action2 = rng.randrange(N_ACTIONS) if rng.random() < epsilon else \
+                int(np.argmax(q2[d2.discretize(process_observation_player2(obs))]))
+            obs, rewards, done, _ = env.step(action1, action2)
+            ricompense += rewards
+        if not env.truncated:
+            vittorie[0 if ricompense[0] > ricompense[1] else 1] += 1
+    return vittorie / episodi * 100
+
+
+def costo(funzione, stati):
+    start = time.perf_counter()
+    for stato in stati:
+        funzione(stato)
+    return (time.perf_counter() - start) / len(stati) * 1e9
+
+
+if __name__ == "__main__":
+    episodi = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    max_steps = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    uniforme = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+
+    uniformi = Discretizer(crea_bins(10))
+    rng = np.random.default_rng(0)
+    epsilons = epsilon_schedule(LIVELLI[-1], True)
+    q_uniformi = [rng.uniform(-1, 1, (uniformi.n_states, N_ACTIONS)) for _ in range(2)]
+
+    # Compilazione esclusa dalle misure
+    esegui_episodi(q_uniformi[0].copy(), q_uniformi[1].copy(), np.zeros(1), 0.0, 0.0, uniformi, training=False)
+    seed(0)
+    esegui_episodi(*q_uniformi, epsilons[:INIZIALI], 0.1, 0.99, uniformi, max_steps=max_steps)
+
+    istogramma = IstogrammaVisite()
+    gioca(*[x for coppia in zip(q_uniformi, (uniformi,) * 2) for x in coppia], EPISODI_ISTOGRAMMA, max_steps,
+          epsilon=0.1, istogramma=istogramma)
+    quantili = Discretizer(bins_quantili(istogramma, 10, uniforme))
+    print(f"[INFO] Istogramma di {istogramma.totale} osservazioni dopo {INIZIALI} episodi con bins uniformi")
+    for nome, bordi in zip(("ball_dx", "ball_dy"), quantili.bins[4:]):
+        print(f"    {nome}: {' '.join(f'{b:g}' for b in bordi)}")
+
+    stati = [tuple(s) for s in
+             rng.uniform([0, 0, 0, 0, -15, -15], [600, 600, 800, 600, 15, 15], (200000, 6)).tolist()]
+    for nome, discretizer in (("uniformi", uniformi), ("quantili", quantili)):
+        print(f"    discretize {nome:<9} {costo(discretizer.discretize, stati):6.0f} ns per stato, "
+              f"tabelle {sum(len(t) for t in discretizer._thr)} celle, Q-Table "
+              f"{discretizer.n_states * N_ACTIONS * 8 / 2 ** 20:.0f} MB")
+    print(f"    IstogrammaVisite.aggiungi {costo(IstogrammaVisite().aggiungi, stati):6.0f} ns per stato")
+
+    tabelle = {
+        "uniformi": (q_uniformi, uniformi),
+        "migrate": ([ribina(q, uniformi.bins, quantili.bins) for q in q_uniformi], quantili),
+        "quantili": ([rng.uniform(-1, 1, (quantili.n_states, N_ACTIONS)) for _ in range(2)], quantili),
+    }
+    # Le tabelle ai quantili da zero recuperano gli episodi iniziali
+    seed(0)
+    esegui_episodi(*tabelle["quantili"][0], epsilons[:INIZIALI], 0.1, 0.99, quantili, max_steps=max_steps)
+
+    addestrati = INIZIALI
+    for livello in LIVELLI:
+        for q, discretizer in tabelle.values():
+            seed(0)
+            esegui_episodi(*q, epsilons[addestrati:livello], 0.1, 0.99, discretizer, max_steps=max_steps)
+        addestrati = livello
+
+        print(f"[INFO] Dopo {livello} episodi di addestramento:")
+        for nome, (q, discretizer) in tabelle.items():
+            print(f"    {nome:<9} self-play greedy: {tocchi(q, discretizer, episodi, max_steps):6.2f} tocchi per "
+                  f"episodio")
+        (q_u, d_u), (q_m, d_m) = tabelle["uniformi"], tabelle["migrate"]
+        p1, _ = gioca(q_m[0], d_m, q_u[1], d_u, episodi, max_steps)
+        _, p2 = gioca(q_u[0], d_u, q_m[1], d_m, episodi, max_steps)
+        print(f"    scontri diretti: migrate vince il {p1:.1f}% come Player 1 e il {p2:.1f}% come Player 2")
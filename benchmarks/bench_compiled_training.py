@@ -0,0 +1,99 @@
+"""
+Benchmark del loop di episodi compilato (compiled_training.esegui_episodi) rispetto al loop Python di modello
+(PongCore + Discretizer + QTable). Riporta i passi al secondo per core, esclusa la compilazione.
+Con NUMBA_DISABLE_JIT=1 misura il fallback in Python puro e verifica che, a parità di seed,
+produca le stesse Q-Table del loop di modello.
+
+Uso: python benchmarks/bench_compiled_training.py [episodi]
+"""
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from compiled_training import JIT_DISPONIBILE, esegui_episodi, seed
+from discretizer import Discretizer, crea_bins, process_observation_player1, process_observation_player2
+from parallel_training import epsilon_schedule
+from pong_core import PongCore, N_ACTIONS
+from qtable import QTable
+
+
+def loop_python(q_table_player1, q_table_player2, epsilons, alpha, gamma, discretizer):
+    """
+    Loop di addestramento di modello, senza grafici e salvataggi.
+    :return: Numero di passi giocati
+    """
+    env = PongCore()
+    q_player1 = QTable(q_table_player1)
+    q_player2 = QTable(q_table_player2)
+    steps = 0
+    for epsilon in epsilons:
+        obs = env.reset()
+        discrete_state1 = discretizer.discretize(process_observation_player1(obs))
+        discrete_state2 = discretizer.discretize(process_observation_player2(obs))
+        done = False
+        while not done:
+            if random.uniform(0, 1) < epsilon:
+                action1 = random.randrange(N_ACTIONS)
+            else:
+                action1 = q_player1.greedy_action(discrete_state1)
+            if random.uniform(0, 1) < epsilon:
+                action2 = random.randrange(N_ACTIONS)
+            else:
+                action2 = q_player2.greedy_action(discrete_state2)
+
+            next_obs, (reward_player1, reward_player2), done, _ = env.step(action1, action2)
+            discrete_next_state1 = discretizer.discretize(process_observation_player1(next_obs))
+            discrete_next_state2 = discretizer.discretize(process_observation_player2(next_obs))
+            q_player1.update(discrete_state1, action1, reward_player1, discrete_next_state1, alpha, gamma, done)
+            q_player2.update(discrete_state2, action2, reward_player2, discrete_next_state2, alpha, gamma, done)
+            discrete_state1 = discrete_next_state1
+            discrete_state2 = discrete_next_state2
+            steps += 1
+    return steps
+
+
+def tabelle_iniziali(seed_tabelle=7):
+    rng = np.random.default_rng(seed_tabelle)
+    return rng.uniform(-1, 1, (10 ** 6, N_ACTIONS)), rng.uniform(-1, 1, (10 ** 6, N_ACTIONS))
+
+
+if __name__ == "__main__":
+    episodes = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    discretizer = Discretizer(crea_bins(10))
+    epsilons = epsilon_schedule(episodes, True)
+
+    q1, q2 = tabelle_iniziali()
+    random.seed(0)
+    start = time.perf_counter()
+    steps = loop_python(q1, q2, epsilons, 0.1, 0.99, discretizer)
+    python = steps / (time.perf_counter() - start)
+    print(f"{'loop Python (modello)':<26} {python:>14,.0f} passi/s")
+
+    if not JIT_DISPONIBILE or os.environ.get("NUMBA_DISABLE_JIT") == "1":
+        # Fallback: stessa sequenza di numeri casuali, quindi stesse Q-Table
+        r1, r2 = tabelle_iniziali()
+        random.seed(0)
+        PongCore()  # Il loop Python consuma un reset alla creazione dell'ambiente
+        start = time.perf_counter()
+        lengths = esegui_episodi(r1, r2, epsilons, 0.1, 0.99, discretizer)[3]
+        fallback = lengths.sum() / (time.perf_counter() - start)
+        assert np.array_equal(q1, r1) and np.array_equal(q2, r2), "Q-Table diverse dal loop di modello"
+        print(f"{'fallback Python puro':<26} {fallback:>14,.0f} passi/s ({fallback / python:.1f}x, Q-Table identiche)")
+    else:
+        r1, r2 = tabelle_iniziali()
+        start = time.perf_counter()
+        esegui_episodi(r1, r2, epsilons[:1], 0.1, 0.99, discretizer)
+        print(f"[INFO] Compilazione (o caricamento dalla cache): {time.perf_counter() - start:.1f} s")
+
+        seed(0)
+        n = episodes * 100
+        epsilons = epsilon_schedule(n, True)
+        start = time.perf_counter()
+        lengths = esegui_episodi(r1, r2, epsilons, 0.1, 0.99, discretizer)[3]
+        jit = lengths.sum() / (time.perf_counter() - start)
+        print(f"{'loop compilato (Numba)':<26} {jit:>14,.0f} passi/s ({jit / python:.0f}x, {n} episodi)")
@@ -0,0 +1,76 @@
+"""
+Confronto tra l'addestramento con due Q-Table (una per player) e con una sola Q-Table condivisa (shared_q),
+con il loop compilato di compiled_training e lo stesso numero di episodi simulati.
+
+A diversi livelli di addestramento riporta per ogni modalità i tocchi medi per episodio in self-play greedy
+(scambi più lunghi = agenti migliori) e la percentuale di vittorie negli scontri diretti greedy tra le due
+modalità, su entrambi i lati del campo. Riporta anche memoria e tempo di addestramento per episodio.
+
+Uso: python benchmarks/bench_condivisa.py [episodi di valutazione] [max_steps]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from compiled_training import JIT_DISPONIBILE, esegui_episodi, seed
+from discretizer import Discretizer, crea_bins
+from parallel_training import epsilon_schedule
+from pong_core import N_ACTIONS
+
+# Livelli di addestramento in episodi (ridotti senza Numba)
+LIVELLI = (2000, 5000, 10000, 20000, 50000, 100000) if JIT_DISPONIBILE else (200, 500, 1000)
+
+
+def greedy(q1, q2, discretizer, episodi, max_steps):
+    """
+    :return: (vittorie P1 %, vittorie P2 %, tocchi medi per episodio)
+    """
+    seed(1)
+    rewards1, rewards2, touches, _, truncated = esegui_episodi(q1, q2, np.zeros(episodi), 0.0, 0.0, discretizer,
+                                                               training=False, max_steps=max_steps)
+    vittorie1 = np.sum((rewards1 > rewards2) & ~truncated)
+    vittorie2 = np.sum(~truncated) - vittorie1
+    return vittorie1 / episodi * 100, vittorie2 / episodi * 100, touches.mean()
+
+
+if __name__ == "__main__":
+    episodi = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    max_steps = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+
+    discretizer = Discretizer(crea_bins(10))
+    rng = np.random.default_rng(0)
+    iniziale = rng.uniform(-1, 1, (2, discretizer.n_states, N_ACTIONS))
+    epsilons = epsilon_schedule(LIVELLI[-1], True)
+
+    # Due tabelle: una per player; condivisa: la stessa tabella passata come Player 1 e Player 2
+    separate = (iniziale[0].copy(), iniziale[1].copy())
+    condivisa = iniziale[0].copy()
+    tabelle = {"due tabelle": separate, "condivisa": (condivisa, condivisa)}
+    print(f"[INFO] Memoria: due tabelle {sum(q.nbytes for q in separate) / 2 ** 20:.0f} MB, "
+          f"condivisa {condivisa.nbytes / 2 ** 20:.0f} MB")
+
+    # Compilazione esclusa dalle misure
+    esegui_episodi(iniziale[0].copy(), iniziale[1].copy(), np.zeros(1), 0.0, 0.0, discretizer, training=False)
+
+    durate = dict.fromkeys(tabelle, 0.0)
+    addestrati = 0
+    for livello in LIVELLI:
+        for nome, (q1, q2) in tabelle.items():
+            seed(0)
+            start = time.perf_counter()
+            esegui_episodi(q1, q2, epsilons[addestrati:livello], 0.1, 0.99, discretizer, max_steps=max_steps)
+            durate[nome] += time.perf_counter() - start
+        addestrati = livello
+
+        print(f"[INFO] Dopo {livello} episodi di addestramento:")
+        for nome, (q1, q2) in tabelle.items():
+            _, _, tocchi = greedy(q1, q2, discretizer, episodi, max_steps)
+            print(f"    {nome:<12} self-play greedy: {tocchi:6.2f} tocchi per episodio, "
+                  f"{durate[nome] / livello * 1e6:7.1f} us per episodio di addestramento")
+        p1, _, _ = greedy(condivisa, separate[1], discretizer, episodi, max_steps)
+        _, p2, _ = greedy(separate[0], condivisa, discretizer, episodi, max_steps)
+        print(f"    scontri diretti: condivisa vince il {p1:.1f}% come Player 1 e il {p2:.1f}% come Player 2")
@@ -0,0 +1,71 @@
+"""
+Benchmark del Discretizer a tabelle precalcolate rispetto a discretize_state (np.digitize).
+Verifica anche che i due producano lo stesso stato su osservazioni reali e sui bordi dei bins.
+
+Uso: python benchmarks/bench_discretizer.py [passi]
+"""
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from discretizer import Discretizer, crea_bins, discretize_state, process_observation_player2
+from pong_core import PongCore
+
+
+def raccogli_osservazioni(steps, seed=0):
+    random.seed(seed)
+    env = PongCore()
+    observations = []
+    for _ in range(steps):
+        obs, _, done, _ = env.step(random.randrange(3), random.randrange(3))
+        observations.append(obs)
+        observations.append(process_observation_player2(obs))
+        if done:
+            env.reset()
+    return observations
+
+
+def verifica_equivalenza(discretizer, bins, observations):
+    # Aggiunge i bordi esatti e i valori immediatamente adiacenti
+    edges = np.array([[b[i] for b in bins] for i in range(len(bins[0]))])
+    extra = np.vstack([edges, np.nextafter(edges, -np.inf), np.nextafter(edges, np.inf)])
+    states = list(observations) + [tuple(row) for row in extra]
+
+    expected = np.array([np.ravel_multi_index(discretize_state(s, bins), discretizer.shape) for s in states])
+    assert all(discretizer.discretize(s) == e for s, e in zip(states, expected)), "discretize diverso"
+    assert np.array_equal(discretizer.discretize_batch(np.array(states, dtype=np.float64)), expected), \
+        "discretize_batch diverso"
+
+
+if __name__ == "__main__":
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    observations = raccogli_osservazioni(steps)
+
+    for discrete_bins in (10, 20, 30):
+        bins = crea_bins(discrete_bins)
+        discretizer = Discretizer(bins)
+        verifica_equivalenza(discretizer, bins, observations[:20000])
+
+        start = time.perf_counter()
+        for obs in observations:
+            discretize_state(obs, bins)
+        digitize = len(observations) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for obs in observations:
+            discretizer.discretize(obs)
+        scalare = len(observations) / (time.perf_counter() - start)
+
+        array = np.array(observations, dtype=np.float64)
+        start = time.perf_counter()
+        discretizer.discretize_batch(array)
+        batch = len(observations) / (time.perf_counter() - start)
+
+        print(f"bins={discrete_bins:>2}  np.digitize: {digitize:>12,.0f} stati/s  "
+              f"Discretizer: {scalare:>12,.0f} stati/s ({scalare / digitize:.1f}x)  "
+              f"batch: {batch:>14,.0f} stati/s ({batch / digitize:.0f}x)")
@@ -0,0 +1,121 @@
+"""
+Benchmark della simulazione a eventi (pong_eventi) rispetto al loop compilato per frame (compiled_training),
+per la valutazione greedy di agenti a diversi livelli di addestramento.
+
+Per ogni livello riporta episodi e frame al secondo dei due simulatori, gli eventi simulati per episodio e la
+concordanza con PongCore: su un sottoinsieme di episodi con le stesse velocità iniziali confronta ricompense,
+tocchi, passi e troncamenti episodio per episodio. Controlla anche le previsioni di intercetta (frame e
+ball_y all'arrivo nella zona dei paddle) contro la traiettoria di PongCore.
+
+Uso: python benchmarks/bench_eventi.py [episodi di valutazione] [episodi di confronto] [max_steps] [frame_skip]
+"""
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from compiled_training import JIT_DISPONIBILE, esegui_episodi, seed
+from discretizer import Discretizer, crea_bins, process_observation_player1, process_observation_player2
+from parallel_training import epsilon_schedule
+from pong_core import N_ACTIONS, PongCore
+from pong_eventi import esegui_episodi_eventi, intercetta, velocita_iniziali
+
+# Episodi di addestramento per livello (ridotti senza Numba)
+LIVELLI = (0, 20000, 200000) if JIT_DISPONIBILE else (0, 500, 2000)
+
+
+def riferimento(q1, q2, discretizer, velocita_x, velocita_y, max_steps, frame_skip):
+    """
+    Episodi greedy con PongCore e le velocità iniziali indicate; verifica anche intercetta a ogni cambio di
+    direzione orizzontale della palla.
+    :return: (risultati (5, episodi), previsioni corrette, previsioni)
+    """
+    env = PongCore(max_steps, frame_skip)
+    risultati = np.zeros((5, len(velocita_x)), dtype=np.int64)
+    corrette = previsioni = 0
+    for episode, (dx, dy) in enumerate(zip(velocita_x, velocita_y)):
+        env.reset()
+        env.ball_dx, env.ball_dy = int(dx), int(dy)
+        obs = env._get_obs()
+        previsione = None
+        done = False
+        while not done:
+            if previsione is None or np.sign(previsione[2]) != np.sign(env.ball_dx):
+                frames, arrivo, _ = intercetta(float(env.ball_x), float(env.ball_y), float(env.ball_dx),
+                                               float(env.ball_dy))
+                previsione = (env.steps + frames, arrivo, env.ball_dx)
+            action1 = int(np.argmax(q1[discretizer.discretize(process_observation_player1(obs))]))
+            action2 = int(np.argmax(q2[discretizer.discretize(process_observation_player2(obs))]))
+            for _ in range(frame_skip):
+                if done:
+                    break
+                # Un frame alla volta per controllare la previsione all'arrivo
+                reward1, reward2 = env._frame(action1, action2)
+                done = env.done
+                risultati[0, episode] += reward1
+                risultati[1, episode] += reward2
+                if env.steps == previsione[0] and np.sign(env.ball_dx) == np.sign(previsione[2]):
+                    previsioni += 1
+                    corrette += abs(env.ball_y - previsione[1]) < 1e-6
+            obs = env._get_obs()
+            risultati[3, episode] += 1
+        risultati[2, episode] = env.touches
+        risultati[4, episode] = env.truncated
+    return risultati, corrette, previsioni
+
+
+if __name__ == "__main__":
+    episodes = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    confronto = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    max_steps = int(sys.argv[3]) if len(sys.argv) > 3 else 5000
+    frame_skip = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+
+    discretizer = Discretizer(crea_bins(10))
+    rng = np.random.default_rng(0)
+    q1 = rng.uniform(-1, 1, (discretizer.n_states, N_ACTIONS))
+    q2 = rng.uniform(-1, 1, (discretizer.n_states, N_ACTIONS))
+
+    # Compilazione esclusa dalle misure
+    esegui_episodi(q1, q2, np.zeros(1), 0.0, 0.0, discretizer, training=False, frame_skip=frame_skip)
+    esegui_episodi_eventi(q1, q2, discretizer, 1, frame_skip=frame_skip)
+
+    addestrati = 0
+    for livello in LIVELLI:
+        seed(0)
+        if livello > addestrati:
+            esegui_episodi(q1, q2, epsilon_schedule(livello, True)[addestrati:], 0.1, 0.99, discretizer,
+                           max_steps=max_steps, frame_skip=frame_skip)
+            addestrati = livello
+        print(f"[INFO] Agenti dopo {livello} episodi di addestramento:")
+
+        seed(1)
+        start = time.perf_counter()
+        _, _, _, lengths, _ = esegui_episodi(q1, q2, np.zeros(episodes), 0.0, 0.0, discretizer, training=False,
+                                             max_steps=max_steps, frame_skip=frame_skip)
+        durata_frame = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, _, _, lengths_eventi, _, eventi = esegui_episodi_eventi(q1, q2, discretizer, episodes, max_steps,
+                                                                   frame_skip, seed_eventi=1, conta_eventi=True)
+        durata_eventi = time.perf_counter() - start
+
+        for nome, durata, decisioni in (("per frame", durata_frame, lengths),
+                                        ("a eventi", durata_eventi, lengths_eventi)):
+            print(f"    {nome:<10} {episodes / durata:>11,.0f} episodi/s, "
+                  f"{decisioni.sum() * frame_skip / durata:>13,.0f} frame/s (circa), "
+                  f"{decisioni.mean() * frame_skip:>8.1f} frame/episodio")
+        print(f"    eventi per episodio {eventi.mean():.1f} "
+              f"({lengths_eventi.sum() * frame_skip / eventi.sum():.1f} frame per evento), "
+              f"{durata_frame / durata_eventi:.1f}x")
+
+        velocita = velocita_iniziali(confronto, np.random.default_rng(2))
+        atteso, corrette, previsioni = riferimento(q1, q2, discretizer, *velocita, max_steps, frame_skip)
+        ottenuto = np.array(esegui_episodi_eventi(q1, q2, discretizer, max_steps=max_steps, frame_skip=frame_skip,
+                                                  velocita=velocita))
+        uguali = np.all(atteso == ottenuto, axis=0)
+        print(f"    concordanza con PongCore: {uguali.sum()}/{confronto} episodi identici, "
+              f"intercetta corretta {corrette}/{previsioni}")
@@ -0,0 +1,51 @@
+"""
+Benchmark del frame-skip (ripetizione dell'azione) con il loop compilato: per k = 1, 2, 4 addestra una coppia
+di agenti per lo stesso numero di episodi e riporta decisioni e frame al secondo in addestramento, decisioni
+medie per episodio e tocchi medi in valutazione greedy (con lo stesso frame-skip dell'addestramento).
+
+Uso: python benchmarks/bench_frame_skip.py [episodi di addestramento] [episodi di valutazione]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from compiled_training import esegui_episodi, seed
+from discretizer import Discretizer, crea_bins
+from parallel_training import epsilon_schedule
+from pong_core import N_ACTIONS
+
+MAX_STEPS = 5000
+
+
+if __name__ == "__main__":
+    episodes = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    test_episodes = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+
+    discretizer = Discretizer(crea_bins(10))
+    # Compilazione esclusa dalle misure
+    q = np.zeros((discretizer.n_states, N_ACTIONS))
+    esegui_episodi(q, q.copy(), np.zeros(1), 0.1, 0.99, discretizer, frame_skip=2)
+
+    for frame_skip in (1, 2, 4):
+        rng = np.random.default_rng(0)
+        q1 = rng.uniform(-1, 1, (discretizer.n_states, N_ACTIONS))
+        q2 = rng.uniform(-1, 1, (discretizer.n_states, N_ACTIONS))
+        seed(0)
+
+        start = time.perf_counter()
+        _, _, _, lengths, _ = esegui_episodi(q1, q2, epsilon_schedule(episodes, True), 0.1, 0.99, discretizer,
+                                             max_steps=MAX_STEPS, frame_skip=frame_skip)
+        durata = time.perf_counter() - start
+        decisioni = lengths.sum()
+
+        seed(1)
+        _, _, touches, _, truncated = esegui_episodi(q1, q2, np.zeros(test_episodes), 0.0, 0.0, discretizer,
+                                                     training=False, max_steps=MAX_STEPS, frame_skip=frame_skip)
+        print(f"frame_skip {frame_skip}: {decisioni / durata:>11,.0f} decisioni/s, "
+              f"{decisioni * frame_skip / durata:>11,.0f} frame/s (circa), "
+              f"{decisioni / episodes:>6.1f} decisioni/episodio | "
+              f"valutazione: tocchi medi {touches.mean():.3f}, troncati {truncated.mean():.2%}")
@@ -0,0 +1,61 @@
+"""
+Benchmark delle medie mobili e dei grafici di grafici_utils.
+Confronta la media mobile originale (np.mean su ogni finestra, O(n*w)) con quella a somme cumulative
+e misura la generazione di un grafico delle ricompense per milioni di episodi (backend Agg).
+
+Uso: python benchmarks/bench_grafici.py [episodi]
+"""
+import os
+import sys
+import time
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np
+from matplotlib import pyplot as plt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from grafici_utils import moving_average, sottocampiona
+from metriche import MetricheEpisodi
+
+
+def moving_average_originale(data, window_size):
+    return [np.mean(data[i:i + window_size]) for i in range(len(data) - window_size + 1)]
+
+
+if __name__ == "__main__":
+    episodes = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    rng = np.random.default_rng(0)
+
+    start = time.perf_counter()
+    metriche = MetricheEpisodi(episodes)
+    for r1, r2, t in zip(rng.integers(-5, 4, 200000).tolist(), rng.integers(-5, 4, 200000).tolist(),
+                         rng.integers(0, 10, 200000).tolist()):
+        metriche.aggiungi(r1, r2, t, 0.5)
+    durata = time.perf_counter() - start
+    print(f"[INFO] MetricheEpisodi.aggiungi: {durata / 200000 * 1e9:.0f} ns/episodio, "
+          f"{(metriche._rewards1.nbytes * 3 + metriche._epsilon.nbytes) / 2 ** 20:.1f} MB per {episodes:,} episodi")
+
+    rewards = rng.integers(-5, 4, 120000)
+    start = time.perf_counter()
+    originale = moving_average_originale(rewards, 200)
+    t_originale = time.perf_counter() - start
+    start = time.perf_counter()
+    nuova = moving_average(rewards, 200)
+    t_nuova = time.perf_counter() - start
+    assert np.array_equal(np.asarray(originale), nuova)
+    print(f"[INFO] moving_average 120k episodi, finestra 200: {t_originale * 1000:.0f} ms -> {t_nuova * 1000:.2f} ms "
+          f"(risultati identici)")
+
+    rewards1 = rng.integers(-5, 4, episodes)
+    rewards2 = rng.integers(-5, 4, episodes)
+    start = time.perf_counter()
+    plt.figure(figsize=(10, 5))
+    plt.plot(*sottocampiona(moving_average(rewards1, 200)))
+    plt.plot(*sottocampiona(moving_average(rewards2, 200)))
+    plt.savefig(os.devnull, format="png")
+    plt.close()
+    print(f"[INFO] Grafico delle ricompense per {episodes:,} episodi: {(time.perf_counter() - start) * 1000:.0f} ms")
@@ -0,0 +1,67 @@
+"""
+Benchmark della lunghezza degli episodi e del throughput a diversi livelli di abilità degli agenti, con e senza
+limite di passi per episodio (max_steps). Gli agenti sono addestrati con il loop compilato e valutati in modo greedy.
+
+Per ogni livello riporta la distribuzione dei passi per episodio (p50, p99, p99.9, massimo), episodi e passi al
+secondo, la latenza stimata per episodio in coda alla distribuzione (p99 e massimo, dai passi e dal costo medio
+di un passo) e la frazione di episodi troncati. Senza limite viene comunque usato un tetto di sicurezza
+(SENZA_LIMITE passi) perché due agenti greedy possono palleggiare all'infinito.
+
+Uso: python benchmarks/bench_lunghezza_episodi.py [episodi di valutazione] [max_steps]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from compiled_training import JIT_DISPONIBILE, esegui_episodi, seed
+from discretizer import Discretizer, crea_bins
+from parallel_training import epsilon_schedule
+from pong_core import N_ACTIONS
+
+SENZA_LIMITE = 10 ** 6
+# Episodi di addestramento per livello (ridotti senza Numba)
+LIVELLI = (0, 20000, 200000) if JIT_DISPONIBILE else (0, 500, 2000)
+
+
+def misura(q1, q2, discretizer, episodes, max_steps):
+    seed(1)
+    start = time.perf_counter()
+    _, _, _, lengths, truncated = esegui_episodi(q1, q2, np.zeros(episodes), 0.0, 0.0, discretizer, training=False,
+                                                 max_steps=max_steps)
+    durata = time.perf_counter() - start
+    ns_per_passo = durata * 1e9 / lengths.sum()
+    p50, p99, p999 = np.percentile(lengths, [50, 99, 99.9])
+    print(f"    max_steps {max_steps if max_steps != SENZA_LIMITE else '-':>7}: "
+          f"passi p50 {p50:>6.0f}, p99 {p99:>7.0f}, p99.9 {p999:>7.0f}, max {lengths.max():>7} | "
+          f"{episodes / durata:>9,.0f} episodi/s, {lengths.sum() / durata:>11,.0f} passi/s | "
+          f"latenza p99 {p99 * ns_per_passo / 1e3:>8.1f} us, max {lengths.max() * ns_per_passo / 1e3:>9.1f} us | "
+          f"troncati {truncated.mean():.2%}")
+
+
+if __name__ == "__main__":
+    episodes = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    max_steps = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    discretizer = Discretizer(crea_bins(10))
+    rng = np.random.default_rng(0)
+    q1 = rng.uniform(-1, 1, (discretizer.n_states, N_ACTIONS))
+    q2 = rng.uniform(-1, 1, (discretizer.n_states, N_ACTIONS))
+
+    # Compilazione esclusa dalle misure
+    esegui_episodi(q1.copy(), q2.copy(), np.zeros(1), 0.0, 0.0, discretizer, training=False)
+
+    addestrati = 0
+    for livello in LIVELLI:
+        seed(0)
+        if livello > addestrati:
+            # Addestramento incrementale fino al livello richiesto (con il limite di passi per non bloccarsi)
+            esegui_episodi(q1, q2, epsilon_schedule(livello, True)[addestrati:], 0.1, 0.99, discretizer,
+                           max_steps=max_steps)
+            addestrati = livello
+        print(f"[INFO] Agenti dopo {livello} episodi di addestramento:")
+        misura(q1, q2, discretizer, episodes, SENZA_LIMITE)
+        misura(q1, q2, discretizer, episodes, max_steps)
@@ -0,0 +1,82 @@
+"""
+Benchmark dell'addestramento offline (offline_training.py) rispetto all'addestramento simulato di modello.
+
+Addestra con modello partendo da Q-Table casuali salvate e registrando la traccia, poi:
+- con batch_size=1 e una sola passata ripete offline gli stessi aggiornamenti nello stesso ordine e confronta
+  le Q-Table con quelle di modello (differenze solo per gli stati arrotondati dal punto fisso della traccia);
+- con mini-batch misura le transizioni al secondo per nuovi alpha e gamma, rispetto ai passi al secondo di modello;
+- con gli stessi alpha, gamma e sweeps confronta le Q-Table a mini-batch con quelle a batch 1: i valori devono restare
+  limitati (stesso ordine di grandezza) e vicini, con la stessa azione greedy nella maggior parte degli stati.
+
+Uso: python benchmarks/bench_offline.py [episodi] [sweeps]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from discretizer import crea_bins
+from offline_training import modello_offline
+from pong_core import N_ACTIONS
+from pongAI import modello
+from qtable_storage import carica_npq, salva_npq
+
+
+def tabelle(nomi):
+    return [carica_npq(f"qTable/p{player}/{nome}", mmap_mode=None)[0].values for player, nome in zip((1, 2), nomi)]
+
+
+if __name__ == "__main__":
+    episodes = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    sweeps = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    os.chdir(tempfile.mkdtemp())
+    rng = np.random.default_rng(0)
+    for player in (1, 2):
+        os.makedirs(f"qTable/p{player}")
+        salva_npq(f"qTable/p{player}/iniziale.npq", rng.uniform(-1, 1, (10 ** 6, N_ACTIONS)), crea_bins(10))
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        online = modello(episodes, True, 0.1, 0.99, "iniziale.npq", "iniziale.npq", False, True, plots=False, seed=0,
+                         record_trace="traccia")
+    durata_online = time.perf_counter() - start
+    from tracce import Traccia
+    passi = Traccia("traccia").record - len(Traccia("traccia"))
+    print(f"{'modello (simulazione)':<30} {durata_online:>8.1f} s, {passi / durata_online:>12,.0f} transizioni/s")
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        offline = modello_offline("traccia", 0.1, 0.99, "iniziale.npq", "iniziale.npq", batch_size=1)
+    print(f"{'offline, batch 1, 1 sweep':<30} {time.perf_counter() - start:>8.1f} s")
+    for player, (a, b) in enumerate(zip(tabelle(online), tabelle(offline)), 1):
+        diverse = ~np.isclose(a, b, rtol=0, atol=1e-12)
+        print(f"    Player {player}: {diverse.sum()} valori diversi da modello su {a.size} "
+              f"(differenza massima {np.abs(a - b).max():.3g})")
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        batch = tabelle(modello_offline("traccia", 0.05, 0.95, "iniziale.npq", "iniziale.npq", sweeps=sweeps))
+    durata = time.perf_counter() - start
+    print(f"{f'offline, batch 4096, {sweeps} sweep':<30} {durata:>8.1f} s, "
+          f"{passi * sweeps / durata:>12,.0f} transizioni/s per player "
+          f"({passi * sweeps / durata / (passi / durata_online):.0f}x modello)")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        sequenziale = tabelle(modello_offline("traccia", 0.05, 0.95, "iniziale.npq", "iniziale.npq", sweeps=sweeps,
+                                              batch_size=1))
+    for player, (a, b) in enumerate(zip(sequenziale, batch), 1):
+        # Solo gli stati aggiornati (diversi dalla tabella iniziale in almeno uno dei due modi)
+        iniziale = carica_npq(f"qTable/p{player}/iniziale.npq", mmap_mode=None)[0].values
+        toccati = np.any((a != iniziale) | (b != iniziale), axis=1)
+        limitata = np.abs(b).max() <= 2 * np.abs(a).max() + 1
+        print(f"    Player {player}: max|Q| batch 1 {np.abs(a).max():.2f}, batch 4096 {np.abs(b).max():.2f} "
+              f"({'limitata' if limitata else 'DIVERGENTE'}), differenza media {np.abs(a - b)[toccati].mean():.3f} "
+              f"sugli stati aggiornati, azione greedy uguale nel "
+              f"{np.mean(a[toccati].argmax(axis=1) == b[toccati].argmax(axis=1)):.1%}")
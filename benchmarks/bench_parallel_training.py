@@ -0,0 +1,46 @@
+"""
+Benchmark di scalabilità dell'addestramento parallelo (parallel_training.addestra_parallelo).
+Esegue lo stesso numero di episodi con 1, 2, 4, ... worker fino al numero di core
+e riporta episodi/s e speedup rispetto a un solo worker.
+
+Uso: python benchmarks/bench_parallel_training.py [episodi] [max_worker]
+"""
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from parallel_training import addestra_parallelo
+
+
+def episodi_al_secondo(episodes, n_workers, seed=0):
+    rng = np.random.default_rng(seed)
+    q_table_player1 = rng.uniform(-1, 1, size=(10,) * 6 + (3,))
+    q_table_player2 = rng.uniform(-1, 1, size=(10,) * 6 + (3,))
+
+    start = time.perf_counter()
+    addestra_parallelo(episodes, 0.1, 0.99, q_table_player1, q_table_player2, True, n_workers, seed,
+                       mostra_progresso=False)
+    return episodes / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    episodes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else mp.cpu_count()
+
+    workers = [1]
+    while workers[-1] * 2 <= max_workers:
+        workers.append(workers[-1] * 2)
+    if workers[-1] != max_workers:
+        workers.append(max_workers)
+
+    base = None
+    print(f"{'worker':>6} {'episodi/s':>12} {'speedup':>8} {'efficienza':>10}")
+    for n in workers:
+        eps = episodi_al_secondo(episodes, n)
+        base = base or eps
+        print(f"{n:>6} {eps:>12,.1f} {eps / base:>8.2f} {eps / base / n:>10.2f}")
@@ -0,0 +1,112 @@
+"""
+Benchmark delle politiche precalcolate (politica.py): esportazione di una coppia di Q-Table casuali in .npp,
+verifica delle azioni rispetto a np.argmax(q_table[discretize_state(...)]) come nel test di modello, latenza
+per osservazione in-process (singola e a lotti) e latenza per richiesta dei server binario e HTTP su localhost.
+
+Uso: python benchmarks/bench_politica.py [richieste per misura]
+"""
+import http.client
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from discretizer import crea_bins, discretize_state, process_observation_player2
+from pong_core import N_ACTIONS, SCREEN_HEIGHT, SCREEN_WIDTH
+from qtable_storage import salva_npq
+
+
+def osservazioni_casuali(n, rng):
+    return np.column_stack([rng.integers(0, SCREEN_HEIGHT - 100, (n, 2)), rng.uniform(0, SCREEN_WIDTH, n),
+                            rng.uniform(0, SCREEN_HEIGHT, n), rng.uniform(-15, 15, (n, 2))])
+
+
+def latenza(funzione, numero):
+    # Mediana in microsecondi su numero chiamate
+    tempi = []
+    for _ in range(numero):
+        start = time.perf_counter()
+        funzione()
+        tempi.append(time.perf_counter() - start)
+    return np.median(tempi) * 1e6
+
+
+if __name__ == "__main__":
+    numero = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    os.chdir(tempfile.mkdtemp())
+    rng = np.random.default_rng(0)
+    bins = crea_bins(10)
+    q_tables = {}
+    for player in (1, 2):
+        os.makedirs(f"qTable/p{player}")
+        q_tables[player] = rng.uniform(-1, 1, (10,) * 6 + (N_ACTIONS,))
+        salva_npq(f"qTable/p{player}/p{player}_bench.npq", q_tables[player], bins)
+
+    from politica import ClientPolitica, Politica, crea_server, esporta_politica
+
+    start = time.perf_counter()
+    path = esporta_politica("p1_bench.npq", "p2_bench.npq")
+    print(f"{'esportazione':<32} {time.perf_counter() - start:>10.3f} s, {os.path.getsize(path) / 2 ** 20:.1f} MB")
+
+    politica = Politica(path)
+    osservazioni = osservazioni_casuali(4096, rng)
+    for player in (1, 2):
+        attese = [np.argmax(q_tables[player][discretize_state(obs if player == 1 else
+                                                              process_observation_player2(obs), bins)])
+                  for obs in osservazioni]
+        if not np.array_equal(politica.azioni_batch(osservazioni, player), attese) or \
+                [politica.azione(obs, player) for obs in osservazioni] != attese:
+            raise SystemExit(f"[INFO] Azioni diverse dal test di modello per il Player {player}")
+    print(f"{'verifica':<32} azioni identiche al test di modello su {len(osservazioni)} osservazioni per player")
+    print("-----------------------------------------------")
+
+    obs = tuple(osservazioni[0])
+    q_table = q_tables[1]
+    print(f"{'argmax(q_table[discretize_state])':<32} "
+          f"{timeit.timeit(lambda: np.argmax(q_table[discretize_state(obs, bins)]), number=numero) / numero * 1e6:>10.2f} us")
+    print(f"{'Politica.azione':<32} "
+          f"{timeit.timeit(lambda: politica.azione(obs, 2), number=numero) / numero * 1e6:>10.2f} us")
+    players = rng.integers(1, 3, len(osservazioni))
+    for lotto in (1, 64, 1024):
+        t = timeit.timeit(lambda: politica.azioni_batch(osservazioni[:lotto], players[:lotto]), number=numero // 10)
+        print(f"{f'azioni_batch ({lotto})':<32} {t / (numero // 10) * 1e6:>10.2f} us per lotto, "
+              f"{t / (numero // 10) / lotto * 1e6:.3f} us per osservazione")
+    print("-----------------------------------------------")
+
+    for http_server in (False, True):
+        server = crea_server(path, porta=0, http=http_server)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, porta = server.server_address
+        if http_server:
+            connessione = http.client.HTTPConnection(host, porta)
+            connessione.connect()
+            connessione.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def richiesta(lotto):
+                corpo = json.dumps({"osservazioni": osservazioni[:lotto].tolist(), "player": players[:lotto].tolist()})
+                connessione.request("POST", "/azioni", corpo, {"Content-Type": "application/json"})
+                return json.loads(connessione.getresponse().read())["azioni"]
+        else:
+            client = ClientPolitica(host, porta)
+
+            def richiesta(lotto):
+                return client.azioni(osservazioni[:lotto], players[:lotto])
+
+        if not np.array_equal(richiesta(1024), politica.azioni_batch(osservazioni[:1024], players[:1024])):
+            raise SystemExit("[INFO] Risposta del server diversa da Politica.azioni_batch")
+        for lotto in (1, 64, 1024):
+            mediana = latenza(lambda: richiesta(lotto), numero // 10 if lotto == 1024 else numero)
+            nome = f"server {'HTTP' if http_server else 'binario'} ({lotto})"
+            print(f"{nome:<32} {mediana:>10.1f} us per "
+                  f"richiesta, {mediana / lotto:.3f} us per osservazione")
+        server.shutdown()
+        server.server_close()
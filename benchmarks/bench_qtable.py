@@ -0,0 +1,74 @@
+"""
+Microbenchmark degli aggiornamenti della Q-Table.
+Confronta l'aggiornamento originale di modello (indicizzazione con tuple su un array 10^6 x 3 a 7 dimensioni)
+con QTable: aggiornamento scalare su indici piatti e td_update/greedy_actions vettorizzati, in float64 e float32.
+
+Uso: python benchmarks/bench_qtable.py [transizioni]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qtable import QTable
+
+SHAPE = (10,) * 6
+N_ACTIONS = 3
+
+
+def aggiornamenti_originali(q_table, states, actions, rewards, next_states, alpha=0.1, gamma=0.99):
+    tuples = [tuple(int(i) for i in np.unravel_index(s, SHAPE)) for s in states]
+    next_tuples = [tuple(int(i) for i in np.unravel_index(s, SHAPE)) for s in next_states]
+    start = time.perf_counter()
+    for s, a, r, ns in zip(tuples, actions, rewards, next_tuples):
+        np.argmax(q_table[s])
+        max_future_q = np.max(q_table[ns])
+        current_q = q_table[s + (a,)]
+        q_table[s + (a,)] = current_q + alpha * (r + gamma * max_future_q - current_q)
+    return len(states) / (time.perf_counter() - start)
+
+
+def aggiornamenti_scalari(q, states, actions, rewards, next_states, alpha=0.1, gamma=0.99):
+    start = time.perf_counter()
+    for s, a, r, ns in zip(states, actions, rewards, next_states):
+        q.greedy_action(s)
+        q.update(s, a, r, ns, alpha, gamma)
+    return len(states) / (time.perf_counter() - start)
+
+
+def aggiornamenti_batch(q, states, actions, rewards, next_states, batch_size=4096, alpha=0.1, gamma=0.99):
+    start = time.perf_counter()
+    for i in range(0, len(states), batch_size):
+        sl = slice(i, i + batch_size)
+        q.greedy_actions(states[sl])
+        q.td_update(states[sl], actions[sl], rewards[sl], next_states[sl], alpha, gamma)
+    return len(states) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    rng = np.random.default_rng(0)
+    n_states = int(np.prod(SHAPE))
+    states = rng.integers(0, n_states, n)
+    next_states = rng.integers(0, n_states, n)
+    actions = rng.integers(0, N_ACTIONS, n)
+    rewards = rng.integers(-5, 3, n).astype(np.float64)
+
+    q_table = rng.uniform(-1, 1, SHAPE + (N_ACTIONS,))
+    m = min(n, 50000)
+    originale = aggiornamenti_originali(q_table.copy(), states[:m], actions[:m].tolist(), rewards[:m].tolist(),
+                                        next_states[:m])
+    print(f"{'originale (tuple, 7D)':<28} {originale:>14,.0f} aggiornamenti/s")
+
+    scalare = aggiornamenti_scalari(QTable(q_table.copy()), states[:m].tolist(), actions[:m].tolist(),
+                                    rewards[:m].tolist(), next_states[:m].tolist())
+    print(f"{'QTable.update (float64)':<28} {scalare:>14,.0f} aggiornamenti/s ({scalare / originale:.1f}x)")
+
+    for dtype in (np.float64, np.float32):
+        q = QTable(q_table.astype(dtype))
+        batch = aggiornamenti_batch(q, states, actions, rewards, next_states)
+        label = f"QTable.td_update ({np.dtype(dtype).name})"
+        print(f"{label:<28} {batch:>14,.0f} aggiornamenti/s ({batch / originale:.0f}x, {q.nbytes / 2**20:.1f} MB)")
@@ -0,0 +1,72 @@
+"""
+Benchmark della grafica della demo (senza attesa del frame successivo): costo per passo del render originale
+(font creato e linea centrale ridisegnata a ogni frame), di Disegnatore (sfondo prerenderizzato e testi in cache)
+e della sola pubblicazione di un'istantanea verso RendererAsincrono. Verifica anche che il processo del renderer
+resti attivo durante le pubblicazioni e si chiuda su richiesta.
+
+Con SDL_VIDEODRIVER=dummy gira anche senza display.
+
+Uso: python benchmarks/bench_renderer.py [passi]
+"""
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pong_core import N_ACTIONS, PongCore
+from renderer import Disegnatore, RendererAsincrono, _apri_finestra, istantanea
+
+
+def disegno_originale(pygame, screen, env):
+    # Render di PongEnv prima del renderer separato, senza clock.tick
+    screen.fill((30, 30, 30))
+    pygame.draw.rect(screen, (255, 0, 0), (0, env.player1_y, env.PADDLE_WIDTH, env.PADDLE_HEIGHT))
+    pygame.draw.rect(screen, (0, 200, 255),
+                     (env.SCREEN_WIDTH - env.PADDLE_WIDTH, env.player2_y, env.PADDLE_WIDTH, env.PADDLE_HEIGHT))
+    pygame.draw.ellipse(screen, (160, 32, 240), (env.ball_x, env.ball_y, env.BALL_SIZE, env.BALL_SIZE))
+    for y in range(0, env.SCREEN_HEIGHT, 40):
+        pygame.draw.line(screen, (100, 100, 100), (env.SCREEN_WIDTH // 2, y), (env.SCREEN_WIDTH // 2, y + 20), 2)
+    font = pygame.font.SysFont("Arial", 30)
+    score_text = font.render(f"Player 1: {env.score_player1}   Player 2: {env.score_player2}", True,
+                             (255, 255, 255))
+    screen.blit(score_text, (env.SCREEN_WIDTH // 2 - score_text.get_width() // 2, 20))
+    touches_text = font.render(f"Touches: {env.touches}", True, (255, 255, 255))
+    screen.blit(touches_text, (env.SCREEN_WIDTH // 2 - touches_text.get_width() // 2, 50))
+    pygame.display.flip()
+
+
+def misura(passi, render):
+    # Microsecondi per passo di simulazione + render
+    env = PongCore(seed=0)
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for _ in range(passi):
+        _, _, done, _ = env.step(rng.randrange(N_ACTIONS), rng.randrange(N_ACTIONS))
+        if done:
+            env.reset()
+        render(env)
+    return (time.perf_counter() - start) / passi * 1e6
+
+
+if __name__ == "__main__":
+    passi = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    print(f"{'solo simulazione':<28} {misura(passi, lambda env: None):>10.1f} us per passo")
+
+    pygame, screen = _apri_finestra()
+    print(f"{'render originale':<28} {misura(passi, lambda env: disegno_originale(pygame, screen, env)):>10.1f} "
+          f"us per passo")
+    disegnatore = Disegnatore(screen)
+    print(f"{'Disegnatore':<28} {misura(passi, lambda env: disegnatore.disegna(istantanea(env))):>10.1f} "
+          f"us per passo")
+    pygame.quit()
+
+    renderer = RendererAsincrono(audio=False)
+    tempo = misura(passi * 10, lambda env: renderer.pubblica(istantanea(env)))
+    attivo = not renderer.chiuso
+    renderer.chiudi()
+    print(f"{'RendererAsincrono.pubblica':<28} {tempo:>10.1f} us per passo "
+          f"(renderer attivo: {attivo}, chiuso su richiesta: {renderer.chiuso})")
@@ -0,0 +1,60 @@
+"""
+Benchmark della memoria di replay (replay.ReplayBuffer) rispetto all'aggiornamento online di modello.
+Misura il costo per operazione (aggiungi, campiona, aggiorna) e, a parità di episodi di addestramento,
+la durata dell'addestramento e la qualità delle Q-Table ottenute (tocchi medi in valutazione greedy).
+
+Uso: python benchmarks/bench_replay.py [episodi]
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qtable import QTable
+from replay import ReplayBuffer
+
+
+def costo(funzione, numero=20000):
+    return timeit.timeit(funzione, number=numero) / numero * 1e6
+
+
+if __name__ == "__main__":
+    episodes = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    q_table = QTable.random(10 ** 6, 3)
+    buffer = ReplayBuffer(100000, q_table.n_states, seed=0)
+    rng = np.random.default_rng(0)
+    for state, next_state in rng.integers(0, q_table.n_states, (buffer.capacity, 2)):
+        buffer.aggiungi(state, 1, -1, next_state, False)
+
+    print(f"{'memoria':<28} {buffer.nbytes / 2 ** 20:>8.1f} MB per {buffer.capacity} transizioni")
+    print(f"{'aggiungi':<28} {costo(lambda: buffer.aggiungi(5, 1, -1, 6, False)):>8.2f} us")
+    print(f"{'update online':<28} {costo(lambda: q_table.update(5, 1, -1, 6, 0.1, 0.99)):>8.2f} us")
+    for batch in (32, 128):
+        print(f"{f'aggiorna (batch {batch})':<28} {costo(lambda: buffer.aggiorna(q_table, batch, 0.1, 0.99)):>8.2f} us")
+    print("-----------------------------------------------")
+
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs("qTable/p1")
+    os.makedirs("qTable/p2")
+    from pongAI import modello
+    from valutazione import valuta
+
+    for nome, opzioni in (("online", {}), ("replay (batch 32 ogni 4)", {"replay_size": 100000}),
+                          ("replay (batch 32 ogni 1)", {"replay_size": 100000, "replay_every": 1})):
+        random.seed(0)
+        np.random.seed(0)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            name1, name2 = modello(episodes, True, 0.1, 0.99, "nulla", "nulla", False, True, plots=False, **opzioni)
+            risultato = valuta(name1, name2, 5000, n_workers=1)
+        print(f"{nome:<28} {time.perf_counter() - start:>8.1f} s, tocchi medi in valutazione "
+              f"{risultato['scambi']['media']:.3f}, passi medi {risultato['passi']['media']:.0f}")
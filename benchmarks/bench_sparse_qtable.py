@@ -0,0 +1,93 @@
+"""
+Benchmark della Q-Table sparsa (SparseQTable) rispetto alla QTable densa.
+Verifica che con gli stessi valori iniziali le due tabelle diano gli stessi risultati, poi misura
+aggiornamenti scalari e vettorizzati e la memoria occupata su transizioni concentrate su pochi stati,
+come avviene giocando (la maggior parte degli stati non viene mai visitata).
+
+Uso: python benchmarks/bench_sparse_qtable.py [transizioni] [stati visitati]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qtable import QTable, SparseQTable
+
+N_ACTIONS = 3
+
+
+def transizioni(n, n_states, visitati, rng):
+    universo = rng.choice(n_states, visitati, replace=False)
+    states = universo[rng.integers(0, visitati, n)]
+    next_states = universo[rng.integers(0, visitati, n)]
+    actions = rng.integers(0, N_ACTIONS, n)
+    rewards = rng.integers(-5, 3, n).astype(np.float64)
+    return states, actions, rewards, next_states
+
+
+def aggiornamenti_scalari(q, states, actions, rewards, next_states, alpha=0.1, gamma=0.99):
+    start = time.perf_counter()
+    for s, a, r, ns in zip(states, actions, rewards, next_states):
+        q.greedy_action(s)
+        q.update(s, a, r, ns, alpha, gamma)
+    return len(states) / (time.perf_counter() - start)
+
+
+def aggiornamenti_batch(q, states, actions, rewards, next_states, batch_size=4096, alpha=0.1, gamma=0.99):
+    start = time.perf_counter()
+    for i in range(0, len(states), batch_size):
+        sl = slice(i, i + batch_size)
+        q.greedy_actions(states[sl])
+        q.td_update(states[sl], actions[sl], rewards[sl], next_states[sl], alpha, gamma)
+    return len(states) / (time.perf_counter() - start)
+
+
+def verifica_equivalenza(n=20000, n_states=10 ** 6, visitati=5000):
+    rng = np.random.default_rng(1)
+    states, actions, rewards, next_states = transizioni(n, n_states, visitati, rng)
+    sparsa = SparseQTable(n_states, N_ACTIONS, capacity=16, seed=3)
+    densa = QTable(sparsa.default_values(np.arange(n_states)))
+
+    m = n // 2
+    for s, a, r, ns in zip(states[:m].tolist(), actions[:m].tolist(), rewards[:m].tolist(), next_states[:m].tolist()):
+        densa.update(s, a, r, ns, 0.1, 0.99)
+        sparsa.update(s, a, r, ns, 0.1, 0.99)
+    densa.td_update(states[m:], actions[m:], rewards[m:], next_states[m:], 0.1, 0.99)
+    sparsa.td_update(states[m:], actions[m:], rewards[m:], next_states[m:], 0.1, 0.99)
+
+    tutti = np.arange(n_states)
+    assert np.array_equal(densa.max_values(tutti), sparsa.max_values(tutti))
+    assert np.array_equal(densa.greedy_actions(tutti), sparsa.greedy_actions(tutti))
+    print(f"[INFO] Equivalenza verificata ({sparsa.visited_states} stati visitati, capacità {sparsa.capacity})")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    visitati = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    verifica_equivalenza()
+
+    rng = np.random.default_rng(0)
+    for discrete_bins in (10, 20, 30):
+        n_states = discrete_bins ** 6
+        states, actions, rewards, next_states = transizioni(n, n_states, visitati, rng)
+        m = min(n, 50000)
+        args = (states[:m].tolist(), actions[:m].tolist(), rewards[:m].tolist(), next_states[:m].tolist())
+
+        print(f"----- {discrete_bins} bins ({n_states:,} stati, {visitati:,} visitati) -----")
+        if discrete_bins == 10:
+            densa = QTable.random(n_states, N_ACTIONS)
+            scalare = aggiornamenti_scalari(densa, *args)
+            batch = aggiornamenti_batch(densa, states, actions, rewards, next_states)
+            print(f"{'QTable':<14} {scalare:>12,.0f} scalari/s {batch:>14,.0f} batch/s "
+                  f"{densa.nbytes / 2 ** 20:>10.1f} MB")
+        else:
+            print(f"{'QTable':<14} {'':>35} {n_states * N_ACTIONS * 8 / 2 ** 20:>10.1f} MB (non allocata)")
+
+        sparsa = SparseQTable(n_states, N_ACTIONS)
+        scalare = aggiornamenti_scalari(sparsa, *args)
+        batch = aggiornamenti_batch(sparsa, states, actions, rewards, next_states)
+        print(f"{'SparseQTable':<14} {scalare:>12,.0f} scalari/s {batch:>14,.0f} batch/s "
+              f"{sparsa.nbytes / 2 ** 20:>10.1f} MB")
@@ -0,0 +1,248 @@
+"""
+Suite di benchmark riproducibile per ambiente e agente: passi al secondo di PongCore (senza rendering),
+discretizzazione (scalare e a lotti), aggiornamenti della Q-Table (scalari e td_update), episodi al secondo di
+modello e del loop compilato, salvataggio e caricamento delle Q-Table .npq per diversi numeri di bins.
+
+Ogni misura usa generatori con seed fissi: oltre ai tempi riporta un digest del risultato (ricompense, stati,
+valori della Q-Table...), che deve essere identico tra le ripetizioni e tra due esecuzioni sulla stessa versione
+del codice. I risultati sono righe JSON (una per misura, con commit, versioni e macchina) stampate a video o
+aggiunte al file indicato con --output, per confrontare commit diversi.
+
+Uso: python benchmarks/bench_suite.py [--ripetizioni N] [--output risultati.jsonl] [--solo nome ...] [--bins 6 8 ...]
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from discretizer import Discretizer, crea_bins, process_observation_player1
+from pong_core import N_ACTIONS, PongCore
+from qtable import QTable
+from qtable_storage import carica_npq, salva_npq
+
+SEED = 0
+
+
+def digest(*valori):
+    """
+    Impronta md5 (abbreviata) di array e numeri, per confrontare i risultati tra ripetizioni ed esecuzioni.
+    """
+    h = hashlib.md5()
+    for valore in valori:
+        h.update(np.ascontiguousarray(valore).tobytes())
+    return h.hexdigest()[:16]
+
+
+def ambiente():
+    """
+    Commit, versioni e macchina su cui girano le misure.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    try:
+        import numba
+        versione_numba = numba.__version__
+    except ImportError:
+        versione_numba = None
+    return {"commit": commit, "python": platform.python_version(), "numpy": np.__version__,
+            "numba": versione_numba, "piattaforma": platform.platform(), "cpu": os.cpu_count()}
+
+
+def osservazioni(n):
+    # Osservazioni reali di episodi con azioni casuali (seed fisso)
+    env = PongCore(seed=SEED)
+    rng = random.Random(SEED)
+    obs = env._get_obs()
+    risultato = []
+    for _ in range(n):
+        risultato.append(process_observation_player1(obs))
+        obs, _, done, _ = env.step(rng.randrange(N_ACTIONS), rng.randrange(N_ACTIONS))
+        if done:
+            obs = env.reset()
+    return np.array(risultato)
+
+
+def transizioni(n, n_states):
+    rng = np.random.default_rng(SEED)
+    return (rng.integers(0, n_states, n), rng.integers(0, N_ACTIONS, n), rng.integers(-5, 3, n).astype(np.float64),
+            rng.integers(0, n_states, n))
+
+
+# Ogni bench_* prepara i dati fuori dalla misura e restituisce la funzione cronometrata, che ritorna
+# (quantità elaborata, digest del risultato)
+
+def bench_env(passi):
+    azioni = np.random.default_rng(SEED).integers(0, N_ACTIONS, (passi, 2)).tolist()
+
+    def esegui():
+        env = PongCore(seed=SEED)
+        ricompense = np.zeros(2)
+        for action1, action2 in azioni:
+            _, rewards, done, _ = env.step(action1, action2)
+            ricompense += rewards
+            if done:
+                env.reset()
+        return passi, digest(ricompense, env._get_obs())
+    return esegui
+
+
+def bench_discretizzazione(n, bins, batch):
+    discretizer = Discretizer(crea_bins(bins))
+    stati = osservazioni(n)
+    lista = [tuple(s) for s in stati]
+
+    def esegui():
+        if batch:
+            indici = discretizer.discretize_batch(stati)
+        else:
+            indici = np.array([discretizer.discretize(s) for s in lista])
+        return n, digest(indici)
+    return esegui
+
+
+def bench_update(n, bins, batch, batch_size=4096):
+    n_states = bins ** 6
+    states, actions, rewards, next_states = transizioni(n, n_states)
+    iniziale = np.random.default_rng(SEED).uniform(-1, 1, (n_states, N_ACTIONS))
+    liste = list(zip(states.tolist(), actions.tolist(), rewards.tolist(), next_states.tolist()))
+
+    def esegui():
+        q = QTable(iniziale.copy())
+        if batch:
+            for i in range(0, n, batch_size):
+                sl = slice(i, i + batch_size)
+                q.td_update(states[sl], actions[sl], rewards[sl], next_states[sl], 0.1, 0.99)
+        else:
+            for s, a, r, ns in liste:
+                q.update(s, a, r, ns, 0.1, 0.99)
+        return n, digest(q.values)
+    return esegui
+
+
+def bench_modello(episodi, bins):
+    from pongAI import modello
+
+    def esegui():
+        cartella = os.getcwd()
+        with tempfile.TemporaryDirectory() as temporanea:
+            os.chdir(temporanea)
+            try:
+                os.makedirs("qTable/p1")
+                os.makedirs("qTable/p2")
+                with contextlib.redirect_stdout(io.StringIO()):
+                    n1, n2 = modello(episodi, True, 0.1, 0.99, "nulla", "nulla", False, True, discrete_bins=bins,
+                                     plots=False, seed=SEED)
+                return episodi, digest(carica_npq(f"qTable/p1/{n1}", mmap_mode=None)[0].values,
+                                       carica_npq(f"qTable/p2/{n2}", mmap_mode=None)[0].values)
+            finally:
+                os.chdir(cartella)
+    return esegui
+
+
+def bench_compilato(episodi, bins):
+    from compiled_training import esegui_episodi, seed
+    from parallel_training import epsilon_schedule
+
+    discretizer = Discretizer(crea_bins(bins))
+    rng = np.random.default_rng(SEED)
+    iniziali = rng.uniform(-1, 1, (2, discretizer.n_states, N_ACTIONS))
+    epsilons = epsilon_schedule(episodi, True)
+    # Compilazione esclusa dalle misure
+    esegui_episodi(iniziali[0].copy(), iniziali[1].copy(), epsilons[:1], 0.1, 0.99, discretizer)
+
+    def esegui():
+        q1, q2 = iniziali[0].copy(), iniziali[1].copy()
+        seed(SEED)
+        risultati = esegui_episodi(q1, q2, epsilons, 0.1, 0.99, discretizer)
+        return episodi, digest(q1, q2, *risultati)
+    return esegui
+
+
+def bench_npq(bins, caricamento):
+    # La cartella temporanea resta finché esiste la funzione cronometrata
+    cartella = tempfile.TemporaryDirectory()
+    path = os.path.join(cartella.name, f"bench_{bins}.npq")
+    valori = np.random.default_rng(SEED).uniform(-1, 1, (bins ** 6, N_ACTIONS))
+    bordi = crea_bins(bins)
+    if caricamento:
+        salva_npq(path, valori, bordi)
+
+    def esegui(cartella=cartella):
+        if caricamento:
+            q, _ = carica_npq(path, mmap_mode=None, verifica=True)
+            return valori.nbytes / 2 ** 20, digest(q.values)
+        salva_npq(path, valori, bordi)
+        return valori.nbytes / 2 ** 20, digest(valori)
+    return esegui
+
+
+def crea_benchmark(bins_npq):
+    """
+    :return: Lista di (nome, parametri, unità, funzione che crea il benchmark)
+    """
+    benchmark = [
+        ("env_passi", {"passi": 200000}, "passi/s", lambda: bench_env(200000)),
+        ("discretizzazione_scalare", {"stati": 100000, "bins": 10}, "stati/s",
+         lambda: bench_discretizzazione(100000, 10, False)),
+        ("discretizzazione_batch", {"stati": 100000, "bins": 10}, "stati/s",
+         lambda: bench_discretizzazione(100000, 10, True)),
+        ("qtable_update", {"transizioni": 100000, "bins": 10}, "aggiornamenti/s",
+         lambda: bench_update(100000, 10, False)),
+        ("qtable_td_update", {"transizioni": 1000000, "bins": 10}, "aggiornamenti/s",
+         lambda: bench_update(1000000, 10, True)),
+        ("episodi_modello", {"episodi": 200, "bins": 10}, "episodi/s", lambda: bench_modello(200, 10)),
+        ("episodi_compilati", {"episodi": 2000, "bins": 10}, "episodi/s", lambda: bench_compilato(2000, 10)),
+    ]
+    for bins in bins_npq:
+        benchmark.append(("npq_salvataggio", {"bins": bins}, "MB/s", lambda b=bins: bench_npq(b, False)))
+        benchmark.append(("npq_caricamento", {"bins": bins}, "MB/s", lambda b=bins: bench_npq(b, True)))
+    return benchmark
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Suite di benchmark riproducibile di PongAI")
+    parser.add_argument("--ripetizioni", type=int, default=5, help="Ripetizioni di ogni misura")
+    parser.add_argument("--output", help="File .jsonl a cui aggiungere i risultati (default: solo a video)")
+    parser.add_argument("--solo", nargs="+", help="Esegue solo i benchmark con questi nomi")
+    parser.add_argument("--bins", nargs="+", type=int, default=[6, 8, 10, 12],
+                        help="Numeri di bins per salvataggio e caricamento .npq")
+    args = parser.parse_args()
+
+    info = ambiente()
+    print(f"[INFO] Commit {info['commit']}, Python {info['python']}, NumPy {info['numpy']}, Numba {info['numba']}")
+    print("-----------------------------------------------")
+    for nome, parametri, unita, crea in crea_benchmark(args.bins):
+        if args.solo and nome not in args.solo:
+            continue
+        esegui = crea()
+        valori, digests = [], set()
+        for _ in range(args.ripetizioni):
+            start = time.perf_counter()
+            quantita, impronta = esegui()
+            valori.append(quantita / (time.perf_counter() - start))
+            digests.add(impronta)
+        riga = {"benchmark": nome, "parametri": parametri, "unita": unita, "ripetizioni": args.ripetizioni,
+                "mediana": float(np.median(valori)), "min": min(valori), "max": max(valori),
+                "digest": digests.pop() if len(digests) == 1 else None, "timestamp": time.time(), **info}
+
+        etichetta = f"{nome} ({', '.join(f'{k}={v}' for k, v in parametri.items())})"
+        print(f"{etichetta:<48} {riga['mediana']:>14,.1f} {unita:<16} "
+              f"[{riga['min']:,.1f} - {riga['max']:,.1f}] digest {riga['digest'] or 'NON RIPRODUCIBILE'}")
+        if args.output:
+            with open(args.output, "a") as f:
+                f.write(json.dumps(riga) + "\n")
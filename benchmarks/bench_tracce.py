@@ -0,0 +1,88 @@
+"""
+Benchmark delle tracce compatte (tracce.py): costo per passo di PongCore.step con e senza Registratore,
+dimensione su disco, tempo di accesso a un episodio casuale tramite l'indice e verifica della traccia
+ri-simulando ogni episodio con le azioni registrate (osservazioni entro l'arrotondamento del punto fisso,
+ricompense e fine episodio identiche).
+
+Uso: python benchmarks/bench_tracce.py [passi] [max_steps] [frame_skip]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pong_core import N_ACTIONS, PongCore
+from tracce import DONE, FINALE, PASSO, Registratore, Traccia
+
+
+def gioca(passi, max_steps, frame_skip, registratore=None):
+    # Secondi per passo con azioni casuali (seed fissi)
+    env = PongCore(max_steps, frame_skip, seed=0)
+    env.registratore = registratore
+    env.reset()
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for _ in range(passi):
+        _, _, done, _ = env.step(rng.randrange(N_ACTIONS), rng.randrange(N_ACTIONS))
+        if done:
+            env.reset()
+    env.close()
+    return (time.perf_counter() - start) / passi
+
+
+def verifica(traccia, max_steps, frame_skip):
+    """
+    :return: Numero di episodi ri-simulati identici alla traccia
+    """
+    env = PongCore(max_steps, frame_skip)
+    tolleranza = 0.5 / traccia.scala + 1e-9
+    identici = 0
+    for numero in range(len(traccia)):
+        records = traccia.episodio(numero)
+        obs = traccia.osservazioni(records)
+        env.reset()
+        # Lo stato iniziale dopo reset è intero
+        (env.player1_y, env.player2_y, env.ball_x, env.ball_y,
+         env.ball_dx, env.ball_dy) = (int(round(x)) for x in obs[0])
+        uguale = records["flag"][-1] & FINALE != 0
+        for i in range(len(records) - 1):
+            osservazione, ricompense, done, _ = env.step(*(int(a) for a in records["azioni"][i]))
+            if np.abs(np.asarray(osservazione, dtype=np.float64) - obs[i + 1]).max() > tolleranza or \
+                    tuple(ricompense) != tuple(records["ricompense"][i]) or done != bool(records["flag"][i] & DONE):
+                uguale = False
+                break
+        identici += uguale
+    return identici
+
+
+if __name__ == "__main__":
+    passi = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    max_steps = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    frame_skip = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+
+    path = os.path.join(tempfile.mkdtemp(), "traccia")
+    senza = gioca(passi, max_steps, frame_skip)
+    con = gioca(passi, max_steps, frame_skip, Registratore(path, frame_skip=frame_skip, max_steps=max_steps))
+    print(f"{'step senza registratore':<28} {senza * 1e6:>8.2f} us per passo")
+    print(f"{'step con registratore':<28} {con * 1e6:>8.2f} us per passo (+{(con - senza) * 1e6:.2f} us, "
+          f"{con / senza - 1:+.0%})")
+
+    traccia = Traccia(path)
+    print(f"{'traccia':<28} {len(traccia)} episodi, {traccia.record} record, {traccia.nbytes / 2 ** 20:.1f} MB "
+          f"({PASSO.itemsize} byte per passo, {len(traccia.segmenti)} segmenti)")
+
+    numeri = np.random.default_rng(0).integers(0, len(traccia), 10000)
+    start = time.perf_counter()
+    for numero in numeri:
+        traccia.episodio(numero)
+    print(f"{'accesso a un episodio':<28} {(time.perf_counter() - start) / len(numeri) * 1e6:>8.2f} us")
+
+    campione = Traccia(path)
+    campione.indice = campione.indice[:2000]
+    print(f"{'verifica':<28} {verifica(campione, max_steps, frame_skip)}/{len(campione)} episodi ri-simulati "
+          f"identici alla traccia")
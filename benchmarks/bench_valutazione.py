@@ -0,0 +1,50 @@
+"""
+Benchmark della valutazione greedy (valutazione.valuta) rispetto al test di modello, su una coppia di
+Q-Table casuali salvate in .npq in una cartella temporanea. Riporta gli episodi al secondo.
+
+Uso: python benchmarks/bench_valutazione.py [episodi] [processi]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from discretizer import crea_bins
+from pong_core import N_ACTIONS
+from qtable_storage import salva_npq
+
+
+if __name__ == "__main__":
+    episodes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n_workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    os.chdir(tempfile.mkdtemp())
+    rng = np.random.default_rng(0)
+    for player in (1, 2):
+        os.makedirs(f"qTable/p{player}")
+        salva_npq(f"qTable/p{player}/p{player}_bench.npq", rng.uniform(-1, 1, (10 ** 6, N_ACTIONS)), crea_bins(10))
+
+    from pongAI import modello
+    from valutazione import valuta
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        metriche = modello(episodes, False, 0.1, 0.99, "p1_bench.npq", "p2_bench.npq", False, True, plots=False)
+    durata = time.perf_counter() - start
+    print(f"{'test di modello':<24} {episodes / durata:>12,.0f} episodi/s "
+          f"(vittorie P1 {metriche.wins_p1 / episodes:.2%})")
+
+    # Primo blocco breve per escludere la compilazione dalla misura
+    valuta("p1_bench.npq", "p2_bench.npq", 10, n_workers=1)
+    n = episodes * 20
+    start = time.perf_counter()
+    risultato = valuta("p1_bench.npq", "p2_bench.npq", n, n_workers)
+    veloce = n / (time.perf_counter() - start)
+    print(f"{'valuta':<24} {veloce:>12,.0f} episodi/s ({veloce * durata / episodes:.0f}x, "
+          f"vittorie P1 {risultato['win_rate_p1']:.2%}, {n} episodi)")
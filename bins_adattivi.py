@@ -0,0 +1,362 @@
+"""
+Discretizzazione non uniforme dello stato guidata dalle visite.
+
+I bins uniformi di crea_bins dividono ogni dimensione in parti uguali anche dove lo stato non passa quasi mai
+(es. le velocità oltre ±BALL_SPEED, raggiunte con l'accelerazione fino a MAX_BALL_SPEED, finiscono tutte nei bins
+estremi). Qui si raccoglie l'istogramma delle visite per dimensione (IstogrammaVisite, durante modello con
+visit_stats oppure da tracce registrate) e se ne ricavano bordi ai quantili (bins_quantili): a parità di bins, e
+quindi di memoria della Q-Table, ogni bin raccoglie circa la stessa frazione delle visite.
+
+I bordi sono multipli della risoluzione dell'istogramma (potenze di 2), quindi il Discretizer li usa con tabelle
+di dimensione limitata e lo stesso costo per passo dei bins uniformi. Vengono salvati nell'header della Q-Table
+(salva_q_tables) e riletti da modello, valutazione e politica. ribina migra una Q-Table esistente su nuovi bordi.
+
+È una modalità sperimentale: in benchmarks/bench_bins_adattivi.py, dopo 200000 episodi, le Q-Table con bins
+uniformi fanno ancora più tocchi in self-play di quelle ai quantili (migrate o addestrate da zero).
+
+Esempi:
+    python bins_adattivi.py istogramma tracce/120k --output visite.npz
+    python bins_adattivi.py bins visite.npz --bins 10
+    python bins_adattivi.py ribina visite.npz qTable/p1/p1_120k_alpha0.100_gamma0.990.npq --bins 10
+"""
+import argparse
+import itertools
+import json
+import os
+import pickle
+
+import numpy as np
+
+from discretizer import crea_bins, process_observations_player2
+from pong_core import SCREEN_WIDTH, SCREEN_HEIGHT, MAX_BALL_SPEED
+
+# Celle dell'istogramma per dimensione: (inizio, larghezza, numero di celle). Le larghezze sono potenze di 2
+# (1 pixel per le posizioni, 1/8 di pixel per frame per le velocità); i valori fuori campo vanno nelle celle estreme
+CELLE = [
+    (-64.0, 1.0, SCREEN_HEIGHT + 128),                  # player1_y
+    (-64.0, 1.0, SCREEN_HEIGHT + 128),                  # player2_y
+    (-64.0, 1.0, SCREEN_WIDTH + 128),                   # ball_x
+    (-64.0, 1.0, SCREEN_HEIGHT + 128),                  # ball_y
+    (-2.0 * MAX_BALL_SPEED, 0.125, 32 * MAX_BALL_SPEED), # ball_dx
+    (-2.0 * MAX_BALL_SPEED, 0.125, 32 * MAX_BALL_SPEED), # ball_dy
+]
+
+STATI_PER_AGGIORNAMENTO = 1 << 16
+
+
+class IstogrammaVisite:
+    """
+    Istogramma delle visite per dimensione dello stato. Le osservazioni vengono accumulate in una lista e
+    contate a blocchi con np.bincount, quindi il costo per passo è quello di un append.
+    """
+    def __init__(self, entrambe_prospettive=True):
+        """
+        :param entrambe_prospettive: Se True ogni osservazione conta anche ribaltata per il Player 2
+                                     (process_observation_player2), come la vedono le due Q-Table
+        """
+        self.entrambe_prospettive = entrambe_prospettive
+        self.conteggi = [np.zeros(n, dtype=np.int64) for _, _, n in CELLE]
+        self._righe = []
+
+    def aggiungi(self, obs):
+        """
+        Aggiunge un'osservazione (player1_y, player2_y, ball_x, ball_y, ball_dx, ball_dy).
+        """
+        self._righe.append(obs)
+        if len(self._righe) >= STATI_PER_AGGIORNAMENTO:
+            self.svuota()
+
+    def aggiungi_batch(self, obs):
+        """
+        Aggiunge un array (N, 6) di osservazioni.
+        """
+        obs = np.asarray(obs, dtype=np.float64).reshape(-1, len(CELLE))
+        gruppi = (obs, process_observations_player2(obs)) if self.entrambe_prospettive else (obs,)
+        for gruppo in gruppi:
+            for d, (inizio, larghezza, n) in enumerate(CELLE):
+                celle = np.clip(np.floor((gruppo[:, d] - inizio) / larghezza), 0, n - 1).astype(np.int64)
+                self.conteggi[d] += np.bincount(celle, minlength=n)
+
+    def svuota(self):
+        """
+        Conta le osservazioni in attesa.
+        """
+        if self._righe:
+            # fromiter evita la conversione riga per riga di np.array, come in tracce.Registratore
+            righe = np.fromiter(itertools.chain.from_iterable(self._righe), dtype=np.float64,
+                                count=len(self._righe) * len(CELLE))
+            self._righe = []
+            self.aggiungi_batch(righe)
+
+    @property
+    def totale(self):
+        """
+        Numero di osservazioni contate (per prospettiva).
+        """
+        self.svuota()
+        return int(self.conteggi[0].sum()) // (2 if self.entrambe_prospettive else 1)
+
+    def unisci(self, altro):
+        """
+        Somma all'istogramma le visite di un altro istogramma.
+        """
+        altro.svuota()
+        for mio, suo in zip(self.conteggi, altro.conteggi):
+            mio += suo
+        return self
+
+    def __getstate__(self):
+        # Nei checkpoint le osservazioni in attesa vengono prima contate
+        self.svuota()
+        return self.__dict__
+
+    def salva(self, path):
+        """
+        Salva l'istogramma in un archivio .npz (scrittura atomica).
+        """
+        self.svuota()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, celle=np.array(CELLE), entrambe_prospettive=self.entrambe_prospettive,
+                     **{f"dimensione{d}": conteggi for d, conteggi in enumerate(self.conteggi)})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def carica(cls, path):
+        """
+        Carica un istogramma salvato con salva.
+        """
+        with np.load(path) as archivio:
+            if not np.array_equal(archivio["celle"], np.array(CELLE)):
+                raise ValueError(f"{path}: celle dell'istogramma diverse da quelle attuali")
+            istogramma = cls(bool(archivio["entrambe_prospettive"]))
+            istogramma.conteggi = [archivio[f"dimensione{d}"].astype(np.int64) for d in range(len(CELLE))]
+        return istogramma
+
+
+def istogramma_da_tracce(tracce, record_per_blocco=1 << 20):
+    """
+    Istogramma delle visite delle osservazioni registrate in una o più tracce (tracce.py).
+    :param tracce: Cartella di una traccia o lista di cartelle
+    :param record_per_blocco: Record letti per volta
+    :return: IstogrammaVisite
+    """
+    from tracce import Traccia
+
+    istogramma = IstogrammaVisite()
+    for path in [tracce] if isinstance(tracce, str) else tracce:
+        traccia = Traccia(path)
+        for records in traccia.blocchi(record_per_blocco):
+            # L'ultimo record di ogni blocco è ripetuto come primo del successivo
+            istogramma.aggiungi_batch(traccia.osservazioni(records[:-1]))
+        if len(traccia):
+            fine = int(traccia.indice["inizio"][-1] + traccia.indice["lunghezza"][-1])
+            istogramma.aggiungi_batch(traccia.osservazioni(traccia.records(fine - 1, fine)))
+    return istogramma
+
+
+def _bordi_quantili(conteggi, inizio, larghezza, discrete_bins, uniforme):
+    # Bordi di una dimensione: il primo è l'inizio della prima cella visitata (serve solo al Discretizer, i valori
+    # più piccoli vanno comunque nel bin 0), gli altri separano frazioni uguali delle visite, mescolate con la
+    # frazione uniforme tra la prima e l'ultima cella visitata
+    visitate = np.flatnonzero(conteggi)
+    primo, ultimo = int(visitate[0]), int(visitate[-1])
+    pesi = (1 - uniforme) * conteggi / conteggi.sum()
+    pesi[primo:ultimo + 1] += uniforme / (ultimo - primo + 1)
+    cumulata = np.cumsum(pesi)
+    totale = cumulata[-1]
+
+    # Un bordo ha senso solo tra due celle visitate consecutive (a metà del tratto non visitato tra le due): due
+    # bordi senza valori visitati in mezzo lascerebbero un bin vuoto
+    candidati = visitate[:-1] + 1 + (np.diff(visitate) - 1) // 2
+    massa = cumulata[candidati - 1]
+    if len(candidati):
+        scelti = {int(np.argmin(np.abs(massa - totale * k / discrete_bins))) for k in range(1, discrete_bins)}
+    else:
+        scelti = set()
+
+    # Le visite concentrate su pochi valori (es. le velocità) danno quantili coincidenti: si divide il bin con più
+    # massa che contiene almeno due valori visitati, nel candidato più vicino alla sua metà
+    def massa_sinistra(i):
+        return 0.0 if i < 0 else totale if i >= len(candidati) else massa[i]
+
+    while len(scelti) < min(discrete_bins - 1, len(candidati)):
+        confini = [-1] + sorted(scelti) + [len(candidati)]
+        _, a, b = max((massa_sinistra(b) - massa_sinistra(a), a, b) for a, b in zip(confini, confini[1:]) if b - a > 1)
+        interni = np.arange(a + 1, b)
+        metà = (massa_sinistra(a) + massa_sinistra(b)) / 2
+        scelti.add(int(interni[np.argmin(np.abs(massa[interni] - metà))]))
+    bordi = [primo] + sorted(int(candidati[i]) for i in scelti)
+
+    # Con meno di discrete_bins valori visitati distinti i bordi mancanti vanno fuori dal campo visitato, a turno
+    # sopra e sotto, così i valori mai visti appena oltre il massimo e il minimo hanno un bin proprio
+    while len(bordi) < discrete_bins:
+        if len(bordi) % 2:
+            bordi.append(max(bordi[-1], ultimo) + 1)
+        else:
+            bordi.insert(0, bordi[0] - 1)
+    return inizio + np.array(bordi, dtype=np.float64) * larghezza
+
+
+def bins_quantili(istogramma, discrete_bins, uniforme=0.0):
+    """
+    Bordi dei bins ai quantili delle visite, stesso formato di crea_bins.
+    Le dimensioni senza visite mantengono i bordi uniformi.
+    :param istogramma: IstogrammaVisite (o path di un istogramma salvato)
+    :param discrete_bins: Numero di bins per dimensione
+    :param uniforme: Frazione (0-1) della distribuzione uniforme sul campo visitato mescolata alle visite: con 1
+                     i bordi sono uniformi tra il minimo e il massimo visitati, con 0 ogni bin ha le stesse visite
+    :return: Lista di 6 array di bordi strettamente crescenti, multipli della larghezza delle celle
+    """
+    if isinstance(istogramma, str):
+        istogramma = IstogrammaVisite.carica(istogramma)
+    istogramma.svuota()
+    uniformi = crea_bins(discrete_bins)
+    return [_bordi_quantili(conteggi, inizio, larghezza, discrete_bins, uniforme) if conteggi.any() else bordi
+            for conteggi, (inizio, larghezza, _), bordi in zip(istogramma.conteggi, CELLE, uniformi)]
+
+
+def bins_uniformi(bins):
+    """
+    True se i bordi sono quelli uniformi di crea_bins.
+    """
+    return all(np.array_equal(b, u) for b, u in zip(bins, crea_bins(len(bins[0]))))
+
+
+def bins_q_table(path):
+    """
+    Bordi salvati nell'header di una Q-Table .npq o .npqs (None per i .pkl o se mancano).
+    """
+    if path.endswith(".npqs"):
+        with np.load(path) as archivio:
+            bins = json.loads(str(archivio["header"])).get("bins")
+    elif path.endswith(".npq"):
+        from qtable_storage import leggi_header
+        bins = leggi_header(path).get("bins")
+    else:
+        bins = None
+    return None if bins is None else [np.asarray(b, dtype=np.float64) for b in bins]
+
+
+def _stessi_bordi(bins1, bins2):
+    return len(bins1) == len(bins2) and all(np.array_equal(a, b) for a, b in zip(bins1, bins2))
+
+
+def scegli_bins(bin_edges, discrete_bins, q_table_p1=None, q_table_p2=None):
+    """
+    Bordi da usare per un addestramento o un test.
+    :param bin_edges: None (bordi salvati con la Q-Table del Player 1, se esiste, altrimenti uniformi), lista di
+                      bordi oppure path di un istogramma delle visite (.npz) da cui ricavare i quantili
+    :param discrete_bins: Numero di bins per dimensione (per i bordi uniformi e per i quantili)
+    :param q_table_p1: Nome del file della Q-Table del Player 1 in qTable/p1
+    :param q_table_p2: Nome del file della Q-Table del Player 2 in qTable/p2 (None se non viene caricata)
+    :return: Lista di 6 array di bordi
+    """
+    salvati = [bins_q_table(path) if path is not None and os.path.exists(path) else None
+               for path in (f"qTable/p1/{q_table_p1}" if q_table_p1 is not None else None,
+                            f"qTable/p2/{q_table_p2}" if q_table_p2 is not None else None)]
+
+    if bin_edges is None:
+        bins = salvati[0] if salvati[0] is not None else crea_bins(discrete_bins)
+    else:
+        bins = bins_quantili(bin_edges, discrete_bins) if isinstance(bin_edges, str) else \
+            [np.asarray(b, dtype=np.float64) for b in bin_edges]
+    for nome, bordi in zip((q_table_p1, q_table_p2), salvati):
+        if bordi is not None and not _stessi_bordi(bordi, bins):
+            raise ValueError(f"La Q-Table {nome} usa bordi diversi da quelli "
+                             f"{'indicati' if bin_edges is not None else f'della Q-Table {q_table_p1}'}: "
+                             f"migrarla prima con bins_adattivi.ribina")
+    return bins
+
+
+def ribina(q_table, bins_vecchi, bins_nuovi):
+    """
+    Migra una Q-Table densa su nuovi bordi: ogni nuovo bin prende i valori del vecchio bin che contiene il suo
+    punto rappresentativo (centro del bin; per l'ultimo, aperto, mezzo bin oltre il bordo), dimensione per
+    dimensione. Se i nuovi bordi contengono i vecchi la migrazione è esatta.
+    :param q_table: Array (n_stati, n_azioni) o (bins^6, n_azioni) sui bordi bins_vecchi
+    :param bins_vecchi: Bordi della Q-Table
+    :param bins_nuovi: Nuovi bordi
+    :return: Array (n_stati_nuovi, n_azioni)
+    """
+    forma_vecchia = tuple(len(b) for b in bins_vecchi)
+    q_table = np.asarray(q_table).reshape(forma_vecchia + (-1,))
+
+    mappe = []
+    for vecchi, nuovi in zip(bins_vecchi, bins_nuovi):
+        vecchi, nuovi = np.asarray(vecchi, dtype=np.float64), np.asarray(nuovi, dtype=np.float64)
+        punti = np.append((nuovi[:-1] + nuovi[1:]) / 2, nuovi[-1] + (nuovi[-1] - nuovi[-2]) / 2)
+        mappe.append(np.clip(np.digitize(punti, vecchi) - 1, 0, len(vecchi) - 1))
+    return q_table[np.ix_(*mappe, np.arange(q_table.shape[-1]))].reshape(-1, q_table.shape[-1])
+
+
+def ribina_file(path, bins_nuovi, output=None):
+    """
+    Migra una Q-Table salvata (.npq o .pkl) su nuovi bordi e la salva in .npq con i nuovi bordi nell'header.
+    :param path: File della Q-Table
+    :param bins_nuovi: Nuovi bordi
+    :param output: File di destinazione (default: stesso nome con suffisso _ribinata)
+    :return: Path del file salvato
+    """
+    from qtable_storage import ESTENSIONE, carica_npq, salva_npq
+
+    if path.endswith(ESTENSIONE):
+        q_table, header = carica_npq(path, mmap_mode="r")
+        valori = q_table.values
+        metadati = header.get("metadata", {})
+        bins_vecchi = header.get("bins") or crea_bins(q_table.state_shape[0])
+    elif path.endswith(".pkl"):
+        with open(path, "rb") as f:
+            valori = pickle.load(f)
+        metadati = {}
+        bins_vecchi = crea_bins(valori.shape[0])
+        valori = valori.reshape(-1, valori.shape[-1])
+    else:
+        raise ValueError(f"{path}: la migrazione è supportata solo per Q-Table dense (.npq o .pkl)")
+
+    if output is None:
+        output = f"{os.path.splitext(path)[0]}_ribinata{ESTENSIONE}"
+    nuova = ribina(valori, bins_vecchi, bins_nuovi)
+    salva_npq(output, nuova.reshape(tuple(len(b) for b in bins_nuovi) + (nuova.shape[-1],)), bins_nuovi,
+              **dict(metadati, ribinata_da=os.path.basename(path)))
+    print(f"[INFO] {path} migrata su {len(bins_nuovi[0])} bins per dimensione: {output}")
+    return output
+
+
+def _stampa_bins(bins):
+    nomi = ("player1_y", "player2_y", "ball_x", "ball_y", "ball_dx", "ball_dy")
+    for nome, bordi in zip(nomi, bins):
+        print(f"    {nome:<10} {' '.join(f'{b:g}' for b in bordi)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bins non uniformi ricavati dalle visite degli stati")
+    comandi = parser.add_subparsers(dest="comando", required=True)
+
+    da_tracce = comandi.add_parser("istogramma", help="Istogramma delle visite da tracce registrate")
+    da_tracce.add_argument("tracce", nargs="+", help="Cartelle delle tracce (tracce.py)")
+    da_tracce.add_argument("--output", default="visite.npz", help="File dell'istogramma")
+
+    quantili = comandi.add_parser("bins", help="Bordi ai quantili di un istogramma")
+    quantili.add_argument("istogramma", help="Istogramma delle visite (.npz)")
+    quantili.add_argument("--bins", type=int, default=10, help="Bins per dimensione dello stato")
+    quantili.add_argument("--uniforme", type=float, default=0.0, help="Frazione uniforme mescolata alle visite")
+
+    migrazione = comandi.add_parser("ribina", help="Migra Q-Table esistenti sui bordi ai quantili")
+    migrazione.add_argument("istogramma", help="Istogramma delle visite (.npz)")
+    migrazione.add_argument("q_tables", nargs="+", help="File delle Q-Table (.npq o .pkl)")
+    migrazione.add_argument("--bins", type=int, default=10, help="Bins per dimensione dello stato")
+    migrazione.add_argument("--uniforme", type=float, default=0.0, help="Frazione uniforme mescolata alle visite")
+    args = parser.parse_args()
+
+    if args.comando == "istogramma":
+        istogramma = istogramma_da_tracce(args.tracce)
+        istogramma.salva(args.output)
+        print(f"[INFO] Istogramma di {istogramma.totale} osservazioni salvato in {args.output}")
+    elif args.comando == "bins":
+        print(f"[INFO] Bordi ai quantili ({args.bins} bins per dimensione):")
+        _stampa_bins(bins_quantili(args.istogramma, args.bins, args.uniforme))
+    else:
+        bins = bins_quantili(args.istogramma, args.bins, args.uniforme)
+        for path in args.q_tables:
+            ribina_file(path, bins)
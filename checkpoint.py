@@ -0,0 +1,156 @@
+"""
+Checkpoint incrementali e ripresa dell'addestramento di modello.
+
+Ogni cartella di checkpoint contiene:
+    - una base completa per ogni Q-Table (q1_g<generazione>.npq, q2_g<generazione>.npq)
+    - i delta successivi (delta_g<generazione>_<n>.npz) con i soli blocchi di stati modificati
+    - stato.pkl: episodio, epsilon, stato dei generatori casuali, storici per i grafici ed elenco
+      dei file validi. Viene scritto per ultimo e in modo atomico, quindi un'interruzione durante
+      il salvataggio lascia valido il checkpoint precedente.
+Quando i delta superano la dimensione delle tabelle viene scritta una nuova base.
+"""
+import os
+import pickle
+import time
+
+import numpy as np
+
+from qtable_storage import salva_npq, carica_npq
+
+STATO = "stato.pkl"
+
+
+def _scrittura_atomica(path, scrivi):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        scrivi(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _righe(blocchi, block_states, n_states):
+    """
+    Indici degli stati contenuti nei blocchi indicati.
+    """
+    righe = (np.asarray(blocchi, dtype=np.int64)[:, None] * block_states + np.arange(block_states)).ravel()
+    return righe[righe < n_states]
+
+
+def leggi_stato(directory):
+    """
+    Legge stato.pkl di un checkpoint, se presente.
+    :return: Dizionario dello stato o None
+    """
+    path = os.path.join(directory, STATO)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def carica_checkpoint(directory):
+    """
+    Ricostruisce le Q-Table dell'ultimo checkpoint (base + delta) e lo stato dell'addestramento.
+    :param directory: Cartella del checkpoint
+    :return: (lista di QTable, dizionario dello stato)
+    """
+    stato = leggi_stato(directory)
+    if stato is None:
+        raise FileNotFoundError(f"Nessun checkpoint in {directory}")
+
+    q_tables = [carica_npq(os.path.join(directory, nome), mmap_mode=None)[0] for nome in stato["base"]]
+    for nome in stato["deltas"]:
+        with np.load(os.path.join(directory, nome)) as delta:
+            for i, q in enumerate(q_tables):
+                righe = _righe(delta[f"blocchi{i}"], stato["block_states"], q.n_states)
+                q.values[righe] = delta[f"valori{i}"]
+    return q_tables, stato
+
+
+class Checkpointer:
+    """
+    Salva periodicamente le Q-Table e lo stato dell'addestramento, ogni every_episodes episodi
+    e/o ogni every_seconds secondi. Dopo la prima base scrive solo i blocchi modificati.
+    """
+    def __init__(self, directory, q_tables, every_episodes=None, every_seconds=None, block_states=64,
+                 start_episode=0):
+        self.directory = directory
+        self.q_tables = q_tables
+        self.every_episodes = every_episodes
+        self.every_seconds = every_seconds
+        self.block_states = block_states
+        os.makedirs(directory, exist_ok=True)
+
+        for q in q_tables:
+            q.traccia_modifiche(block_states)
+
+        # Un checkpoint precedente resta valido finché il primo salvataggio non è completato
+        precedente = leggi_stato(directory)
+        self.generazione = precedente["generazione"] if precedente else 0
+        self._da_rimuovere = precedente["base"] + precedente["deltas"] if precedente else []
+
+        self.base = None
+        self.deltas = []
+        self.byte_deltas = 0
+        self.ultimo_episodio = start_episode
+        self.ultimo_tempo = time.monotonic()
+        self.ultima_durata = 0.0
+
+    def dovuto(self, episode):
+        """
+        :param episode: Numero di episodi completati
+        :return: True se è il momento di salvare un checkpoint
+        """
+        if self.every_episodes and episode - self.ultimo_episodio >= self.every_episodes:
+            return True
+        if self.every_seconds and time.monotonic() - self.ultimo_tempo >= self.every_seconds:
+            return True
+        return False
+
+    def salva(self, episode, stato):
+        """
+        Salva un checkpoint.
+        :param episode: Numero di episodi completati (da cui riprendere)
+        :param stato: Dizionario con lo stato dell'addestramento (epsilon, generatori casuali, storici...)
+        :return: Durata del salvataggio in secondi
+        """
+        start = time.perf_counter()
+
+        if self.base is None or self.byte_deltas > sum(q.nbytes for q in self.q_tables):
+            # Nuova base completa: i file della generazione precedente si eliminano dopo il commit
+            self.generazione += 1
+            self._da_rimuovere += (self.base or []) + self.deltas
+            self.base = [f"q{i + 1}_g{self.generazione}.npq" for i in range(len(self.q_tables))]
+            for nome, q in zip(self.base, self.q_tables):
+                salva_npq(os.path.join(self.directory, nome), q)
+                q.blocchi_modificati()
+            self.deltas = []
+            self.byte_deltas = 0
+        else:
+            arrays = {}
+            for i, q in enumerate(self.q_tables):
+                blocchi = q.blocchi_modificati()
+                arrays[f"blocchi{i}"] = blocchi
+                arrays[f"valori{i}"] = q.values[_righe(blocchi, self.block_states, q.n_states)]
+                self.byte_deltas += arrays[f"valori{i}"].nbytes
+
+            nome = f"delta_g{self.generazione}_{len(self.deltas) + 1:06d}.npz"
+            _scrittura_atomica(os.path.join(self.directory, nome), lambda f: np.savez(f, **arrays))
+            self.deltas.append(nome)
+
+        stato = dict(stato, episode=episode, generazione=self.generazione, base=self.base, deltas=self.deltas,
+                     block_states=self.block_states)
+        _scrittura_atomica(os.path.join(self.directory, STATO),
+                           lambda f: pickle.dump(stato, f, protocol=pickle.HIGHEST_PROTOCOL))
+
+        for nome in self._da_rimuovere:
+            path = os.path.join(self.directory, nome)
+            if os.path.exists(path):
+                os.remove(path)
+        self._da_rimuovere = []
+
+        self.ultimo_episodio = episode
+        self.ultimo_tempo = time.monotonic()
+        self.ultima_durata = time.perf_counter() - start
+        return self.ultima_durata
@@ -0,0 +1,379 @@
+"""
+Loop di episodi compilato con Numba per l'addestramento e il test tabellare.
+
+Un'unica funzione esegue interi episodi di self-play: scelta epsilon-greedy, fisica di PongCore,
+discretizzazione (stesse tabelle del Discretizer, con il ribaltamento di process_observation_player2),
+ricompense e aggiornamenti TD, lavorando direttamente sugli array (n_stati, n_azioni) delle Q-Table.
+Se Numba non è installato la stessa funzione viene eseguita in Python puro: in quel caso usa il modulo
+random globale con la stessa sequenza di chiamate di modello e produce le stesse Q-Table.
+Con Numba il generatore casuale è quello interno di Numba (seed indipendente da random).
+"""
+import math
+import random
+
+import numpy as np
+
+from pong_core import (SCREEN_WIDTH, SCREEN_HEIGHT, PADDLE_WIDTH, PADDLE_HEIGHT, BALL_SIZE, PADDLE_SPEED,
+                       MAX_BALL_SPEED, N_ACTIONS)
+from discretizer import Discretizer
+from parallel_training import epsilon_schedule
+
+try:
+    import numba
+    JIT_DISPONIBILE = True
+    _njit = numba.njit(cache=True)
+except ImportError:
+    JIT_DISPONIBILE = False
+
+    def _njit(funzione):
+        return funzione
+
+
+def tabelle_discretizer(discretizer):
+    """
+    Impacchetta le tabelle per dimensione del Discretizer in array rettangolari (padding con inf e 0).
+    :return: (scale, k0, k1, thr, lo, hi)
+    """
+    n_dim = len(discretizer.shape)
+    lunghezza = max(len(thr) for thr in discretizer._thr)
+
+    thr = np.full((n_dim, lunghezza), np.inf)
+    lo = np.zeros((n_dim, lunghezza), dtype=np.int64)
+    hi = np.zeros((n_dim, lunghezza), dtype=np.int64)
+    for d in range(n_dim):
+        n = len(discretizer._thr[d])
+        thr[d, :n] = discretizer._thr[d]
+        lo[d, :n] = discretizer._lo[d]
+        hi[d, :n] = discretizer._hi[d]
+
+    scale = np.asarray(discretizer._scale, dtype=np.float64)
+    k0 = np.asarray(discretizer._k0, dtype=np.int64)
+    k1 = np.asarray(discretizer._k1, dtype=np.int64)
+    return scale, k0, k1, thr, lo, hi
+
+
+@_njit
+def seed(valore):
+    """
+    Inizializza il generatore casuale usato dal loop (quello di Numba, oppure random in Python puro).
+    """
+    random.seed(valore)
+
+
+@_njit
+def _overlap(ball_x, ball_y, paddle_x, paddle_y):
+    # rect_overlap con le coordinate della palla troncate a intero come pygame.Rect
+    ax = int(ball_x)
+    ay = int(ball_y)
+    return (ax < paddle_x + PADDLE_WIDTH and ay < paddle_y + PADDLE_HEIGHT and ax + BALL_SIZE > paddle_x
+            and ay + BALL_SIZE > paddle_y)
+
+
+@_njit
+def _accelera(ball_dx, ball_dy):
+    # Incremento di velocità ogni 3 tocchi (np.clip di PongCore)
+    ball_dx = min(max(ball_dx + (1 if ball_dx > 0 else -1), -MAX_BALL_SPEED), MAX_BALL_SPEED)
+    ball_dy = min(max(ball_dy + (1 if ball_dy > 0 else -1), -MAX_BALL_SPEED), MAX_BALL_SPEED)
+    return ball_dx, ball_dy
+
+
+@_njit
+def _azione_greedy(q, state):
+    # argmax sulla riga (prima azione in caso di parità, come np.argmax)
+    action = 0
+    for a in range(1, q.shape[1]):
+        if q[state, a] > q[state, action]:
+            action = a
+    return action
+
+
+@_njit
+def _aggiorna(q, state, action, reward, next_state, alpha, gamma):
+    # Stesso aggiornamento TD di QTable.update
+    max_future_q = q[next_state, 0]
+    for a in range(1, q.shape[1]):
+        if q[next_state, a] > max_future_q:
+            max_future_q = q[next_state, a]
+    current_q = q[state, action]
+    q[state, action] = current_q + alpha * (reward + gamma * max_future_q - current_q)
+
+
+@_njit
+def _episodi(q1, q2, epsilons, alpha, gamma, training, max_steps, frame_skip, scale, k0, k1, thr, lo, hi, rewards1,
+             rewards2, touches_out, lengths, truncated_out):
+    """
+    Esegue len(epsilons) episodi e scrive ricompense, tocchi, passi (decisioni) e troncamenti di ciascuno negli
+    array di uscita. Ogni decisione dura frame_skip frame; con max_steps > 0 un episodio senza punti dopo
+    max_steps frame viene troncato.
+    La discretizzazione è scritta nel loop: nelle chiamate a funzioni compilate ogni array passato come
+    argomento costa due operazioni atomiche sul contatore di riferimenti.
+    """
+    osservazioni = np.empty((2, 6))
+    stati = np.zeros(2, dtype=np.int64)
+
+    for episode in range(len(epsilons)):
+        epsilon = epsilons[episode]
+
+        # PongCore.reset
+        player1_y = (SCREEN_HEIGHT - PADDLE_HEIGHT) // 2
+        player2_y = (SCREEN_HEIGHT - PADDLE_HEIGHT) // 2
+        ball_x = float(SCREEN_WIDTH // 2)
+        ball_y = float(SCREEN_HEIGHT // 2)
+        # random.choice([-1, 1]) equivale a randrange(2) sulla stessa sequenza
+        ball_dx = float((random.randrange(2) * 2 - 1) * random.randint(2, 3))
+        ball_dy = float((random.randrange(2) * 2 - 1) * random.randint(2, 3))
+        touches = 0
+        paddle1_touched = False
+        paddle2_touched = False
+
+        done = False
+        troncato = False
+        total_reward1 = 0
+        total_reward2 = 0
+        reward_player1 = 0
+        reward_player2 = 0
+        action1 = 0
+        action2 = 0
+        state1 = 0
+        state2 = 0
+        steps = 0
+        frames = 0
+
+        while True:
+            # Osservazioni dei due player (process_observation_player1/2) e discretizzazione
+            osservazioni[0, 0] = player1_y
+            osservazioni[0, 1] = player2_y
+            osservazioni[0, 2] = ball_x
+            osservazioni[0, 3] = ball_y
+            osservazioni[0, 4] = ball_dx
+            osservazioni[0, 5] = ball_dy
+            osservazioni[1, 0] = player2_y
+            osservazioni[1, 1] = player1_y
+            osservazioni[1, 2] = SCREEN_WIDTH - ball_x
+            osservazioni[1, 3] = ball_y
+            osservazioni[1, 4] = -ball_dx
+            osservazioni[1, 5] = ball_dy
+
+            for p in range(2):
+                index = 0
+                for d in range(6):
+                    value = osservazioni[p, d]
+                    k = math.floor(value * scale[d])
+                    if k < k0[d]:
+                        k = k0[d]
+                    elif k > k1[d]:
+                        k = k1[d]
+                    k -= k0[d]
+                    if value >= thr[d, k]:
+                        index += hi[d, k]
+                    else:
+                        index += lo[d, k]
+                stati[p] = index
+
+            # Aggiornamento della transizione appena giocata (senza valore futuro se è finale per un punto)
+            if steps > 0 and training:
+                gamma_t = 0.0 if done and not troncato else gamma
+                _aggiorna(q1, state1, action1, reward_player1, stati[0], alpha, gamma_t)
+                _aggiorna(q2, state2, action2, reward_player2, stati[1], alpha, gamma_t)
+
+            state1 = stati[0]
+            state2 = stati[1]
+            if done:
+                break
+
+            # epsilon-greedy per i due player
+            if random.random() < epsilon:
+                action1 = random.randrange(N_ACTIONS)
+            else:
+                action1 = _azione_greedy(q1, state1)
+
+            if random.random() < epsilon:
+                action2 = random.randrange(N_ACTIONS)
+            else:
+                action2 = _azione_greedy(q2, state2)
+
+            # Fisica di frame_skip frame con la stessa azione (PongCore.step), fino al primo done
+            reward_player1 = 0
+            reward_player2 = 0
+            for _ in range(frame_skip):
+                # Paddle
+                if action1 == 1 and player1_y > 0:
+                    player1_y -= PADDLE_SPEED
+                if action1 == 2 and player1_y < SCREEN_HEIGHT - PADDLE_HEIGHT:
+                    player1_y += PADDLE_SPEED
+                if action2 == 1 and player2_y > 0:
+                    player2_y -= PADDLE_SPEED
+                if action2 == 2 and player2_y < SCREEN_HEIGHT - PADDLE_HEIGHT:
+                    player2_y += PADDLE_SPEED
+
+                # Palla
+                ball_x += ball_dx
+                ball_y += ball_dy
+                if ball_y <= 0 or ball_y >= SCREEN_HEIGHT - BALL_SIZE:
+                    ball_dy = -ball_dy
+
+                # Collisione paddle sinistro
+                if _overlap(ball_x, ball_y, 0, player1_y):
+                    ball_dx = -ball_dx
+                    ball_x = float(PADDLE_WIDTH)
+                    touches += 1
+                    paddle1_touched = True
+                    if touches % 3 == 0:
+                        ball_dx, ball_dy = _accelera(ball_dx, ball_dy)
+                    impact_point = (ball_y - player1_y) / PADDLE_HEIGHT
+                    ball_dy = (impact_point - 0.5) * 2 * abs(ball_dx)
+                    if impact_point < 0.15 or impact_point > 0.85:
+                        reward_player1 += 2
+                    else:
+                        reward_player1 += 1
+
+                # Collisione paddle destro
+                if _overlap(ball_x, ball_y, SCREEN_WIDTH - PADDLE_WIDTH, player2_y):
+                    ball_dx = -ball_dx
+                    ball_x = float(SCREEN_WIDTH - PADDLE_WIDTH - BALL_SIZE)
+                    touches += 1
+                    paddle2_touched = True
+                    if touches % 3 == 0:
+                        ball_dx, ball_dy = _accelera(ball_dx, ball_dy)
+                    impact_point = (ball_y - player2_y) / PADDLE_HEIGHT
+                    ball_dy = (impact_point - 0.5) * 2 * abs(ball_dx)
+                    if impact_point < 0.15 or impact_point > 0.85:
+                        reward_player2 += 2
+                    else:
+                        reward_player2 += 1
+
+                # Punti
+                if ball_x < 0:
+                    reward_player1 -= 5
+                    if paddle2_touched:
+                        reward_player2 += 1
+                    done = True
+                elif ball_x > SCREEN_WIDTH:
+                    reward_player2 -= 5
+                    if paddle1_touched:
+                        reward_player1 += 1
+                    done = True
+
+                frames += 1
+                if max_steps > 0 and frames >= max_steps and not done:
+                    done = True
+                    troncato = True
+                if done:
+                    break
+
+            total_reward1 += reward_player1
+            total_reward2 += reward_player2
+            steps += 1
+
+        rewards1[episode] = total_reward1
+        rewards2[episode] = total_reward2
+        touches_out[episode] = touches
+        lengths[episode] = steps
+        truncated_out[episode] = troncato
+
+
+def esegui_episodi(q_table_player1, q_table_player2, epsilons, alpha, gamma, discretizer, training=True,
+                   max_steps=None, frame_skip=1):
+    """
+    Esegue un blocco di episodi con il loop compilato. Le Q-Table vengono aggiornate sul posto.
+    :param q_table_player1: Array (n_stati, n_azioni) del Player 1 (ad esempio QTable.values)
+    :param q_table_player2: Array (n_stati, n_azioni) del Player 2
+    :param epsilons: Valore di epsilon per ogni episodio (il numero di episodi è len(epsilons))
+    :param alpha: Valore di alpha, learning rate
+    :param gamma: Valore di gamma, fattore di sconto
+    :param discretizer: Discretizer con cui sono indicizzate le Q-Table
+    :param training: Se True aggiorna le Q-Table, altrimenti solo test
+    :param max_steps: Se indicato, numero massimo di frame per episodio
+    :param frame_skip: Frame di fisica per ogni decisione
+    :return: Ricompense P1, ricompense P2, tocchi, passi (decisioni) e troncamenti per episodio
+    """
+    episodes = len(epsilons)
+    rewards1 = np.zeros(episodes, dtype=np.int64)
+    rewards2 = np.zeros(episodes, dtype=np.int64)
+    touches = np.zeros(episodes, dtype=np.int64)
+    lengths = np.zeros(episodes, dtype=np.int64)
+    truncated = np.zeros(episodes, dtype=np.bool_)
+
+    _episodi(np.asarray(q_table_player1), np.asarray(q_table_player2), np.asarray(epsilons, dtype=np.float64),
+             float(alpha), float(gamma), bool(training), int(max_steps or 0), int(frame_skip),
+             *tabelle_discretizer(discretizer),
+             rewards1, rewards2, touches, lengths, truncated)
+    return rewards1, rewards2, touches, lengths, truncated
+
+
+def modello_compilato(episodes, training, alpha, gamma, q_table_p1, q_table_p2, decay, discrete_bins=10, seed_jit=None,
+                      blocco=1000, max_steps=None, frame_skip=1, shared_q=False, bin_edges=None):
+    """
+    Versione compilata di modello (senza demo): stessi file in qTable/p1 e qTable/p2 e stessi grafici.
+    Gli episodi sono eseguiti a blocchi per aggiornare la barra di avanzamento e gestire CTRL+C.
+    :param episodes: Numero di episodi
+    :param training: Se True allora addestramento, altrimenti testing
+    :param alpha: Valore di alpha, learning rate
+    :param gamma: Valore di gamma, fattore di sconto
+    :param q_table_p1: Nome del file per la Q-Table del Player 1 (se esiste)
+    :param q_table_p2: Nome del file per la Q-Table del Player 2 (se esiste)
+    :param decay: Se True allora epsilon decay basato su episodi, altrimenti no
+    :param discrete_bins: Numero di bins per dimensione dello stato
+    :param seed_jit: Seed del generatore casuale del loop (se indicato)
+    :param blocco: Numero di episodi per ogni chiamata al loop compilato
+    :param max_steps: Se indicato, gli episodi senza punti dopo max_steps frame vengono troncati (non contano
+                      come vittorie)
+    :param frame_skip: Frame di fisica per ogni decisione (azione ripetuta, ricompense sommate)
+    :param shared_q: Se True i due player usano la stessa Q-Table, come in modello
+    :param bin_edges: Bordi dei bins, come in modello (None: quelli della Q-Table del Player 1 o uniformi)
+    :return: Nomi dei file delle Q-Table salvate (se in fase di addestramento)
+    """
+    from tqdm import tqdm
+    from pongAI import carica_q_table, salva_q_tables, grafici_training, grafici_testing
+    from bins_adattivi import scegli_bins
+
+    motore = "Numba" if JIT_DISPONIBILE else "Python puro"
+    print(f"[INFO] {'Addestramento' if training else 'Test'} compilato in corso ({motore})...")
+    print("-----------------------------------------------")
+
+    bins = scegli_bins(bin_edges, discrete_bins, q_table_p1, None if shared_q else q_table_p2)
+    discretizer = Discretizer(bins)
+    state_space_size = discretizer.shape
+
+    # Copy-on-write anche in test: Numba richiede array scrivibili (in test le Q-Table non vengono modificate)
+    q_table_player1 = carica_q_table(1, q_table_p1, state_space_size, N_ACTIONS)
+    q_table_player2 = q_table_player1 if shared_q else carica_q_table(2, q_table_p2, state_space_size, N_ACTIONS)
+    print("-----------------------------------------------")
+
+    if seed_jit is not None:
+        seed(seed_jit)
+
+    epsilons = epsilon_schedule(episodes, decay) if training else np.zeros(episodes)
+    q1 = q_table_player1.reshape(-1, N_ACTIONS)
+    q2 = q_table_player2.reshape(-1, N_ACTIONS)
+
+    risultati = []
+    try:
+        bar = tqdm(total=episodes, desc="[INFO] Episodi in corso", unit="episodi")
+        for inizio in range(0, episodes, blocco):
+            risultati.append(esegui_episodi(q1, q2, epsilons[inizio:inizio + blocco], alpha, gamma, discretizer,
+                                            training, max_steps, frame_skip))
+            bar.update(len(risultati[-1][0]))
+            bar.set_postfix({"Reward P1": int(risultati[-1][0][-50:].sum()),
+                             "Reward P2": int(risultati[-1][1][-50:].sum())})
+        bar.close()
+
+    except KeyboardInterrupt:
+        print("-----------------------------------------------")
+        print("[INFO] Addestramento interrotto.")
+
+    rewards1, rewards2, touches, _, truncated = (np.concatenate(r) for r in zip(*risultati)) if risultati else \
+        (np.zeros(0, dtype=np.int64),) * 5
+
+    wins_p1 = int(np.sum((rewards1 > rewards2) & ~truncated))
+    wins_p2 = int(np.sum(~truncated)) - wins_p1
+    if max_steps is not None:
+        print(f"[INFO] Episodi troncati a {max_steps} frame: {int(truncated.sum())} su {len(truncated)}")
+
+    if training:
+        q_table_filename_p1, q_table_filename_p2 = salva_q_tables(q_table_player1, q_table_player2, episodes, alpha,
+                                                                  gamma, decay, bins, frame_skip)
+        grafici_training(rewards1, rewards2, touches, wins_p1, wins_p2, episodes, alpha, gamma, decay)
+        return q_table_filename_p1, q_table_filename_p2
+    else:
+        grafici_testing(rewards1, rewards2, wins_p1, wins_p2, episodes, alpha, gamma, decay)
@@ -0,0 +1,175 @@
+import math
+import numpy as np
+
+from pong_core import SCREEN_WIDTH, SCREEN_HEIGHT, BALL_SPEED
+
+
+def crea_bins(discrete_bins):
+    """
+    Crea i bins uniformi per la discretizzazione dello stato.
+    :param discrete_bins: Numero di bins per dimensione
+    :return: Lista di 6 array di bordi, uno per dimensione
+    """
+    # (player1_y, player2_y, ball_x, ball_y, ball_dx, ball_dy)
+    return [
+        np.linspace(0, SCREEN_HEIGHT, discrete_bins),   # player1_y
+        np.linspace(0, SCREEN_HEIGHT, discrete_bins),   # player2_y
+        np.linspace(0, SCREEN_WIDTH, discrete_bins),    # ball_x
+        np.linspace(0, SCREEN_HEIGHT, discrete_bins),   # ball_y
+        np.linspace(-BALL_SPEED, BALL_SPEED, discrete_bins), # ball_dx
+        np.linspace(-BALL_SPEED, BALL_SPEED, discrete_bins), # ball_dy
+    ]
+
+
+def discretize_state(state, bins):
+    """
+    Funzione per discretizzare lo stato dell'ambiente.
+    :param state: Stato dell'ambiente
+    :param bins: Bins per la discretizzazione
+    :return: Stato discretizzato (tuple)
+    """
+
+    player1_y, player2_y, ball_x, ball_y, ball_dx, ball_dy = state
+    discrete_state = (
+        np.digitize(player1_y, bins[0]) - 1,
+        np.digitize(player2_y, bins[1]) - 1,
+        np.digitize(ball_x, bins[2]) - 1,
+        np.digitize(ball_y, bins[3]) - 1,
+        np.digitize(ball_dx, bins[4]) - 1,
+        np.digitize(ball_dy, bins[5]) - 1,
+    )
+    discrete_state = tuple(np.clip(discrete_state, 0, len(bins[0]) - 1))
+    return discrete_state
+
+
+def process_observation_player1(obs):
+    """
+    Funzione per ottenere l'osservazione per il Player 1.
+    :param obs: Osservazione dell'ambiente
+    :return: Osservazione così com'è (per il Player 1)
+    """
+
+    return obs
+
+
+def process_observation_player2(obs):
+    """
+    Funzione per ottenere l'osservazione per il Player 2.
+    :param obs: Osservazione dell'ambiente
+    :return: Osservazione ribaltata rispetto all'asse x (per il Player 2)
+    """
+
+    player1_y, player2_y, ball_x, ball_y, ball_dx, ball_dy = obs
+    # Ribaltiamo la prospettiva: consideriamo player2_y come se fosse player1_y (il suo paddle principale)
+    # e player1_y come se fosse player2_y da questa prospettiva
+    new_player1_y = player2_y
+    new_player2_y = player1_y
+
+    new_ball_x = SCREEN_WIDTH - ball_x
+    new_ball_dx = -ball_dx
+    new_ball_y = ball_y
+    new_ball_dy = ball_dy
+
+    #Restituiamo 6 valori, mantenendo la struttura (player1_y, player2_y, ball_x, ball_y, ball_dx, ball_dy)
+    return new_player1_y, new_player2_y, new_ball_x, new_ball_y, new_ball_dx, new_ball_dy
+
+
+def process_observations_player2(obs):
+    """
+    Versione vettorizzata di process_observation_player2.
+    :param obs: Array (N, 6) di osservazioni
+    :return: Nuovo array (N, 6) di osservazioni ribaltate (per il Player 2)
+    """
+    return (np.asarray(obs, dtype=np.float64)[:, [1, 0, 2, 3, 4, 5]] * [1, 1, -1, 1, -1, 1]
+            + [0, 0, SCREEN_WIDTH, 0, 0, 0])
+
+
+class Discretizer:
+    """
+    Discretizzatore a tabelle precalcolate, equivalente a discretize_state ma senza np.digitize.
+    Per ogni dimensione il campo dei valori è diviso in celle [k*w, (k+1)*w), con w potenza di 2
+    non maggiore della distanza minima tra i bordi (w = 1 per i bins attuali): per ogni cella si
+    precalcola il bin (già moltiplicato per lo stride dell'indice piatto) e l'eventuale bordo interno,
+    così ogni valore richiede un floor, un confronto e una lettura.
+    Lo stato discretizzato è un unico indice piatto, compatibile con q_table.reshape(-1, n_azioni).
+    """
+    def __init__(self, bins):
+        self.bins = [np.asarray(b, dtype=np.float64) for b in bins]
+        self.shape = tuple(len(b) for b in self.bins)
+        self.n_states = int(np.prod(self.shape))
+
+        strides = np.cumprod((1,) + self.shape[:0:-1])[::-1]
+
+        # Tabelle per dimensione: scala (1/w), prima e ultima cella, soglie e valori
+        self._scale = []
+        self._k0 = []
+        self._k1 = []
+        self._thr = []
+        self._lo = []
+        self._hi = []
+        for edges, n_bins, stride in zip(self.bins, self.shape, strides):
+            # Con w potenza di 2 la divisione è esatta e in ogni cella cade al più un bordo
+            min_spacing = np.min(np.diff(edges)) if len(edges) > 1 else 1.0
+            scale = 2.0 ** max(0, -math.floor(math.log2(min_spacing)))
+
+            k0 = math.floor(edges[0] * scale) - 1
+            k1 = math.floor(edges[-1] * scale) + 1
+            celle = np.arange(k0, k1 + 1, dtype=np.float64) / scale
+
+            # Bordi <= inizio cella (come np.digitize) e bordo eventualmente interno alla cella
+            count = np.searchsorted(edges, celle, side="right")
+            prossimo = edges[np.minimum(count, len(edges) - 1)]
+            thr = np.where((count < len(edges)) & (prossimo < celle + 1 / scale), prossimo, np.inf)
+
+            lo = np.clip(count - 1, 0, n_bins - 1) * stride
+            hi = np.clip(count, 0, n_bins - 1) * stride
+
+            self._scale.append(scale)
+            self._k0.append(k0)
+            self._k1.append(k1)
+            self._thr.append(thr)
+            self._lo.append(lo.astype(np.int64))
+            self._hi.append(hi.astype(np.int64))
+
+        # Versioni in liste Python per il percorso scalare (evitano l'overhead degli scalari NumPy)
+        self._tabelle = [
+            (scale, k0, k1, thr.tolist(), lo.tolist(), hi.tolist())
+            for scale, k0, k1, thr, lo, hi in zip(self._scale, self._k0, self._k1, self._thr, self._lo, self._hi)
+        ]
+
+    def discretize(self, state):
+        """
+        Discretizza un singolo stato.
+        :param state: Stato (player1_y, player2_y, ball_x, ball_y, ball_dx, ball_dy)
+        :return: Indice piatto dello stato discretizzato (int)
+        """
+        index = 0
+        for value, (scale, k0, k1, thr, lo, hi) in zip(state, self._tabelle):
+            k = math.floor(value * scale)
+            if k < k0:
+                k = k0
+            elif k > k1:
+                k = k1
+            k -= k0
+            index += hi[k] if value >= thr[k] else lo[k]
+        return index
+
+    def discretize_batch(self, states):
+        """
+        Discretizza un array di stati in una sola chiamata.
+        :param states: Array (N, 6) di stati
+        :return: Array (N,) di indici piatti (int64)
+        """
+        states = np.asarray(states, dtype=np.float64)
+        index = np.zeros(len(states), dtype=np.int64)
+        for d in range(len(self.shape)):
+            values = states[:, d]
+            k = np.clip(np.floor(values * self._scale[d]), self._k0[d], self._k1[d]).astype(np.int64) - self._k0[d]
+            index += np.where(values >= self._thr[d][k], self._hi[d][k], self._lo[d][k])
+        return index
+
+    def to_tuple(self, index):
+        """
+        Converte un indice piatto nella tupla di bins usata da discretize_state.
+        """
+        return tuple(int(i) for i in np.unravel_index(index, self.shape))
@@ -0,0 +1,45 @@
+"""
+Generazione dei grafici in un processo separato, con backend non interattivo (Agg).
+
+avvia restituisce subito il controllo: modello può terminare (o passare al test) mentre i grafici
+vengono salvati. I processi non sono daemon, quindi l'interprete attende la loro fine prima di uscire
+e nessun grafico va perso; attendi permette di aspettarli esplicitamente.
+"""
+import multiprocessing as mp
+
+_processi = []
+
+
+def _esegui(funzione, args, kwargs):
+    # Il backend va scelto prima di creare qualsiasi figura nel processo figlio
+    from matplotlib import pyplot as plt
+    plt.switch_backend("Agg")
+    funzione(*args, **kwargs)
+
+
+def avvia(funzione, *args, **kwargs):
+    """
+    Esegue funzione(*args, **kwargs) in un processo separato con backend Agg.
+    :return: Processo avviato
+    """
+    # fork evita di reimportare i moduli; spawn resta come alternativa (es. Windows)
+    ctx = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else "spawn")
+    processo = ctx.Process(target=_esegui, args=(funzione, args, kwargs))
+    processo.start()
+
+    _processi[:] = [p for p in _processi if p.is_alive()]
+    _processi.append(processo)
+    return processo
+
+
+def attendi():
+    """
+    Attende la fine di tutti i processi di generazione dei grafici avviati.
+    :return: True se tutti sono terminati senza errori
+    """
+    ok = True
+    for processo in _processi:
+        processo.join()
+        ok = ok and processo.exitcode == 0
+    _processi.clear()
+    return ok
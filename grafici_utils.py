@@ -1,13 +1,39 @@
+import os
 import numpy as np
 from matplotlib import pyplot as plt
 
+# Numero massimo di punti disegnati per ogni curva
+MAX_PUNTI = 10000
+
+
 # Funzione per calcolare la media mobile di una lista di dati
 def moving_average(data, window_size):
-    return [np.mean(data[i:i + window_size]) for i in range(len(data) - window_size + 1)]
+    """
+    Media mobile su finestre di window_size elementi in O(n) tramite somme cumulative.
+    Per dati interi le somme sono esatte e i risultati coincidono con np.mean su ogni finestra.
+    :return: Array di len(data) - window_size + 1 medie (vuoto se i dati sono meno della finestra)
+    """
+    data = np.asarray(data)
+    if len(data) < window_size:
+        return np.zeros(0)
+
+    dtype = np.int64 if np.issubdtype(data.dtype, np.integer) or data.dtype == bool else np.float64
+    cumsum = np.concatenate(([0], np.cumsum(data, dtype=dtype)))
+    return (cumsum[window_size:] - cumsum[:-window_size]) / window_size
+
+
+def sottocampiona(values, max_punti=MAX_PUNTI):
+    """
+    Riduce una curva a circa max_punti punti prendendone uno ogni len(values) // max_punti.
+    :return: (ascisse a partire da 1, valori)
+    """
+    passo = max(1, len(values) // max_punti)
+    asse = np.arange(1, len(values) + 1)
+    return asse[::passo], np.asarray(values)[::passo]
 
 
 # Funzione per visualizzare l'andamento delle ricompense medie nel tempo
-def avg_rewards(rewards_player1_total, rewards_player2_total, EPISODES, al, g, decay):
+def avg_rewards(rewards_player1_total, rewards_player2_total, EPISODES, al, g, decay, mostra=True):
     """
     Crea un grafico dell'andamento delle ricompense medie nel tempo.
     :param rewards_player1_total: Ricompense totali del Player 1
@@ -15,16 +41,16 @@ def avg_rewards(rewards_player1_total, rewards_player2_total, EPISODES, al, g, d
     :param EPISODES: Numero totale di episodi
     :param al: valore di alpha
     :param g: valore di gamma
+    :param mostra: Se True mostra il grafico (bloccante con backend interattivi), altrimenti lo salva soltanto
     :return: None
     """
     winsize = 200
     avg_rewards_p1 = moving_average(rewards_player1_total, winsize)
     avg_rewards_p2 = moving_average(rewards_player2_total, winsize)
 
-    episodes_axis = range(1, len(avg_rewards_p1) + 1)
     plt.figure(figsize=(10, 5))
-    plt.plot(episodes_axis, avg_rewards_p1, label='Player 1 (media mobile)')
-    plt.plot(episodes_axis, avg_rewards_p2, label='Player 2 (media mobile)')
+    plt.plot(*sottocampiona(avg_rewards_p1), label='Player 1 (media mobile)')
+    plt.plot(*sottocampiona(avg_rewards_p2), label='Player 2 (media mobile)')
     plt.xlabel(f'Blocchi di {winsize} episodi')
     plt.ylabel('Ricompensa Media')
     plt.title('Andamento dei Reward Medi nel Tempo (Training)')
@@ -37,10 +63,12 @@ def avg_rewards(rewards_player1_total, rewards_player2_total, EPISODES, al, g, d
     else:
         plt.savefig(f"grafici/Training/avg_rewards/avgRew_{EPISODES // 1000}k_alpha{al:.3f}_gamma{g:.3f}.png")
 
-    plt.show()
+    if mostra:
+        plt.show()
+    plt.close()
 
 # Funzione per visualizzare l'andamento delle ricompense medie nel tempo
-def avg_rewards_testing(rewards_player1_total, rewards_player2_total, EPISODES, al, g, winsize, decay):
+def avg_rewards_testing(rewards_player1_total, rewards_player2_total, EPISODES, al, g, winsize, decay, mostra=True):
     """
     Crea un grafico dell'andamento delle ricompense medie nel tempo.
     :param rewards_player1_total: Ricompense totali del Player 1
@@ -48,16 +76,16 @@ def avg_rewards_testing(rewards_player1_total, rewards_player2_total, EPISODES,
     :param EPISODES: Numero totale di episodi
     :param al: valore di alpha
     :param g: valore di gamma
+    :param mostra: Se True mostra il grafico (bloccante con backend interattivi), altrimenti lo salva soltanto
     :return: None
     """
 
     avg_rewards_p1 = moving_average(rewards_player1_total, winsize)
     avg_rewards_p2 = moving_average(rewards_player2_total, winsize)
 
-    episodes_axis = range(1, len(avg_rewards_p1) + 1)
     plt.figure(figsize=(10, 5))
-    plt.plot(episodes_axis, avg_rewards_p1, label='Player 1 (media mobile)')
-    plt.plot(episodes_axis, avg_rewards_p2, label='Player 2 (media mobile)')
+    plt.plot(*sottocampiona(avg_rewards_p1), label='Player 1 (media mobile)')
+    plt.plot(*sottocampiona(avg_rewards_p2), label='Player 2 (media mobile)')
     plt.xlabel(f'Blocchi di {winsize} episodi')
     plt.ylabel('Ricompensa Media')
     plt.title('Andamento dei Reward Medi nel Tempo (Testing)')
@@ -71,10 +99,12 @@ def avg_rewards_testing(rewards_player1_total, rewards_player2_total, EPISODES,
     else:
         plt.savefig(f"grafici/Testing/avg_rewards_testing/testing_{EPISODES}k_alpha{al:.3f}_gamma{g:.3f} ({winsize}).png")
 
-    plt.show()
+    if mostra:
+        plt.show()
+    plt.close()
 
 # Funzione per analizzare la percentuale di vittorie di un giocatore
-def win_percentage(wins_player1, wins_player2, EPISODES, al, g, testing, decay):
+def win_percentage(wins_player1, wins_player2, EPISODES, al, g, testing, decay, mostra=True):
     """
     Crea un grafico a torta per visualizzare la percentuale di vittorie tra i due giocatori.
     :param wins_player1: Totale delle vittorie del Player 1
@@ -82,6 +112,7 @@ def win_percentage(wins_player1, wins_player2, EPISODES, al, g, testing, decay):
     :param EPISODES: Numero totale di episodi
     :param al: Valore di alpha
     :param g: Valore di gamma
+    :param mostra: Se True mostra il grafico (bloccante con backend interattivi), altrimenti lo salva soltanto
     :return: None
     """
 
@@ -134,9 +165,11 @@ def win_percentage(wins_player1, wins_player2, EPISODES, al, g, testing, decay):
         else:
             plt.savefig(f"grafici/Training/win_percentage/TRAINING_winPerc_{EPISODES // 1000}k_alpha{al:.3f}_gamma{g:.3f}.png")
 
-    plt.show()
+    if mostra:
+        plt.show()
+    plt.close()
 
-def plot_touches(touches_total, EPISODES, al, g, window_size, decay):
+def plot_touches(touches_total, EPISODES, al, g, window_size, decay, mostra=True):
     """
     Crea un grafico dell'andamento degli scambi medi nel tempo.
     :param touches_total: Numero totale di tocchi per episodio
@@ -144,14 +177,14 @@ def plot_touches(touches_total, EPISODES, al, g, window_size, decay):
     :param al: Valore di alpha
     :param g: Valore di gamma
     :param window_size: Dimensione della finestra per la media mobile
+    :param mostra: Se True mostra il grafico (bloccante con backend interattivi), altrimenti lo salva soltanto
     :return: None
     """
 
     avg_touches = moving_average(touches_total, window_size)  # Calcola la media mobile
-    episodes_axis = range(1, len(avg_touches) + 1)
 
     plt.figure(figsize=(10, 5))
-    plt.plot(episodes_axis, avg_touches, label=f'Media scambi (finestra={window_size})', color='green')
+    plt.plot(*sottocampiona(avg_touches), label=f'Media scambi (finestra={window_size})', color='green')
     plt.xlabel('Blocchi di episodi')
     plt.ylabel('Scambi Medi')
     plt.title('Andamento degli Scambi Medi nel Tempo')
@@ -162,23 +195,82 @@ def plot_touches(touches_total, EPISODES, al, g, window_size, decay):
         plt.savefig(f"grafici/Training/avg_touches/avgTouch_{EPISODES // 1000}k_alpha{al:.3f}_gamma{g:.3f}_decayEpisodico.png")
     else:
         plt.savefig(f"grafici/Training/avg_touches/avgTouch_{EPISODES // 1000}k_alpha{al:.3f}_gamma{g:.3f}.png")
-    plt.show()
+    if mostra:
+        plt.show()
+    plt.close()
 
-def plot_epsilon_decay(epsilon_history, EPISODES, al, g):
+def plot_epsilon_decay(epsilon_history, EPISODES, al, g, mostra=True):
     """
     Crea un grafico dell'andamento del decadimento di epsilon.
     :param epsilon_history: Storico dei valori di epsilon
     :param EPISODES: Numero totale di episodi
     :param al: Valore di alpha
     :param g: Valore di gamma
+    :param mostra: Se True mostra il grafico (bloccante con backend interattivi), altrimenti lo salva soltanto
     :return: None
     """
 
     plt.figure(figsize=(10, 5))
-    plt.plot(range(1, len(epsilon_history) + 1), epsilon_history, label='Valore di Epsilon', color='red')
+    plt.plot(*sottocampiona(epsilon_history), label='Valore di Epsilon', color='red')
     plt.xlabel('Episodi')
     plt.ylabel('Epsilon')
     plt.title('Andamento del Decadimento di Epsilon')
     plt.legend()
     plt.savefig(f"grafici/epsilon_decay/epsDec_{EPISODES // 1000}k_alpha{al:.3f}_gamma{g:.3f}.png")
-    plt.show()
+    if mostra:
+        plt.show()
+    plt.close()
+
+
+def report_combinato(rewards_player1_total, rewards_player2_total, touches_total, wins_player1, wins_player2,
+                     EPISODES, al, g, testing, decay, mostra=True):
+    """
+    Crea un unico report con più pannelli: ricompense medie, scambi medi (solo training) e percentuale di vittorie.
+    Viene salvato in grafici/Training/report o grafici/Testing/report.
+    :param touches_total: Numero di tocchi per episodio (None in testing)
+    :param testing: Se True report del testing, altrimenti del training
+    :param mostra: Se True mostra il grafico, altrimenti lo salva soltanto
+    :return: Percorso del file salvato
+    """
+    winsize = 100 if testing else 200
+    pannelli = 2 if touches_total is None else 3
+    fig, axes = plt.subplots(1, pannelli, figsize=(6 * pannelli, 5))
+
+    ax = axes[0]
+    ax.plot(*sottocampiona(moving_average(rewards_player1_total, winsize)), label='Player 1 (media mobile)')
+    ax.plot(*sottocampiona(moving_average(rewards_player2_total, winsize)), label='Player 2 (media mobile)')
+    ax.set_xlabel(f'Blocchi di {winsize} episodi')
+    ax.set_ylabel('Ricompensa Media')
+    ax.set_title('Andamento dei Reward Medi')
+    ax.legend()
+
+    if touches_total is not None:
+        ax = axes[1]
+        ax.plot(*sottocampiona(moving_average(touches_total, 300)), label='Media scambi (finestra=300)', color='green')
+        ax.set_xlabel('Blocchi di episodi')
+        ax.set_ylabel('Scambi Medi')
+        ax.set_title('Andamento degli Scambi Medi')
+        ax.legend()
+
+    ax = axes[-1]
+    total_episodes = max(1, wins_player1 + wins_player2)
+    ax.pie([wins_player1 / total_episodes, wins_player2 / total_episodes],
+           labels=[f'Player 1\n{wins_player1} vittorie', f'Player 2\n{wins_player2} vittorie'], autopct='%1.1f%%',
+           startangle=90, colors=['#1f77b4', '#ff7f0e'], explode=(0.1, 0), pctdistance=0.85)
+    ax.add_artist(plt.Circle((0, 0), 0.70, fc='white'))
+    ax.set_title('Percentuale di Vittorie')
+
+    fase = "Testing" if testing else "Training"
+    fig.suptitle(f'{fase}: {EPISODES} episodi, alpha {al:.3f}, gamma {g:.3f}{", decay episodico" if decay else ""}')
+    fig.tight_layout()
+
+    cartella = f"grafici/{fase}/report"
+    os.makedirs(cartella, exist_ok=True)
+    suffisso = "_decayEpisodico" if decay else ""
+    path = f"{cartella}/{fase.upper()}_report_{EPISODES // 1000}k_alpha{al:.3f}_gamma{g:.3f}{suffisso}.png"
+    fig.savefig(path)
+
+    if mostra:
+        plt.show()
+    plt.close(fig)
+    return path
@@ -14,12 +14,41 @@ def main():
     print("[INFO] Inizio training...")
     name1, name2 = modello(episodes_train, True, alpha, gamma, "nulla", "nulla", False, decay_ep)
 
+    #Training parallelo su tutti i core (stessi file in qTable e stessi grafici)
+    #from parallel_training import modello_parallelo
+    #name1, name2 = modello_parallelo(episodes_train, alpha, gamma, "nulla", "nulla", decay_ep)
+
+    #Training con il loop compilato (Numba, se installato)
+    #from compiled_training import modello_compilato
+    #name1, name2 = modello_compilato(episodes_train, True, alpha, gamma, "nulla", "nulla", decay_ep)
+
+    #Training con una sola Q-Table condivisa dai due player (metà memoria, due aggiornamenti per passo)
+    #name1, name2 = modello(episodes_train, True, alpha, gamma, "nulla", "nulla", False, decay_ep, shared_q=True)
+
+    #Training registrando la traccia, poi nuovo addestramento offline dalla traccia con altri alpha e gamma
+    #name1, name2 = modello(episodes_train, True, alpha, gamma, "nulla", "nulla", False, decay_ep,
+    #                       record_trace="tracce/training")
+    #from offline_training import modello_offline
+    #name1, name2 = modello_offline("tracce/training", 0.05, 0.95, sweeps=5)
+
+    #Training raccogliendo le visite degli stati, poi nuovo training con bins ai quantili delle visite
+    #modello(episodes_train, True, alpha, gamma, "nulla", "nulla", False, decay_ep, visit_stats="visite.npz")
+    #name1, name2 = modello(episodes_train, True, alpha, gamma, "nulla", "nulla", False, decay_ep,
+    #                       bin_edges="visite.npz")
+
     print("[INFO] Training completato. Inizio testing...")
     modello(episodes_test, False, alpha, gamma, name1, name2, False, decay_ep)
 
+    #Valutazione greedy veloce su più processi (senza grafici)
+    #from valutazione import valuta, stampa
+    #stampa(valuta(name1, name2, episodes_test))
+
     #Demo
     #modello(10, False, 0,0, "", "", True, False)
 
+    #Demo con la finestra in un processo separato (simulazione alla massima velocità) e registrazione delle partite
+    #modello(10, False, 0,0, "", "", True, False, render_async=True, record_frames="demo.npy")
+
     print("[INFO] Processo completato.")
 
 if __name__ == "__main__":
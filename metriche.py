@@ -0,0 +1,105 @@
+import numpy as np
+
+
+class MetricheEpisodi:
+    """
+    Accumulatore delle metriche per episodio (ricompense, tocchi, epsilon, passi e vittorie) su array NumPy
+    preallocati al posto delle liste Python di modello. Le somme sulla finestra degli ultimi episodi
+    (usate dalla barra di avanzamento) sono aggiornate in O(1) a ogni episodio.
+    Gli episodi troncati (limite di passi raggiunto senza punti) non contano come vittorie.
+    """
+    def __init__(self, episodes, finestra=50):
+        """
+        :param episodes: Numero massimo di episodi (dimensione degli array)
+        :param finestra: Numero di episodi della finestra per le somme correnti
+        """
+        self.capacita = episodes
+        self.finestra = finestra
+        self._rewards1 = np.zeros(episodes, dtype=np.int32)
+        self._rewards2 = np.zeros(episodes, dtype=np.int32)
+        self._touches = np.zeros(episodes, dtype=np.int32)
+        self._epsilon = np.zeros(episodes, dtype=np.float32)
+        self._lengths = np.zeros(episodes, dtype=np.int32)
+        self._truncated = np.zeros(episodes, dtype=bool)
+        self.n = 0
+
+        self.wins_p1 = 0
+        self.wins_p2 = 0
+        self.troncati = 0
+        self.somma_reward1 = 0
+        self.somma_reward2 = 0
+
+    def aggiungi(self, reward1, reward2, touches, epsilon, length=0, truncated=False):
+        """
+        Registra un episodio.
+        :param reward1: Ricompensa totale del Player 1
+        :param reward2: Ricompensa totale del Player 2
+        :param touches: Numero di tocchi dell'episodio
+        :param epsilon: Valore di epsilon al termine dell'episodio
+        :param length: Numero di passi dell'episodio
+        :param truncated: True se l'episodio è stato troncato dal limite di passi
+        """
+        n = self.n
+        self._rewards1[n] = reward1
+        self._rewards2[n] = reward2
+        self._touches[n] = touches
+        self._epsilon[n] = epsilon
+        self._lengths[n] = length
+        self._truncated[n] = truncated
+        self.n = n + 1
+
+        # Somme sulla finestra: entra l'episodio corrente, esce quello di finestra episodi fa
+        self.somma_reward1 += reward1
+        self.somma_reward2 += reward2
+        if n >= self.finestra:
+            self.somma_reward1 -= int(self._rewards1[n - self.finestra])
+            self.somma_reward2 -= int(self._rewards2[n - self.finestra])
+
+        if truncated:
+            self.troncati += 1
+        elif reward1 > reward2:
+            self.wins_p1 += 1
+        else:
+            self.wins_p2 += 1
+
+    @property
+    def rewards_player1(self):
+        return self._rewards1[:self.n]
+
+    @property
+    def rewards_player2(self):
+        return self._rewards2[:self.n]
+
+    @property
+    def touches(self):
+        return self._touches[:self.n]
+
+    @property
+    def epsilon_history(self):
+        return self._epsilon[:self.n]
+
+    @property
+    def lengths(self):
+        return self._lengths[:self.n]
+
+    @property
+    def truncated(self):
+        return self._truncated[:self.n]
+
+    def __len__(self):
+        return self.n
+
+    def __getstate__(self):
+        # Nei checkpoint si salvano solo gli episodi registrati
+        stato = dict(self.__dict__)
+        for nome in ("_rewards1", "_rewards2", "_touches", "_epsilon", "_lengths", "_truncated"):
+            stato[nome] = stato[nome][:self.n].copy()
+        return stato
+
+    def __setstate__(self, stato):
+        self.__dict__.update(stato)
+        for nome in ("_rewards1", "_rewards2", "_touches", "_epsilon", "_lengths", "_truncated"):
+            valori = stato[nome]
+            array = np.zeros(self.capacita, dtype=valori.dtype)
+            array[:len(valori)] = valori
+            setattr(self, nome, array)
@@ -0,0 +1,138 @@
+"""
+Addestramento offline delle Q-Table da tracce registrate (tracce.py), senza simulare.
+
+Le tracce vengono lette a blocchi di record: per ogni blocco le osservazioni sono discretizzate una volta sola
+per player (per il Player 2 dopo il ribaltamento di process_observation_player2), ogni record non finale forma
+una transizione con il successivo e le transizioni vengono applicate in ordine, a mini-batch, con
+l'aggiornamento TD vettorizzato di QTable. Più passate (sweeps) sugli stessi dati riportano i valori verso il
+punto fisso di Q-learning per i nuovi alpha e gamma. Le Q-Table sono salvate in qTable/p1 e qTable/p2 come quelle
+di modello, con il suffisso _offline.
+
+Esempio:
+    python offline_training.py tracce/120k --alpha 0.05 --gamma 0.95 --sweeps 5
+"""
+import argparse
+import time
+
+import numpy as np
+
+from bins_adattivi import scegli_bins
+from discretizer import Discretizer, process_observations_player2
+from pong_core import N_ACTIONS
+from qtable import QTable
+from tracce import DONE, FINALE, TRONCATO, Traccia
+
+
+def transizioni(records, discretizer, osservazioni):
+    """
+    Transizioni dei due player in un blocco di record di una traccia.
+    :param records: Blocco di record (Traccia.blocchi)
+    :param discretizer: Discretizer delle Q-Table
+    :param osservazioni: Osservazioni dei record in pixel (Traccia.osservazioni)
+    :return: Per ogni player (stati, azioni, ricompense, stati successivi, terminali)
+    """
+    flag = records["flag"][:-1]
+    validi = flag & FINALE == 0
+    # Come in modello, solo un punto è terminale: dopo un troncamento si usa ancora il valore futuro
+    terminali = (flag[validi] & (DONE | TRONCATO)) == DONE
+
+    risultato = []
+    for player, obs in ((1, osservazioni), (2, process_observations_player2(osservazioni))):
+        stati = discretizer.discretize_batch(obs)
+        risultato.append((stati[:-1][validi], records["azioni"][:-1, player - 1][validi],
+                          records["ricompense"][:-1, player - 1][validi].astype(np.float64), stati[1:][validi],
+                          terminali))
+    return risultato
+
+
+def modello_offline(tracce, alpha, gamma, q_table_p1="nulla", q_table_p2="nulla", sweeps=1, discrete_bins=10,
+                    batch_size=4096, record_per_blocco=1 << 20, shared_experience=False, seed=None, bin_edges=None):
+    """
+    Addestra le Q-Table dei due player dalle transizioni registrate in una o più tracce.
+    :param tracce: Cartella di una traccia o lista di cartelle
+    :param alpha: Valore di alpha, learning rate
+    :param gamma: Valore di gamma, fattore di sconto
+    :param q_table_p1: Nome del file per la Q-Table del Player 1 da cui partire (se esiste)
+    :param q_table_p2: Nome del file per la Q-Table del Player 2 da cui partire (se esiste)
+    :param sweeps: Passate complete sulle tracce
+    :param discrete_bins: Numero di bins per dimensione dello stato
+    :param batch_size: Transizioni per aggiornamento TD vettorizzato (1 equivale all'aggiornamento online;
+                       con batch più grandi le transizioni della stessa coppia stato-azione sono mediate)
+    :param record_per_blocco: Record letti e discretizzati per volta
+    :param shared_experience: Se True ogni player impara anche dalle transizioni dell'avversario (ribaltate nella
+                              sua prospettiva), con il doppio dei dati per player
+    :param seed: Seed dell'inizializzazione casuale delle Q-Table che non esistono
+    :param bin_edges: Bordi dei bins, come in modello (es. l'istogramma delle visite ricavato dalle stesse tracce
+                      con bins_adattivi.istogramma_da_tracce)
+    :return: Nomi dei file delle Q-Table salvate
+    """
+    from pongAI import carica_q_table, salva_q_tables
+
+    tracce = [Traccia(path) for path in ([tracce] if isinstance(tracce, str) else tracce)]
+    frame_skip = {traccia.header.get("frame_skip", 1) for traccia in tracce}
+    if len(frame_skip) != 1:
+        raise ValueError(f"Tracce registrate con frame_skip diversi: {sorted(frame_skip)}")
+    frame_skip = frame_skip.pop()
+    episodes = sum(len(traccia) for traccia in tracce)
+
+    print(f"[INFO] Addestramento offline da {len(tracce)} tracce: {episodes} episodi, "
+          f"{sum(traccia.record for traccia in tracce)} record")
+    print("-----------------------------------------------")
+
+    bins = scegli_bins(bin_edges, discrete_bins, q_table_p1, q_table_p2)
+    discretizer = Discretizer(bins)
+    state_space_size = discretizer.shape
+    rng = np.random.RandomState(seed) if seed is not None else None
+    q_tables = (QTable(carica_q_table(1, q_table_p1, state_space_size, N_ACTIONS, rng=rng)),
+                QTable(carica_q_table(2, q_table_p2, state_space_size, N_ACTIONS, rng=rng)))
+    print("-----------------------------------------------")
+
+    try:
+        for sweep in range(sweeps):
+            start = time.perf_counter()
+            n_transizioni = 0
+            errori = np.zeros(2)
+            for traccia in tracce:
+                for records in traccia.blocchi(record_per_blocco):
+                    dati = transizioni(records, discretizer, traccia.osservazioni(records))
+                    if shared_experience:
+                        dati = [tuple(np.concatenate(coppia) for coppia in zip(*dati))] * 2
+                    for player, (q, (states, actions, rewards, next_states, dones)) in enumerate(zip(q_tables, dati)):
+                        for i in range(0, len(states), batch_size):
+                            sl = slice(i, i + batch_size)
+                            errori[player] += np.abs(q.td_update(states[sl], actions[sl], rewards[sl],
+                                                                 next_states[sl], alpha, gamma, dones[sl])).sum()
+                    n_transizioni += len(dati[0][0])
+
+            durata = time.perf_counter() - start
+            media = errori / max(n_transizioni, 1)
+            print(f"[INFO] Sweep {sweep + 1}/{sweeps}: {n_transizioni:,} transizioni per player in {durata:.1f} s "
+                  f"({n_transizioni / durata:,.0f}/s), |TD| medio P1 {media[0]:.4f}, P2 {media[1]:.4f}")
+
+    except KeyboardInterrupt:
+        print("-----------------------------------------------")
+        print("[INFO] Addestramento offline interrotto.")
+
+    return salva_q_tables(q_tables[0], q_tables[1], episodes, alpha, gamma, False, bins, frame_skip, offline=True,
+                          sweeps=sweeps)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Addestramento offline delle Q-Table da tracce registrate")
+    parser.add_argument("tracce", nargs="+", help="Cartelle delle tracce (tracce.py)")
+    parser.add_argument("--alpha", type=float, default=0.1, help="Learning rate")
+    parser.add_argument("--gamma", type=float, default=0.99, help="Fattore di sconto")
+    parser.add_argument("--sweeps", type=int, default=1, help="Passate complete sulle tracce")
+    parser.add_argument("--bins", type=int, default=10, help="Bins per dimensione dello stato")
+    parser.add_argument("--batch", type=int, default=4096, help="Transizioni per aggiornamento TD")
+    parser.add_argument("--q-table-p1", default="nulla", help="Q-Table iniziale del Player 1 (in qTable/p1)")
+    parser.add_argument("--q-table-p2", default="nulla", help="Q-Table iniziale del Player 2 (in qTable/p2)")
+    parser.add_argument("--condividi", action="store_true",
+                        help="Ogni player impara anche dalle transizioni dell'avversario")
+    parser.add_argument("--seed", type=int, default=None, help="Seed dell'inizializzazione delle Q-Table")
+    parser.add_argument("--istogramma", default=None,
+                        help="Istogramma delle visite (.npz) per bins ai quantili (bins_adattivi.py)")
+    args = parser.parse_args()
+
+    modello_offline(args.tracce, args.alpha, args.gamma, args.q_table_p1, args.q_table_p2, args.sweeps, args.bins,
+                    args.batch, shared_experience=args.condividi, seed=args.seed, bin_edges=args.istogramma)
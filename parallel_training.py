@@ -0,0 +1,282 @@
+import multiprocessing as mp
+import random
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from pong_core import PongCore, N_ACTIONS
+from discretizer import Discretizer, crea_bins, process_observation_player1, process_observation_player2
+from qtable import QTable
+
+
+def epsilon_schedule(episodes, decay, epsilon_min=0.05):
+    """
+    Calcola il valore di epsilon all'inizio di ogni episodio, come in modello.
+    :param episodes: Numero di episodi
+    :param decay: Se True allora epsilon decay basato su episodi, altrimenti decay fisso 0.999
+    :param epsilon_min: Valore minimo di epsilon
+    :return: Array (episodes,) dei valori di epsilon
+    """
+    epsilon = 1.0
+    if decay:
+        epsilon_decay = (epsilon_min / epsilon) ** (1 / episodes)
+    else:
+        epsilon_decay = 0.999
+
+    schedule = np.empty(episodes)
+    for episode in range(episodes):
+        schedule[episode] = epsilon
+        if epsilon > epsilon_min:
+            epsilon *= epsilon_decay
+    return schedule
+
+
+def worker_seeds(seed, n_workers):
+    """
+    Schema di seed deterministico: ogni worker riceve due seed indipendenti derivati da seed,
+    uno per l'ambiente (reset della palla) e uno per l'esplorazione epsilon-greedy.
+    :return: Lista di coppie (seed_env, seed_esplorazione)
+    """
+    return [tuple(int(x) for x in child.generate_state(2)) for child in np.random.SeedSequence(seed).spawn(n_workers)]
+
+
+def _crea_shared_array(shape, dtype):
+    shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize))
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _apri_shared_array(name, shape, dtype):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _worker(worker_id, n_workers, episodes, alpha, gamma, decay, bins, seeds, nomi, q_shape, max_steps=None):
+    """
+    Processo worker: gioca gli episodi worker_id, worker_id + n_workers, ... aggiornando
+    le Q-Table condivise senza lock (stile Hogwild).
+    """
+    blocchi = [
+        _apri_shared_array(nomi["q1"], q_shape, np.float64),
+        _apri_shared_array(nomi["q2"], q_shape, np.float64),
+        _apri_shared_array(nomi["rewards1"], (episodes,), np.int64),
+        _apri_shared_array(nomi["rewards2"], (episodes,), np.int64),
+        _apri_shared_array(nomi["touches"], (episodes,), np.int64),
+        _apri_shared_array(nomi["truncated"], (episodes,), np.bool_),
+        _apri_shared_array(nomi["progress"], (n_workers,), np.int64),
+    ]
+    shms = [shm for shm, _ in blocchi]
+    q_table_player1, q_table_player2, rewards1, rewards2, touches, truncated, progress = \
+        [array for _, array in blocchi]
+    del blocchi
+    q_player1 = QTable(q_table_player1)
+    q_player2 = QTable(q_table_player2)
+
+    try:
+        seed_env, seed_esplorazione = seeds
+        rng = random.Random(seed_esplorazione)
+
+        env = PongCore(max_steps, seed=seed_env)
+        discretizer = Discretizer(bins)
+        epsilons = epsilon_schedule(episodes, decay)
+
+        for episode in range(worker_id, episodes, n_workers):
+            epsilon = epsilons[episode]
+            obs = env.reset()
+
+            discrete_state1 = discretizer.discretize(process_observation_player1(obs))
+            discrete_state2 = discretizer.discretize(process_observation_player2(obs))
+
+            done = False
+            total_reward1 = 0
+            total_reward2 = 0
+
+            while not done:
+                # epsilon-greedy per i due player
+                if rng.uniform(0, 1) < epsilon:
+                    action1 = rng.randrange(N_ACTIONS)
+                else:
+                    action1 = q_player1.greedy_action(discrete_state1)
+
+                if rng.uniform(0, 1) < epsilon:
+                    action2 = rng.randrange(N_ACTIONS)
+                else:
+                    action2 = q_player2.greedy_action(discrete_state2)
+
+                next_obs, (reward_player1, reward_player2), done, _ = env.step(action1, action2)
+                total_reward1 += reward_player1
+                total_reward2 += reward_player2
+
+                discrete_next_state1 = discretizer.discretize(process_observation_player1(next_obs))
+                discrete_next_state2 = discretizer.discretize(process_observation_player2(next_obs))
+
+                # Aggiornamenti senza lock sulle Q-Table condivise (senza valore futuro dopo un punto)
+                terminale = done and not env.truncated
+                q_player1.update(discrete_state1, action1, reward_player1, discrete_next_state1, alpha, gamma,
+                                 terminale)
+                q_player2.update(discrete_state2, action2, reward_player2, discrete_next_state2, alpha, gamma,
+                                 terminale)
+
+                discrete_state1 = discrete_next_state1
+                discrete_state2 = discrete_next_state2
+
+            rewards1[episode] = total_reward1
+            rewards2[episode] = total_reward2
+            truncated[episode] = env.truncated
+            touches[episode] = env.touches
+            progress[worker_id] += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Gli array vanno rilasciati prima di chiudere la shared memory
+        del q_player1, q_player2
+        del q_table_player1, q_table_player2, rewards1, rewards2, touches, truncated, progress
+        for shm in shms:
+            shm.close()
+
+
+def addestra_parallelo(episodes, alpha, gamma, q_table_player1, q_table_player2, decay, n_workers=None, seed=0,
+                       discrete_bins=10, mostra_progresso=True, max_steps=None, bins=None):
+    """
+    Addestra le due Q-Table con n_workers processi che condividono le tabelle in shared memory.
+    Le Q-Table passate vengono aggiornate sul posto.
+    :param episodes: Numero di episodi totali
+    :param alpha: Valore di alpha, learning rate
+    :param gamma: Valore di gamma, fattore di sconto
+    :param q_table_player1: Q-Table iniziale del Player 1
+    :param q_table_player2: Q-Table iniziale del Player 2
+    :param decay: Se True allora epsilon decay basato su episodi, altrimenti no
+    :param n_workers: Numero di processi (default: numero di core)
+    :param seed: Seed da cui derivare i seed dei worker
+    :param discrete_bins: Numero di bins per dimensione (bins uniformi, se bins non è indicato)
+    :param mostra_progresso: Se True mostra la barra di avanzamento
+    :param max_steps: Se indicato, numero massimo di passi per episodio
+    :param bins: Bordi dei bins delle Q-Table (default: crea_bins(discrete_bins))
+    :return: Ricompense P1, ricompense P2, tocchi e troncamenti per episodio (array ordinati per episodio)
+    :raise RuntimeError: Se un worker termina con un errore (gli episodi giocati non sono completi)
+    """
+    n_workers = n_workers or mp.cpu_count()
+    q_shape = q_table_player1.shape
+    if bins is None:
+        bins = crea_bins(discrete_bins)
+    if int(np.prod(q_shape[:-1])) != Discretizer(bins).n_states:
+        raise ValueError(f"Q-Table di forma {q_shape} non compatibile con bins {[len(b) for b in bins]}")
+
+    shm_q1, q1 = _crea_shared_array(q_shape, np.float64)
+    shm_q2, q2 = _crea_shared_array(q_shape, np.float64)
+    shm_r1, rewards1 = _crea_shared_array((episodes,), np.int64)
+    shm_r2, rewards2 = _crea_shared_array((episodes,), np.int64)
+    shm_t, touches = _crea_shared_array((episodes,), np.int64)
+    shm_tr, truncated = _crea_shared_array((episodes,), np.bool_)
+    shm_p, progress = _crea_shared_array((n_workers,), np.int64)
+    blocchi = [shm_q1, shm_q2, shm_r1, shm_r2, shm_t, shm_tr, shm_p]
+
+    q1[:] = q_table_player1
+    q2[:] = q_table_player2
+    rewards1[:] = 0
+    rewards2[:] = 0
+    touches[:] = -1  # -1 = episodio non ancora giocato
+    truncated[:] = False
+    progress[:] = 0
+
+    nomi = {"q1": shm_q1.name, "q2": shm_q2.name, "rewards1": shm_r1.name, "rewards2": shm_r2.name,
+            "touches": shm_t.name, "truncated": shm_tr.name, "progress": shm_p.name}
+
+    # fork evita di reimportare i moduli nei worker; spawn resta come alternativa (es. Windows)
+    ctx = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else "spawn")
+    processi = [
+        ctx.Process(target=_worker, args=(i, n_workers, episodes, alpha, gamma, decay, bins, seeds, nomi, q_shape,
+                                          max_steps))
+        for i, seeds in enumerate(worker_seeds(seed, n_workers))
+    ]
+
+    try:
+        for p in processi:
+            p.start()
+
+        if mostra_progresso:
+            from tqdm import tqdm
+            bar = tqdm(total=episodes, desc=f"[INFO] Episodi in corso ({n_workers} worker)", unit="episodi")
+        while any(p.is_alive() for p in processi):
+            time.sleep(0.2)
+            if mostra_progresso:
+                bar.update(int(progress.sum()) - bar.n)
+        if mostra_progresso:
+            bar.update(int(progress.sum()) - bar.n)
+            bar.close()
+
+    except KeyboardInterrupt:
+        print("-----------------------------------------------")
+        print("[INFO] Addestramento interrotto.")
+
+    finally:
+        for p in processi:
+            p.join()
+        # Un worker interrotto da CTRL+C termina normalmente; exitcode diverso da 0 = eccezione o segnale
+        falliti = {i: p.exitcode for i, p in enumerate(processi) if p.exitcode not in (0, None)}
+
+        q_table_player1[:] = q1
+        q_table_player2[:] = q2
+        giocati = touches >= 0
+        risultati = (rewards1[giocati], rewards2[giocati], touches[giocati], truncated[giocati])
+
+        del q1, q2, rewards1, rewards2, touches, truncated, progress, giocati
+        for shm in blocchi:
+            shm.close()
+            shm.unlink()
+
+    if falliti:
+        raise RuntimeError(f"Addestramento parallelo incompleto: worker terminati con errore (worker: exitcode) "
+                           f"{falliti}")
+
+    # Con un'interruzione gli episodi non giocati restano esclusi dai risultati
+    return risultati
+
+
+def modello_parallelo(episodes, alpha, gamma, q_table_p1, q_table_p2, decay, n_workers=None, seed=0, max_steps=None,
+                      discrete_bins=10, bin_edges=None):
+    """
+    Versione parallela dell'addestramento di modello: stessi file in qTable/p1 e qTable/p2 e stessi grafici.
+    :param episodes: Numero di episodi
+    :param alpha: Valore di alpha, learning rate
+    :param gamma: Valore di gamma, fattore di sconto
+    :param q_table_p1: Nome del file per la Q-Table del Player 1 (se esiste)
+    :param q_table_p2: Nome del file per la Q-Table del Player 2 (se esiste)
+    :param decay: Se True allora epsilon decay basato su episodi, altrimenti no
+    :param n_workers: Numero di processi (default: numero di core)
+    :param seed: Seed per l'inizializzazione delle Q-Table e dei worker
+    :param max_steps: Se indicato, gli episodi senza punti dopo max_steps passi vengono troncati (non contano
+                      come vittorie)
+    :param discrete_bins: Numero di bins per dimensione dello stato
+    :param bin_edges: Bordi dei bins, come in modello (None: quelli della Q-Table del Player 1 o uniformi)
+    :return: Nomi dei file delle Q-Table salvate
+    """
+    # Import qui per non caricare matplotlib nei worker
+    from pongAI import carica_q_table, salva_q_tables, grafici_training
+    from bins_adattivi import scegli_bins
+
+    bins = scegli_bins(bin_edges, discrete_bins, q_table_p1, q_table_p2)
+    state_space_size = tuple(len(b) for b in bins)
+
+    print("[INFO] Addestramento parallelo in corso...")
+    print("-----------------------------------------------")
+
+    np.random.seed(seed)
+    q_table_player1 = carica_q_table(1, q_table_p1, state_space_size, N_ACTIONS)
+    q_table_player2 = carica_q_table(2, q_table_p2, state_space_size, N_ACTIONS)
+    print("-----------------------------------------------")
+
+    rewards1, rewards2, touches, truncated = addestra_parallelo(episodes, alpha, gamma, q_table_player1,
+                                                                q_table_player2, decay, n_workers, seed,
+                                                                max_steps=max_steps, bins=bins)
+
+    wins_p1 = int(np.sum((rewards1 > rewards2) & ~truncated))
+    wins_p2 = int(np.sum(~truncated)) - wins_p1
+    if max_steps is not None:
+        print(f"[INFO] Episodi troncati a {max_steps} passi: {int(truncated.sum())} su {len(truncated)}")
+
+    q_table_filename_p1, q_table_filename_p2 = salva_q_tables(q_table_player1, q_table_player2, episodes, alpha,
+                                                              gamma, decay, bins)
+    grafici_training(rewards1, rewards2, touches, wins_p1, wins_p2, episodes, alpha, gamma, decay)
+
+    return q_table_filename_p1, q_table_filename_p2
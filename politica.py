@@ -0,0 +1,362 @@
+"""
+Politiche greedy precalcolate e server di inferenza.
+
+Una volta addestrata, una Q-Table serve solo per l'argmax sull'ultimo asse: esporta_politica converte una coppia
+di Q-Table in una tabella di azioni uint8, un byte per stato e per player (1M stati: 1 MB per player), salvata in
+un file .npp con lo stesso header dei .npq (bins, metadati e checksum). Politica mappa un'osservazione grezza di
+PongEnv sull'azione con il Discretizer precalcolato e una sola lettura dalla tabella.
+
+Il server espone una politica in locale, con richieste a lotti:
+- TCP, protocollo binario su connessione persistente: la richiesta è un uint32 little endian con il numero n di
+  osservazioni seguito da n record RICHIESTA (player uint8 + 6 float64, 49 byte), la risposta sono n byte di azioni;
+- HTTP (--http): POST /azioni con JSON {"osservazioni": [[...6 valori...], ...], "player": 1 o lista},
+  risposta {"azioni": [...]}; GET / restituisce l'header della politica.
+
+Esempi:
+    python politica.py esporta p1_120k_alpha0.100_gamma0.990.npq p2_120k_alpha0.100_gamma0.990.npq
+    python politica.py servi politiche/p1_120k_alpha0.100_gamma0.990.npp --porta 8765
+"""
+import argparse
+import json
+import math
+import os
+import socket
+import socketserver
+import struct
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from compiled_training import JIT_DISPONIBILE, _njit, tabelle_discretizer
+from discretizer import Discretizer, process_observation_player2, process_observations_player2
+from pong_core import SCREEN_WIDTH
+from qtable_storage import VERSIONE, _checksum, leggi_header, scrivi_header
+from valutazione import carica_politica, compatibili, percorso
+
+ESTENSIONE_POLITICA = ".npp"
+
+# Record di una richiesta del protocollo binario
+RICHIESTA = np.dtype([("player", "u1"), ("obs", "<f8", 6)])
+_LUNGHEZZA = struct.Struct("<I")
+
+
+def tabella_azioni(q_table, blocco=1 << 18):
+    """
+    Azioni greedy (argmax sull'ultimo asse, prima azione in caso di parità) per tutti gli stati.
+    :param q_table: Array (n_stati, n_azioni) oppure SparseQTable (gli stati non visitati usano i valori iniziali)
+    :param blocco: Stati per blocco (limita la memoria temporanea)
+    :return: Array (n_stati,) uint8
+    """
+    n_states = len(q_table) if isinstance(q_table, np.ndarray) else q_table.n_states
+    azioni = np.empty(n_states, dtype=np.uint8)
+    for inizio in range(0, n_states, blocco):
+        if isinstance(q_table, np.ndarray):
+            azioni[inizio:inizio + blocco] = q_table[inizio:inizio + blocco].argmax(axis=1)
+        else:
+            azioni[inizio:inizio + blocco] = q_table.greedy_actions(np.arange(inizio, min(inizio + blocco, n_states)))
+    return azioni
+
+
+def esporta_politica(q_table_p1, q_table_p2, path=None):
+    """
+    Esporta la politica greedy di una coppia di Q-Table in un file .npp (scrittura atomica).
+    :param q_table_p1: Nome del file della Q-Table del Player 1 (in qTable/p1) o percorso
+    :param q_table_p2: Nome del file della Q-Table del Player 2 (in qTable/p2) o percorso
+    :param path: Percorso del file (default: politiche/<nome della Q-Table del Player 1>.npp)
+    :return: Percorso del file creato
+    """
+    path_p1, path_p2 = percorso(1, q_table_p1), percorso(2, q_table_p2)
+    q_player1, bins, frame_skip = carica_politica(path_p1)
+    q_player2, bins2, _ = carica_politica(path_p2)
+    if not compatibili(bins, bins2):
+        raise ValueError(f"{q_table_p1} e {q_table_p2} usano discretizzazioni diverse")
+
+    azioni = np.stack([tabella_azioni(q_player1), tabella_azioni(q_player2)])
+    if path is None:
+        os.makedirs("politiche", exist_ok=True)
+        path = os.path.join("politiche", os.path.splitext(os.path.basename(path_p1))[0] + ESTENSIONE_POLITICA)
+
+    header = {
+        "version": VERSIONE,
+        "state_shape": [len(b) for b in bins],
+        "n_states": azioni.shape[1],
+        "n_players": azioni.shape[0],
+        "dtype": azioni.dtype.str,
+        "bins": [b.tolist() for b in bins],
+        "metadata": {"q_table_p1": os.path.basename(path_p1), "q_table_p2": os.path.basename(path_p2),
+                     "frame_skip": frame_skip},
+        "checksum": _checksum(azioni),
+    }
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        scrivi_header(f, header)
+        azioni.tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+def carica_azioni(path, verifica=False):
+    """
+    Carica la tabella delle azioni di un file .npp.
+    :param verifica: Se True controlla il checksum
+    :return: (array (n_players, n_stati) uint8, header)
+    """
+    header = leggi_header(path)
+    with open(path, "rb") as f:
+        f.seek(header["data_offset"])
+        azioni = np.fromfile(f, dtype=np.dtype(header["dtype"]), count=header["n_players"] * header["n_states"])
+    azioni = azioni.reshape(header["n_players"], header["n_states"])
+
+    if verifica and _checksum(azioni) != header["checksum"]:
+        raise ValueError(f"Checksum non valido per {path}")
+    return azioni, header
+
+
+@_njit
+def _azioni_lotto(osservazioni, players, azioni, scale, k0, k1, thr, lo, hi, out):
+    # Ribaltamento del Player 2, discretizzazione (tabelle del Discretizer) e lettura dell'azione in un passaggio
+    for i in range(len(osservazioni)):
+        player = players[i]
+        if player != 1 and player != 2:
+            raise ValueError("player deve essere 1 o 2")
+        index = 0
+        for d in range(6):
+            value = osservazioni[i, d]
+            if player == 2:
+                # process_observation_player2
+                if d == 0:
+                    value = osservazioni[i, 1]
+                elif d == 1:
+                    value = osservazioni[i, 0]
+                elif d == 2:
+                    value = SCREEN_WIDTH - value
+                elif d == 4:
+                    value = -value
+            k = math.floor(value * scale[d])
+            if k < k0[d]:
+                k = k0[d]
+            elif k > k1[d]:
+                k = k1[d]
+            k -= k0[d]
+            if value >= thr[d, k]:
+                index += hi[d, k]
+            else:
+                index += lo[d, k]
+        out[i] = azioni[player - 1, index]
+
+
+class Politica:
+    """
+    Politica greedy precalcolata: osservazione grezza di PongEnv -> azione, senza Q-Table.
+    """
+    def __init__(self, path):
+        """
+        :param path: File .npp creato da esporta_politica
+        """
+        self.azioni, self.header = carica_azioni(path, verifica=True)
+        self.discretizer = Discretizer(self.header["bins"])
+        self.frame_skip = self.header["metadata"].get("frame_skip", 1)
+
+        # Righe della tabella come liste Python per il percorso scalare, tabelle del Discretizer per i lotti
+        self._righe = [riga.tolist() for riga in self.azioni]
+        self._tabelle = tabelle_discretizer(self.discretizer)
+
+    def azione(self, obs, player=1):
+        """
+        Azione per una singola osservazione.
+        :param obs: Osservazione di PongEnv (player1_y, player2_y, ball_x, ball_y, ball_dx, ball_dy)
+        :param player: 1 o 2 (per il Player 2 l'osservazione viene ribaltata come in process_observation_player2)
+        :return: Azione (0: Stay, 1: Up, 2: Down)
+        """
+        if player == 2:
+            obs = process_observation_player2(obs)
+        elif player != 1:
+            raise ValueError("player deve essere 1 o 2")
+        return self._righe[player - 1][self.discretizer.discretize(obs)]
+
+    def azioni_batch(self, osservazioni, players):
+        """
+        Azioni per un lotto di osservazioni.
+        :param osservazioni: Array (N, 6) di osservazioni di PongEnv
+        :param players: 1 o 2, oppure array (N,) del player di ogni osservazione
+        :return: Array (N,) uint8 di azioni
+        """
+        osservazioni = np.ascontiguousarray(osservazioni, dtype=np.float64).reshape(-1, 6)
+        players = np.asarray(players)
+        if players.ndim == 0:
+            players = np.full(len(osservazioni), players, dtype=np.int64)
+        elif players.shape != (len(osservazioni),):
+            # Il loop compilato non controlla gli indici: un array più corto leggerebbe memoria non valida
+            raise ValueError(f"players deve avere una voce per osservazione ({len(osservazioni)}), "
+                             f"non forma {players.shape}")
+        players = players.astype(np.int64, copy=False)
+        if players.size and (players.min() < 1 or players.max() > 2):
+            raise ValueError("player deve essere 1 o 2")
+
+        if JIT_DISPONIBILE:
+            azioni = np.empty(len(osservazioni), dtype=np.uint8)
+            _azioni_lotto(osservazioni, players, self.azioni, *self._tabelle, azioni)
+            return azioni
+
+        # Senza Numba: stesse operazioni vettorizzate con NumPy (su una copia, ribaltata sul posto)
+        osservazioni = osservazioni.copy()
+        ribaltate = players == 2
+        if ribaltate.any():
+            osservazioni[ribaltate] = process_observations_player2(osservazioni[ribaltate])
+        return self.azioni[players - 1, self.discretizer.discretize_batch(osservazioni)]
+
+
+class _GestoreTCP(socketserver.StreamRequestHandler):
+    """
+    Connessione del protocollo binario: lotti di richieste finché il client non chiude.
+    """
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        politica = self.server.politica
+        while True:
+            intestazione = self.rfile.read(_LUNGHEZZA.size)
+            if len(intestazione) < _LUNGHEZZA.size:
+                return
+            (n,) = _LUNGHEZZA.unpack(intestazione)
+            dati = self.rfile.read(n * RICHIESTA.itemsize)
+            if len(dati) < n * RICHIESTA.itemsize:
+                return
+            richieste = np.frombuffer(dati, dtype=RICHIESTA)
+            try:
+                azioni = politica.azioni_batch(richieste["obs"], richieste["player"])
+            except ValueError:
+                # Il protocollo binario non ha risposte di errore: la connessione viene chiusa
+                return
+            self.wfile.write(azioni.tobytes())
+            self.wfile.flush()
+
+
+class _ServerTCP(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _GestoreHTTP(BaseHTTPRequestHandler):
+    """
+    Richieste HTTP con corpo JSON (connessioni keep-alive).
+    """
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Header e corpo sono scritti separatamente: senza TCP_NODELAY l'algoritmo di Nagle aggiunge ~40 ms
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _rispondi(self, codice, corpo):
+        dati = json.dumps(corpo).encode("utf-8")
+        self.send_response(codice)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dati)))
+        self.end_headers()
+        self.wfile.write(dati)
+
+    def do_GET(self):
+        self._rispondi(200, self.server.politica.header)
+
+    def do_POST(self):
+        if self.path != "/azioni":
+            self._rispondi(404, {"errore": f"percorso {self.path} non trovato"})
+            return
+        try:
+            richiesta = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            azioni = self.server.politica.azioni_batch(richiesta["osservazioni"], richiesta.get("player", 1))
+        except (ValueError, KeyError, TypeError, AttributeError) as errore:
+            self._rispondi(400, {"errore": str(errore)})
+            return
+        self._rispondi(200, {"azioni": azioni.tolist()})
+
+    def log_message(self, format, *args):
+        # Nessun log per richiesta: a questi ritmi costerebbe più dell'inferenza
+        pass
+
+
+class _ServerHTTP(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def crea_server(path, host="127.0.0.1", porta=8765, http=False):
+    """
+    Crea (senza avviarlo) il server di inferenza per una politica.
+    :param path: File .npp
+    :param host: Indirizzo di ascolto (default solo locale)
+    :param porta: Porta TCP (0 per una porta libera, leggibile da server.server_address)
+    :param http: Se True usa HTTP/JSON, altrimenti il protocollo binario
+    :return: Server socketserver (serve_forever per avviarlo, shutdown per fermarlo)
+    """
+    server = (_ServerHTTP if http else _ServerTCP)((host, porta), _GestoreHTTP if http else _GestoreTCP)
+    server.politica = Politica(path)
+    return server
+
+
+class ClientPolitica:
+    """
+    Client del protocollo binario: una connessione persistente, un lotto di osservazioni per richiesta.
+    """
+    def __init__(self, host="127.0.0.1", porta=8765):
+        self.socket = socket.create_connection((host, porta))
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def azioni(self, osservazioni, players=1):
+        """
+        :param osservazioni: Array (N, 6) di osservazioni di PongEnv
+        :param players: 1 o 2, oppure array (N,) del player di ogni osservazione
+        :return: Array (N,) uint8 di azioni
+        """
+        osservazioni = np.asarray(osservazioni, dtype=np.float64).reshape(-1, 6)
+        richieste = np.empty(len(osservazioni), dtype=RICHIESTA)
+        richieste["player"] = players
+        richieste["obs"] = osservazioni
+        self.socket.sendall(_LUNGHEZZA.pack(len(richieste)) + richieste.tobytes())
+
+        risposta = bytearray()
+        while len(risposta) < len(richieste):
+            dati = self.socket.recv(len(richieste) - len(risposta))
+            if not dati:
+                raise ConnectionError("Connessione chiusa dal server")
+            risposta += dati
+        return np.frombuffer(bytes(risposta), dtype=np.uint8)
+
+    def close(self):
+        self.socket.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Esportazione e server di politiche greedy precalcolate")
+    comandi = parser.add_subparsers(dest="comando", required=True)
+
+    esporta = comandi.add_parser("esporta", help="Esporta una coppia di Q-Table in un file .npp")
+    esporta.add_argument("q_table_p1", help="Q-Table del Player 1 (nome in qTable/p1 o percorso)")
+    esporta.add_argument("q_table_p2", help="Q-Table del Player 2 (nome in qTable/p2 o percorso)")
+    esporta.add_argument("--output", default=None, help="File .npp (default: politiche/<Q-Table P1>.npp)")
+
+    servi = comandi.add_parser("servi", help="Server di inferenza locale per un file .npp")
+    servi.add_argument("politica", help="File .npp")
+    servi.add_argument("--host", default="127.0.0.1", help="Indirizzo di ascolto")
+    servi.add_argument("--porta", type=int, default=8765, help="Porta TCP")
+    servi.add_argument("--http", action="store_true", help="HTTP/JSON invece del protocollo binario")
+    args = parser.parse_args()
+
+    if args.comando == "esporta":
+        path = esporta_politica(args.q_table_p1, args.q_table_p2, args.output)
+        print(f"[INFO] Politica salvata in {path} ({os.path.getsize(path) / 2 ** 20:.1f} MB)")
+    else:
+        server = crea_server(args.politica, args.host, args.porta, args.http)
+        print(f"[INFO] Server {'HTTP' if args.http else 'binario'} in ascolto su {args.host}:{args.porta}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("[INFO] Server fermato.")
+        finally:
+            server.server_close()
@@ -2,13 +2,28 @@ import pickle
 import numpy as np
 import random
 import os
+import shutil
 import tqdm
 
 from grafici_utils import *
-from pong import PongEnv
+from pong_core import PongCore
+from discretizer import Discretizer, process_observation_player1, process_observation_player2
+from qtable import QTable, SparseQTable
+from qtable_storage import ESTENSIONE, ESTENSIONE_SPARSA, carica_npq, salva_npq, carica_sparsa, salva_sparsa
+from checkpoint import Checkpointer, carica_checkpoint, leggi_stato
+from profiling import Profiler
+from metriche import MetricheEpisodi
+from replay import ReplayBuffer
+from bins_adattivi import IstogrammaVisite, bins_uniformi, scegli_bins
+import grafici_batch
 from tqdm import tqdm
 
-def modello(episodes, training, alpha, gamma, q_table_p1, q_table_p2, demo_status, decay):
+def modello(episodes, training, alpha, gamma, q_table_p1, q_table_p2, demo_status, decay, checkpoint_every=None,
+            checkpoint_seconds=None, resume=False, discrete_bins=10, sparse=False, profile=None, profile_seconds=10.0,
+            batch_plots=False, combined_report=False, plots=True, return_metrics=False, replay_size=None,
+            replay_batch=32, replay_warmup=1000, replay_every=4, max_steps=None, frame_skip=1, seed=None,
+            render_async=False, record_frames=None, record_trace=None, shared_q=False, bin_edges=None,
+            visit_stats=None):
     """
     Funzione per l'addestramento e il testing dell'agente.
     :param episodes: Numero di episodi
@@ -19,10 +34,54 @@ def modello(episodes, training, alpha, gamma, q_table_p1, q_table_p2, demo_statu
     :param q_table_p2: Nome del file per la Q-Table del Player 2 (se esiste)
     :param demo_status: Se True allora demo, altrimenti no
     :param decay: Se True allora epsilon decay basato su episodi, altrimenti no
-    :return: Nomi dei file delle Q-Table salvate (se in fase di addestramento)
+    :param checkpoint_every: Se indicato, salva un checkpoint ogni checkpoint_every episodi (solo addestramento)
+    :param checkpoint_seconds: Se indicato, salva un checkpoint ogni checkpoint_seconds secondi (solo addestramento)
+    :param resume: Se True riprende l'addestramento dall'ultimo checkpoint della stessa configurazione
+    :param discrete_bins: Numero di bins per dimensione dello stato
+    :param sparse: Se True usa Q-Table sparse (solo gli stati visitati occupano memoria), utile con molti bins
+    :param profile: Se indicato attiva la profilazione delle fasi: True per il solo report finale, oppure il file
+                    in cui esportare periodicamente le metriche (.prom per il formato Prometheus, altrimenti JSON lines)
+    :param profile_seconds: Intervallo in secondi tra due esportazioni delle metriche
+    :param batch_plots: Se True i grafici vengono salvati in background (backend Agg, senza finestre) e modello
+                        ritorna subito
+    :param combined_report: Se True salva anche un unico report a più pannelli in grafici/Training/report o
+                            grafici/Testing/report
+    :param plots: Se False non genera i grafici
+    :param return_metrics: Se True in addestramento restituisce anche le metriche per episodio
+    :param replay_size: Se indicato, in addestramento le transizioni vanno in una memoria di replay di replay_size
+                        transizioni per player e le Q-Table sono aggiornate con mini-batch campionati
+                        (altrimenti aggiornamento online, una transizione alla volta)
+    :param replay_batch: Transizioni per mini-batch
+    :param replay_warmup: Transizioni da raccogliere prima del primo aggiornamento
+    :param replay_every: Passi tra due aggiornamenti con mini-batch (contati su tutto l'addestramento, non per
+                         episodio)
+    :param max_steps: Se indicato, gli episodi che arrivano a max_steps frame senza punti vengono troncati;
+                      sono riportati a parte e non contano come vittorie
+    :param frame_skip: Frame di fisica per ogni decisione: l'azione viene ripetuta e le ricompense sommate.
+                       Passi, replay_every e lunghezze degli episodi contano le decisioni
+    :param seed: Se indicato, ambiente, esplorazione dei due player e inizializzazione delle Q-Table (e delle
+                 memorie di replay) usano generatori dedicati derivati da seed: due esecuzioni con lo stesso seed
+                 sono identiche. Altrimenti si usano i generatori globali random e np.random
+    :param render_async: Solo demo: la finestra è disegnata da un processo separato e la simulazione non attende
+                         il frame successivo (la finestra mostra l'ultimo stato)
+    :param record_frames: Solo demo: file .npy in cui registrare lo stato di ogni passo (renderer.py riproduci)
+    :param record_trace: Se indicato, cartella in cui registrare osservazioni, azioni e ricompense di ogni passo
+                         in una traccia compatta (tracce.py), da riprodurre o usare per l'addestramento offline
+    :param shared_q: Se True i due player leggono e aggiornano la stessa Q-Table (il Player 2 la usa tramite il
+                     ribaltamento di process_observation_player2): due aggiornamenti per passo sulla stessa tabella,
+                     memoria e file dimezzati. Si carica e si salva la sola Q-Table del Player 1
+    :param bin_edges: Bordi dei bins: None per quelli salvati con la Q-Table del Player 1 (se esiste) o uniformi,
+                      lista di 6 array di bordi, oppure istogramma delle visite (.npz) da cui ricavare discrete_bins
+                      bordi ai quantili (bins_adattivi.py). I bordi sono salvati con le Q-Table
+    :param visit_stats: Se indicato, file .npz in cui accumulare l'istogramma delle visite degli stati (aggiornato
+                        se esiste), da usare come bin_edges in un addestramento successivo
+    :return: Nomi dei file delle Q-Table salvate (più le metriche se return_metrics) in addestramento,
+             metriche per episodio (MetricheEpisodi) in testing
     """
     epsilon_min = 0.05
-    discrete_bins = 10
+
+    if sparse and (checkpoint_every or checkpoint_seconds or resume):
+        raise ValueError("I checkpoint sono supportati solo con le Q-Table dense")
 
     #Dati per salvataggio table
     al = alpha
@@ -43,133 +102,163 @@ def modello(episodes, training, alpha, gamma, q_table_p1, q_table_p2, demo_statu
         epsilon = 0.0
         epsilon_decay = 0.0
 
-    env = PongEnv(render_mode = demo_status)
-
-    # (player1_y, player2_y, ball_x, ball_y, ball_dx, ball_dy)
-    bins = [
-        np.linspace(0, env.SCREEN_HEIGHT, discrete_bins),   # player1_y
-        np.linspace(0, env.SCREEN_HEIGHT, discrete_bins),   # player2_y
-        np.linspace(0, env.SCREEN_WIDTH, discrete_bins),    # ball_x
-        np.linspace(0, env.SCREEN_HEIGHT, discrete_bins),   # ball_y
-        np.linspace(-env.BALL_SPEED, env.BALL_SPEED, discrete_bins), # ball_dx
-        np.linspace(-env.BALL_SPEED, env.BALL_SPEED, discrete_bins), # ball_dy
-    ]
-    
-    def discretize_state(state, bins):
-        """
-        Funzione per discretizzare lo stato dell'ambiente.
-        :param state: Stato dell'ambiente
-        :param bins: Bins per la discretizzazione
-        :return: Stato discretizzato (tuple)
-        """
-    
-        player1_y, player2_y, ball_x, ball_y, ball_dx, ball_dy = state
-        discrete_state = (
-            np.digitize(player1_y, bins[0]) - 1,
-            np.digitize(player2_y, bins[1]) - 1,
-            np.digitize(ball_x, bins[2]) - 1,
-            np.digitize(ball_y, bins[3]) - 1,
-            np.digitize(ball_dx, bins[4]) - 1,
-            np.digitize(ball_dy, bins[5]) - 1,
-        )
-        discrete_state = tuple(np.clip(discrete_state, 0, discrete_bins - 1))
-        return discrete_state
-    
-    state_space_size = tuple([discrete_bins] * 6)
+    # Generatori casuali: uno per l'ambiente, uno per l'esplorazione di ogni player e uno per le Q-Table
+    if seed is not None:
+        seed_env, seed_p1, seed_p2, seed_np = (int(x) for x in np.random.SeedSequence(seed).generate_state(4))
+        rng_p1 = random.Random(seed_p1)
+        rng_p2 = random.Random(seed_p2)
+        rng_np = np.random.RandomState(seed_np)
+    else:
+        seed_env = None
+        rng_p1 = rng_p2 = random
+        rng_np = np.random
 
-    if os.path.exists(f"qTable/p1/{q_table_p1}"):
-        with open(f"qTable/p1/{q_table_p1}", "rb") as f:
-            q_table_player1 = pickle.load(f)
-        print("[INFO] Q-Table Player 1 caricata.")
+    if demo_status:
+        # Pygame e Gym vengono importati solo per la demo grafica
+        from pong import PongEnv
+        env = PongEnv(render_mode = demo_status, max_steps=max_steps, frame_skip=frame_skip, seed=seed_env,
+                      render_async=render_async, record_frames=record_frames)
     else:
-        q_table_player1 = np.random.uniform(low=-1, high=1, size=(state_space_size + (env.action_space.n,)))
-        print("[INFO] Q-Table Player 1 inizializzata casualmente.")
+        env = PongCore(max_steps, frame_skip, seed_env)
+
+    if record_trace is not None:
+        from tracce import Registratore
+        env.registratore = Registratore(record_trace, training=training, q_table_p1=q_table_p1,
+                                        q_table_p2=q_table_p2, discrete_bins=discrete_bins, frame_skip=frame_skip,
+                                        max_steps=max_steps, seed=seed)
 
-    if os.path.exists(f"qTable/p2/{q_table_p2}"):
-        with open(f"qTable/p2/{q_table_p2}", "rb") as f:
-            q_table_player2 = pickle.load(f)
-        print("[INFO] Q-Table Player 2 caricata.")
+    bins = scegli_bins(bin_edges, discrete_bins, q_table_p1, None if shared_q else q_table_p2)
+    discretizer = Discretizer(bins)
+    
+    state_space_size = discretizer.shape
+
+    checkpoint_dir = cartella_checkpoint(episodes, al, g, decay, len(bins[0]), frame_skip, shared_q,
+                                         not bins_uniformi(bins))
+    stato = leggi_stato(checkpoint_dir) if training and resume else None
+
+    if stato is not None:
+        # Ripresa: Q-Table, epsilon, generatori casuali e storici dall'ultimo checkpoint
+        q_tables, stato = carica_checkpoint(checkpoint_dir)
+        q_player1, q_player2 = q_tables if len(q_tables) == 2 else q_tables * 2
+        q_table_player1 = q_player1.as_array()
+        q_table_player2 = q_player2.as_array()
+        print(f"[INFO] Addestramento ripreso dal checkpoint all'episodio {stato['episode']}.")
+    elif sparse:
+        q_player1 = carica_q_table_sparsa(1, q_table_p1, discretizer.n_states, env.N_ACTIONS, rng_np)
+        q_player2 = q_player1 if shared_q else \
+            carica_q_table_sparsa(2, q_table_p2, discretizer.n_states, env.N_ACTIONS, rng_np)
     else:
-        q_table_player2 = np.random.uniform(low=-1, high=1, size=(state_space_size + (env.action_space.n,)))
-        print("[INFO] Q-Table Player 2 inizializzata casualmente.")
+        q_table_player1 = carica_q_table(1, q_table_p1, state_space_size, env.N_ACTIONS, sola_lettura=not training,
+                                         rng=rng_np)
+        if shared_q:
+            q_table_player2 = q_table_player1
+        else:
+            q_table_player2 = carica_q_table(2, q_table_p2, state_space_size, env.N_ACTIONS,
+                                             sola_lettura=not training, rng=rng_np)
+
+        # Q-Table piatte (n_stati, n_azioni) sulla stessa memoria, indicizzate dall'indice del discretizzatore
+        q_player1 = QTable(q_table_player1)
+        q_player2 = q_player1 if shared_q else QTable(q_table_player2)
     
     print("-----------------------------------------------")
+
+    # Istogramma delle visite opzionale: un append per passo, conteggi a blocchi
+    istogramma = None
+    if visit_stats is not None:
+        istogramma = IstogrammaVisite.carica(visit_stats) if os.path.exists(visit_stats) else IstogrammaVisite()
     
-    def process_observation_player1(obs):
-        """
-        Funzione per ottenere l'osservazione per il Player 1.
-        :param obs: Osservazione dell'ambiente
-        :return: Osservazione così com'è (per il Player 1)
-        """
-    
-        return obs
-    
-    def process_observation_player2(obs):
-        """
-        Funzione per ottenere l'osservazione per il Player 2.
-        :param obs: Osservazione dell'ambiente
-        :return: Osservazione ribaltata rispetto all'asse x (per il Player 2)
-        """
-    
-        player1_y, player2_y, ball_x, ball_y, ball_dx, ball_dy = obs
-        # Ribaltiamo la prospettiva: consideriamo player2_y come se fosse player1_y (il suo paddle principale)
-        # e player1_y come se fosse player2_y da questa prospettiva
-        new_player1_y = player2_y
-        new_player2_y = player1_y
-    
-        new_ball_x = env.SCREEN_WIDTH - ball_x
-        new_ball_dx = -ball_dx
-        new_ball_y = ball_y
-        new_ball_dy = ball_dy
-    
-        #Restituiamo 6 valori, mantenendo la struttura (player1_y, player2_y, ball_x, ball_y, ball_dx, ball_dy)
-        return new_player1_y, new_player2_y, new_ball_x, new_ball_y, new_ball_dx, new_ball_dy
-    
-    # Inizializzazione delle variabili per i grafici
-    rewards_player1_total = []
-    rewards_player2_total = []
-    
-    touches_total = []
-    
-    epsilon_history = []
-    
-    wins_p1 = 0
-    wins_p2 = 0
+    # Metriche per i grafici su array preallocati (ricompense, tocchi, epsilon, vittorie)
+    metriche = MetricheEpisodi(episodes)
+
+    start_episode = 0
+    if stato is not None:
+        start_episode = stato["episode"]
+        epsilon = stato["epsilon"]
+        random.setstate(stato["random_state"])
+        np.random.set_state(stato["np_random_state"])
+        # Generatori dedicati (senza seed sono i moduli globali e ritrovano lo stesso stato)
+        for generatore, stato_generatore in zip((env.rng, rng_p1, rng_p2), stato.get("rng_states", ())):
+            generatore.setstate(stato_generatore)
+        if "np_rng_state" in stato:
+            rng_np.set_state(stato["np_rng_state"])
+        metriche = stato["metriche"]
+        if istogramma is not None and stato.get("istogramma") is not None:
+            istogramma = stato["istogramma"]
+        env.score_player1 = stato["score_player1"]
+        env.score_player2 = stato["score_player2"]
+
+    # Memoria di replay opzionale (una per player); ripresa dal checkpoint se presente
+    replay = None
+    if training and replay_size:
+        if stato is not None and stato.get("replay") is not None:
+            replay = stato["replay"]
+        else:
+            replay = (ReplayBuffer(replay_size, discretizer.n_states, seed=int(rng_np.randint(2 ** 31))),
+                      ReplayBuffer(replay_size, discretizer.n_states, seed=int(rng_np.randint(2 ** 31))))
+    # Decisioni dall'inizio dell'addestramento (non azzerate a ogni episodio, ricavate dagli storici in ripresa):
+    # scandiscono gli aggiornamenti con replay indipendentemente dalla lunghezza degli episodi
+    decisioni = int(metriche.lengths.sum())
+
+    # Profilazione opzionale: se disattiva il loop controlla solo che profiler sia None
+    profiler = None
+    if profile:
+        profiler = Profiler(profile if isinstance(profile, str) else None, ogni_secondi=profile_seconds)
+        env.profiler = profiler
+
+    checkpointer = None
+    if training and (checkpoint_every or checkpoint_seconds):
+        checkpointer = Checkpointer(checkpoint_dir, [q_player1] if shared_q else [q_player1, q_player2],
+                                    checkpoint_every, checkpoint_seconds, start_episode=start_episode)
 
     try: # Gestione interruzione con CTRL+C durante l'addestramento o il test
         # Loop per tutti gli episodi di addestramento o test (episodes)
-        bar = tqdm(range(episodes), desc="[INFO] Episodi in corso", unit="episodi")
+        bar = tqdm(range(start_episode, episodes), desc="[INFO] Episodi in corso", unit="episodi",
+                   initial=start_episode, total=episodes)
         for episode in bar:
             obs = env.reset()
+            if istogramma is not None:
+                istogramma.aggiungi(obs)
     
             # Applichiamo le trasformazioni
             state1 = process_observation_player1(obs)
             state2 = process_observation_player2(obs)
     
-            discrete_state1 = discretize_state(state1, bins)
-            discrete_state2 = discretize_state(state2, bins)
+            discrete_state1 = discretizer.discretize(state1)
+            discrete_state2 = discretizer.discretize(state2)
     
             done = False
     
             total_reward1 = 0
             total_reward2 = 0
+            steps = 0
     
             # Loop per un singolo episodio
             while not done:
+                if profiler is not None:
+                    t = profiler.inizio()
+
                 # epsilon-greedy per Player 1
-                if random.uniform(0, 1) < epsilon:
-                    action1 = env.action_space.sample()
+                if rng_p1.uniform(0, 1) < epsilon:
+                    action1 = rng_p1.randrange(env.N_ACTIONS)
                 else:
-                    action1 = np.argmax(q_table_player1[discrete_state1])
+                    action1 = q_player1.greedy_action(discrete_state1)
     
                 # epsilon-greedy per Player 2
-                if random.uniform(0, 1) < epsilon:
-                    action2 = env.action_space.sample()
+                if rng_p2.uniform(0, 1) < epsilon:
+                    action2 = rng_p2.randrange(env.N_ACTIONS)
                 else:
-                    action2 = np.argmax(q_table_player2[discrete_state2])
+                    action2 = q_player2.greedy_action(discrete_state2)
+
+                if profiler is not None:
+                    t = profiler.misura("azione", t)
     
                 next_obs, rewards, done, _ = env.step(action1, action2)
                 reward_player1, reward_player2 = rewards
+                if istogramma is not None:
+                    istogramma.aggiungi(next_obs)
+
+                if profiler is not None:
+                    t = profiler.misura("step", t)
     
                 total_reward1 += reward_player1
                 total_reward2 += reward_player2
@@ -177,45 +266,77 @@ def modello(episodes, training, alpha, gamma, q_table_p1, q_table_p2, demo_statu
                 next_state1 = process_observation_player1(next_obs)
                 next_state2 = process_observation_player2(next_obs)
     
-                discrete_next_state1 = discretize_state(next_state1, bins)
-                discrete_next_state2 = discretize_state(next_state2, bins)
+                discrete_next_state1 = discretizer.discretize(next_state1)
+                discrete_next_state2 = discretizer.discretize(next_state2)
+
+                if profiler is not None:
+                    t = profiler.misura("discretizzazione", t)
+
+                # Solo un punto chiude davvero l'episodio: dopo un troncamento si usa ancora il valore futuro
+                terminale = done and not env.truncated
     
-                if training:
+                if training and replay is None:
                     # Aggiorna Player 1
-                    max_future_q1 = np.max(q_table_player1[discrete_next_state1])
-                    current_q1 = q_table_player1[discrete_state1 + (action1,)]
-                    new_q1 = current_q1 + alpha * (reward_player1 + gamma * max_future_q1 - current_q1)
-                    q_table_player1[discrete_state1 + (action1,)] = new_q1
+                    q_player1.update(discrete_state1, action1, reward_player1, discrete_next_state1, alpha, gamma,
+                                     terminale)
     
                     # Aggiorna Player 2
-                    max_future_q2 = np.max(q_table_player2[discrete_next_state2])
-                    current_q2 = q_table_player2[discrete_state2 + (action2,)]
-                    new_q2 = current_q2 + alpha * (reward_player2 + gamma * max_future_q2 - current_q2)
-                    q_table_player2[discrete_state2 + (action2,)] = new_q2
-    
+                    q_player2.update(discrete_state2, action2, reward_player2, discrete_next_state2, alpha, gamma,
+                                     terminale)
+
+                    if profiler is not None:
+                        t = profiler.misura("aggiornamento_td", t)
+
+                elif training:
+                    # Replay: la transizione va in memoria, gli aggiornamenti usano mini-batch campionati
+                    replay[0].aggiungi(discrete_state1, action1, reward_player1, discrete_next_state1, terminale)
+                    replay[1].aggiungi(discrete_state2, action2, reward_player2, discrete_next_state2, terminale)
+                    if len(replay[0]) >= replay_warmup and decisioni % replay_every == 0:
+                        replay[0].aggiorna(q_player1, replay_batch, alpha, gamma)
+                        replay[1].aggiorna(q_player2, replay_batch, alpha, gamma)
+                    decisioni += 1
+
+                    if profiler is not None:
+                        t = profiler.misura("aggiornamento_td", t)
+
                 # Aggiornamento degli stati
                 discrete_state1 = discrete_next_state1
                 discrete_state2 = discrete_next_state2
     
                 env.render()
+                steps += 1
+
+                if profiler is not None:
+                    profiler.misura("render", t)
     
             if epsilon > epsilon_min:
                 epsilon *= epsilon_decay
     
             # Salvataggio delle variabili per i grafici
-            rewards_player1_total.append(total_reward1)
-            rewards_player2_total.append(total_reward2)
-    
-            epsilon_history.append(epsilon)
-    
-            touches_total.append(env.touches)
-    
-            if total_reward1 > total_reward2:
-                wins_p1 += 1
-            else:
-                wins_p2 += 1
+            metriche.aggiungi(total_reward1, total_reward2, env.touches, epsilon, steps, env.truncated)
+
+            bar.set_postfix({"Reward P1": metriche.somma_reward1, "Reward P2": metriche.somma_reward2})
+
+            if profiler is not None:
+                profiler.fine_episodio(steps)
 
-            bar.set_postfix({"Reward P1": sum(rewards_player1_total[-50:]), "Reward P2": sum(rewards_player2_total[-50:])})
+            if checkpointer is not None and checkpointer.dovuto(episode + 1):
+                if profiler is not None:
+                    t = profiler.inizio()
+                checkpointer.salva(episode + 1, {
+                    "epsilon": epsilon,
+                    "random_state": random.getstate(),
+                    "np_random_state": np.random.get_state(),
+                    "rng_states": [env.rng.getstate(), rng_p1.getstate(), rng_p2.getstate()],
+                    "np_rng_state": rng_np.get_state(),
+                    "metriche": metriche,
+                    "replay": replay,
+                    "istogramma": istogramma,
+                    "score_player1": env.score_player1,
+                    "score_player2": env.score_player2,
+                })
+                if profiler is not None:
+                    profiler.misura("checkpoint", t)
     
     except KeyboardInterrupt:
         print("-----------------------------------------------")
@@ -223,45 +344,217 @@ def modello(episodes, training, alpha, gamma, q_table_p1, q_table_p2, demo_statu
     
     finally:
         env.close()
-    
-    if training:
-        if decay:
-            q_table_filename_p1 = f"p1_{episodes // 1000}k_alpha{al:.3f}_gamma{g:.3f}_decayEpisodico.pkl"
-            q_table_filename_p2 = f"p2_{episodes // 1000}k_alpha{al:.3f}_gamma{g:.3f}_decayEpisodico.pkl"
-        else:
-            q_table_filename_p1 = f"p1_{episodes // 1000}k_alpha{al:.3f}_gamma{g:.3f}.pkl"
-            q_table_filename_p2 = f"p2_{episodes // 1000}k_alpha{al:.3f}_gamma{g:.3f}.pkl"
 
-        with open(f"qTable/p1/{q_table_filename_p1}", "wb") as f:
-            pickle.dump(q_table_player1, f)
+    if istogramma is not None:
+        istogramma.salva(visit_stats)
+        print(f"[INFO] Istogramma delle visite ({istogramma.totale} osservazioni) salvato in {visit_stats}")
 
-        with open(f"qTable/p2/{q_table_filename_p2}", "wb") as f:
-            pickle.dump(q_table_player2, f)
+    if profiler is not None:
+        profiler.report()
 
-        print(
-            f"[INFO] Q-Tables salvate al termine dell'addestramento come {q_table_filename_p1} e {q_table_filename_p2}")
-        #np.save(f"qtable/p1/{q_table_filename_p1}", q_table_player1)
-        #np.save(f"qTable/p2/{q_table_filename_p2}", q_table_player2)
-        #print(f"[INFO] Q-Tables salvate al termine dell'addestramento come {q_table_filename_p1} e {q_table_filename_p2}")
-    
-        # Grafico dell'andamento delle ricompense medie
-        avg_rewards(rewards_player1_total, rewards_player2_total, episodes, al, g, decay)
+    if max_steps is not None and len(metriche):
+        print(f"[INFO] Episodi troncati a {max_steps} frame: {metriche.troncati} su {len(metriche)} "
+              f"(decisioni per episodio: p50 {np.percentile(metriche.lengths, 50):.0f}, "
+              f"p99 {np.percentile(metriche.lengths, 99):.0f}, max {metriche.lengths.max()})")
 
-        # Grafico della percentuale di vittorie
-        win_percentage(wins_p1, wins_p2, episodes, al, g, False, decay)
+    if sparse:
+        print(f"[INFO] Stati visitati: P1 {q_player1.visited_states} ({q_player1.nbytes / 2 ** 20:.1f} MB), "
+              f"P2 {q_player2.visited_states} ({q_player2.nbytes / 2 ** 20:.1f} MB) su {discretizer.n_states}")
     
-        # Grafico dei tocchi totali
-        plot_touches(touches_total, episodes, al, g, 300, decay)
-    
-        # Grafico dell'andamento di epsilon
-        #plot_epsilon_decay(epsilon_history, episodes, al, g)
-        print("-----------------------------------------------")
+    if training:
+        q_table_filename_p1, q_table_filename_p2 = salva_q_tables(q_player1, q_player2, episodes, al, g, decay, bins,
+                                                                  frame_skip)
+        if plots:
+            grafici_training(metriche.rewards_player1, metriche.rewards_player2, metriche.touches, metriche.wins_p1,
+                             metriche.wins_p2, episodes, al, g, decay, combinato=combined_report, batch=batch_plots)
 
+        if return_metrics:
+            return q_table_filename_p1, q_table_filename_p2, metriche
         return q_table_filename_p1, q_table_filename_p2
     else:
-        # Grafico dell'andamento delle ricompense medie (testing) e percentuale di vittorie (testing)
-        avg_rewards_testing(rewards_player1_total, rewards_player2_total, episodes, al, g, 100, decay)
-        avg_rewards_testing(rewards_player1_total, rewards_player2_total, episodes, al, g, 200, decay)
-        win_percentage(wins_p1, wins_p2, episodes, al, g, True, decay)
-        print("[INFO] Test completato.")
-        print("-----------------------------------------------")
\ No newline at end of file
+        if plots:
+            grafici_testing(metriche.rewards_player1, metriche.rewards_player2, metriche.wins_p1, metriche.wins_p2,
+                            episodes, al, g, decay, combinato=combined_report, batch=batch_plots)
+        return metriche
+
+
+def carica_q_table(player, nome, state_space_size, n_actions, sola_lettura=False, rng=None):
+    """
+    Carica la Q-Table di un player da qTable/p1 o qTable/p2, se esiste.
+    I file .npq vengono aperti con np.memmap, i vecchi .pkl con pickle.
+    :param player: Numero del player (1 o 2)
+    :param nome: Nome del file della Q-Table
+    :param state_space_size: Dimensioni dello spazio degli stati discretizzato
+    :param n_actions: Numero di azioni
+    :param sola_lettura: Se True (test/demo) la tabella .npq è mappata in sola lettura senza copie
+    :param rng: np.random.RandomState per l'inizializzazione casuale (default: np.random globale)
+    :return: Q-Table caricata o inizializzata casualmente
+    """
+    path = f"qTable/p{player}/{nome}"
+    if os.path.exists(path) and nome.endswith(ESTENSIONE):
+        q_table, _ = carica_npq(path, mmap_mode="r" if sola_lettura else "c")
+        q_table = q_table.as_array()
+        print(f"[INFO] Q-Table Player {player} caricata.")
+    elif os.path.exists(path):
+        with open(path, "rb") as f:
+            q_table = pickle.load(f)
+        print(f"[INFO] Q-Table Player {player} caricata.")
+    else:
+        q_table = (rng or np.random).uniform(low=-1, high=1, size=(state_space_size + (n_actions,)))
+        print(f"[INFO] Q-Table Player {player} inizializzata casualmente.")
+    return q_table
+
+
+def carica_q_table_sparsa(player, nome, n_states, n_actions, rng=None):
+    """
+    Carica la Q-Table sparsa di un player da qTable/p1 o qTable/p2, se esiste.
+    :param player: Numero del player (1 o 2)
+    :param nome: Nome del file della Q-Table (.npqs)
+    :param n_states: Numero di stati discretizzati
+    :param n_actions: Numero di azioni
+    :param rng: np.random.RandomState da cui estrarre il seed dei valori iniziali (default: np.random globale)
+    :return: SparseQTable caricata o vuota (valori iniziali casuali calcolati alla prima lettura)
+    """
+    path = f"qTable/p{player}/{nome}"
+    if os.path.exists(path) and nome.endswith(ESTENSIONE_SPARSA):
+        q_table, _ = carica_sparsa(path)
+        print(f"[INFO] Q-Table sparsa Player {player} caricata ({q_table.visited_states} stati).")
+    else:
+        # Il seed dei valori iniziali dipende da np.random, come per le tabelle dense
+        q_table = SparseQTable(n_states, n_actions, seed=int((rng or np.random).randint(2 ** 31)))
+        print(f"[INFO] Q-Table sparsa Player {player} inizializzata.")
+    return q_table
+
+
+def cartella_checkpoint(episodes, al, g, decay, discrete_bins=10, frame_skip=1, shared=False, adaptive=False):
+    """
+    Cartella dei checkpoint di una configurazione di addestramento (es. checkpoint/120k_alpha0.100_gamma0.990).
+    """
+    nome_p1, _ = nomi_q_tables(episodes, al, g, decay, discrete_bins, frame_skip=frame_skip, shared=shared,
+                               adaptive=adaptive)
+    return os.path.join("checkpoint", os.path.splitext(nome_p1)[0][len("p1_"):])
+
+
+def nomi_q_tables(episodes, al, g, decay, discrete_bins=10, sparse=False, frame_skip=1, offline=False, shared=False,
+                  adaptive=False):
+    """
+    Costruisce i nomi dei file delle Q-Table a partire dai parametri dell'addestramento.
+    Il numero di bins compare nel nome solo se diverso da 10, il frame skip solo se diverso da 1;
+    le Q-Table addestrate offline da tracce registrate hanno il suffisso _offline, quelle condivise tra i due
+    player il suffisso _condivisa, quelle con bins non uniformi (bins_adattivi.py) il suffisso _quantili.
+    :return: Nomi dei file per Player 1 e Player 2
+    """
+    suffisso = "_decayEpisodico" if decay else ""
+    if discrete_bins != 10:
+        suffisso += f"_bins{discrete_bins}"
+    if adaptive:
+        suffisso += "_quantili"
+    if frame_skip != 1:
+        suffisso += f"_skip{frame_skip}"
+    if offline:
+        suffisso += "_offline"
+    if shared:
+        suffisso += "_condivisa"
+    suffisso += ESTENSIONE_SPARSA if sparse else ESTENSIONE
+
+    q_table_filename_p1 = f"p1_{episodes // 1000}k_alpha{al:.3f}_gamma{g:.3f}{suffisso}"
+    q_table_filename_p2 = f"p2_{episodes // 1000}k_alpha{al:.3f}_gamma{g:.3f}{suffisso}"
+    return q_table_filename_p1, q_table_filename_p2
+
+
+def salva_q_tables(q_table_player1, q_table_player2, episodes, al, g, decay, bins, frame_skip=1, **metadati):
+    """
+    Salva le Q-Table in qTable/p1 e qTable/p2 nel formato .npq (.npqs per le Q-Table sparse).
+    :param bins: Bordi dei bins, salvati nell'header insieme ai parametri dell'addestramento
+    :param frame_skip: Frame per decisione usati in addestramento (salvato nell'header)
+    :param metadati: Metadati aggiuntivi per l'header; offline=True aggiunge anche il suffisso _offline ai nomi
+    :return: Nomi dei file salvati
+    """
+    sparse = isinstance(q_table_player1, SparseQTable)
+    salva = salva_sparsa if sparse else salva_npq
+    # Stessa tabella per i due player (shared_q): un solo file, in qTable/p2 un hard link allo stesso file
+    condivisa = q_table_player1 is q_table_player2
+    if condivisa:
+        metadati["shared"] = True
+    q_table_filename_p1, q_table_filename_p2 = nomi_q_tables(episodes, al, g, decay, len(bins[0]), sparse,
+                                                             frame_skip, metadati.get("offline", False), condivisa,
+                                                             not bins_uniformi(bins))
+
+    salva(f"qTable/p1/{q_table_filename_p1}", q_table_player1, bins, alpha=al, gamma=g,
+          episodes=episodes, decay=decay, frame_skip=frame_skip, **metadati)
+    if condivisa:
+        path_p2 = f"qTable/p2/{q_table_filename_p2}"
+        if os.path.exists(path_p2):
+            os.remove(path_p2)
+        try:
+            os.link(f"qTable/p1/{q_table_filename_p1}", path_p2)
+        except OSError:
+            # File system senza hard link: copia
+            shutil.copyfile(f"qTable/p1/{q_table_filename_p1}", path_p2)
+    else:
+        salva(f"qTable/p2/{q_table_filename_p2}", q_table_player2, bins, alpha=al, gamma=g,
+              episodes=episodes, decay=decay, frame_skip=frame_skip, **metadati)
+
+    print(
+        f"[INFO] Q-Tables salvate al termine dell'addestramento come {q_table_filename_p1} e {q_table_filename_p2}")
+    #np.save(f"qtable/p1/{q_table_filename_p1}", q_table_player1)
+    #np.save(f"qTable/p2/{q_table_filename_p2}", q_table_player2)
+    return q_table_filename_p1, q_table_filename_p2
+
+
+def grafici_training(rewards_player1_total, rewards_player2_total, touches_total, wins_p1, wins_p2, episodes, al, g,
+                     decay, mostra=True, combinato=False, batch=False):
+    """
+    Genera i grafici al termine dell'addestramento.
+    :param mostra: Se True mostra i grafici, altrimenti li salva soltanto
+    :param combinato: Se True salva anche un unico report a più pannelli
+    :param batch: Se True i grafici vengono salvati in background con backend Agg e la funzione ritorna subito
+    :return: Processo di generazione dei grafici (solo se batch)
+    """
+    if batch:
+        print("[INFO] Grafici del training in generazione in background.")
+        return grafici_batch.avvia(grafici_training, rewards_player1_total, rewards_player2_total, touches_total,
+                                   wins_p1, wins_p2, episodes, al, g, decay, mostra=False, combinato=combinato)
+
+    # Grafico dell'andamento delle ricompense medie
+    avg_rewards(rewards_player1_total, rewards_player2_total, episodes, al, g, decay, mostra)
+
+    # Grafico della percentuale di vittorie
+    win_percentage(wins_p1, wins_p2, episodes, al, g, False, decay, mostra)
+
+    # Grafico dei tocchi totali
+    plot_touches(touches_total, episodes, al, g, 300, decay, mostra)
+
+    # Grafico dell'andamento di epsilon
+    #plot_epsilon_decay(epsilon_history, episodes, al, g)
+
+    if combinato:
+        report_combinato(rewards_player1_total, rewards_player2_total, touches_total, wins_p1, wins_p2, episodes,
+                         al, g, False, decay, mostra)
+    print("-----------------------------------------------")
+
+
+def grafici_testing(rewards_player1_total, rewards_player2_total, wins_p1, wins_p2, episodes, al, g, decay,
+                    mostra=True, combinato=False, batch=False):
+    """
+    Genera i grafici al termine del testing.
+    :param mostra: Se True mostra i grafici, altrimenti li salva soltanto
+    :param combinato: Se True salva anche un unico report a più pannelli
+    :param batch: Se True i grafici vengono salvati in background con backend Agg e la funzione ritorna subito
+    :return: Processo di generazione dei grafici (solo se batch)
+    """
+    if batch:
+        print("[INFO] Grafici del test in generazione in background.")
+        return grafici_batch.avvia(grafici_testing, rewards_player1_total, rewards_player2_total, wins_p1, wins_p2,
+                                   episodes, al, g, decay, mostra=False, combinato=combinato)
+
+    # Grafico dell'andamento delle ricompense medie (testing) e percentuale di vittorie (testing)
+    avg_rewards_testing(rewards_player1_total, rewards_player2_total, episodes, al, g, 100, decay, mostra)
+    avg_rewards_testing(rewards_player1_total, rewards_player2_total, episodes, al, g, 200, decay, mostra)
+    win_percentage(wins_p1, wins_p2, episodes, al, g, True, decay, mostra)
+
+    if combinato:
+        report_combinato(rewards_player1_total, rewards_player2_total, None, wins_p1, wins_p2, episodes, al, g,
+                         True, decay, mostra)
+    print("[INFO] Test completato.")
+    print("-----------------------------------------------")
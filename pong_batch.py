@@ -0,0 +1,210 @@
+import random
+import numpy as np
+
+from pong_core import (SCREEN_WIDTH, SCREEN_HEIGHT, PADDLE_WIDTH, PADDLE_HEIGHT, BALL_SIZE, PADDLE_SPEED,
+                       BALL_SPEED, MAX_BALL_SPEED, N_ACTIONS)
+
+
+class BatchPongEnv:
+    """
+    Versione vettorizzata di PongCore: simula num_envs partite contemporaneamente.
+    Lo stato di paddle e palla è mantenuto in array NumPy e ogni passo applica la stessa
+    fisica di PongCore (_update_paddle_position, _move_ball, _handle_collisions) come
+    operazioni su array. Non utilizza Pygame, quindi è pensato solo per l'addestramento.
+    """
+    def __init__(self, num_envs, seed=None, auto_reset=True):
+        # Stesse dimensioni di PongCore
+        self.SCREEN_WIDTH = SCREEN_WIDTH
+        self.SCREEN_HEIGHT = SCREEN_HEIGHT
+        self.PADDLE_WIDTH = PADDLE_WIDTH
+        self.PADDLE_HEIGHT = PADDLE_HEIGHT
+        self.BALL_SIZE = BALL_SIZE
+        self.PADDLE_SPEED = PADDLE_SPEED
+        self.BALL_SPEED = BALL_SPEED
+        self.MAX_BALL_SPEED = MAX_BALL_SPEED
+        self.N_ACTIONS = N_ACTIONS
+
+        self.num_envs = num_envs
+        self.auto_reset = auto_reset
+
+        # Generatore dedicato: con lo stesso seed estrae le direzioni nello stesso ordine
+        # di PongCore.reset (che usa il modulo random globale)
+        self.rng = random.Random(seed)
+
+        # Stato delle partite
+        self.player1_y = np.zeros(num_envs, dtype=np.int64)
+        self.player2_y = np.zeros(num_envs, dtype=np.int64)
+        self.ball_x = np.zeros(num_envs, dtype=np.float64)
+        self.ball_y = np.zeros(num_envs, dtype=np.float64)
+        self.ball_dx = np.zeros(num_envs, dtype=np.float64)
+        self.ball_dy = np.zeros(num_envs, dtype=np.float64)
+
+        self.touches = np.zeros(num_envs, dtype=np.int64)
+        self.paddle1_touched = np.zeros(num_envs, dtype=bool)
+        self.paddle2_touched = np.zeros(num_envs, dtype=bool)
+
+        # Punteggio (come in PongCore non viene azzerato dal reset)
+        self.score_player1 = np.zeros(num_envs, dtype=np.int64)
+        self.score_player2 = np.zeros(num_envs, dtype=np.int64)
+
+        self.reset()
+
+    def reset(self, mask=None):
+        """
+        Resetta le partite indicate (tutte se mask è None).
+        :param mask: Array booleano (num_envs,) delle partite da resettare
+        :return: Osservazioni (num_envs, 6)
+        """
+        if mask is None:
+            idx = np.arange(self.num_envs)
+        else:
+            idx = np.flatnonzero(mask)
+
+        self.player1_y[idx] = (self.SCREEN_HEIGHT - self.PADDLE_HEIGHT) // 2
+        self.player2_y[idx] = (self.SCREEN_HEIGHT - self.PADDLE_HEIGHT) // 2
+        self.ball_x[idx] = self.SCREEN_WIDTH // 2
+        self.ball_y[idx] = self.SCREEN_HEIGHT // 2
+
+        # Direzione casuale per la palla, estratta partita per partita nello stesso ordine di PongCore
+        rng = self.rng
+        for i in idx:
+            self.ball_dx[i] = rng.choice([-1, 1]) * rng.randint(2, 3)
+            self.ball_dy[i] = rng.choice([-1, 1]) * rng.randint(2, 3)
+
+        self.touches[idx] = 0
+        self.paddle1_touched[idx] = False
+        self.paddle2_touched[idx] = False
+        return self._get_obs()
+
+    def step(self, actions1, actions2):
+        """
+        Esegue un passo in tutte le partite.
+
+        Args:
+            actions1 (np.ndarray): Azioni del Player 1, shape (num_envs,).
+            actions2 (np.ndarray): Azioni del Player 2, shape (num_envs,).
+
+        Returns:
+            tuple: (osservazioni, ricompense (num_envs, 2), done (num_envs,), info)
+            Con auto_reset le partite terminate vengono resettate e info contiene
+            l'osservazione finale ("terminal_obs") e i tocchi dell'episodio ("touches").
+        """
+        actions1 = np.asarray(actions1)
+        actions2 = np.asarray(actions2)
+
+        self._update_paddle_position(actions1, actions2)
+        self._move_ball()
+        rewards, dones = self._handle_collisions()
+
+        info = {}
+        if self.auto_reset:
+            info["terminal_obs"] = self._get_obs()
+            info["touches"] = self.touches.copy()
+            if dones.any():
+                self.reset(dones)
+
+        return self._get_obs(), rewards, dones, info
+
+    def _get_obs(self):
+        return np.stack((self.player1_y, self.player2_y, self.ball_x, self.ball_y, self.ball_dx, self.ball_dy),
+                        axis=1).astype(np.float64)
+
+    def _update_paddle_position(self, actions1, actions2):
+        """
+        Aggiorna la posizione dei paddle di tutte le partite.
+        """
+        max_y = self.SCREEN_HEIGHT - self.PADDLE_HEIGHT
+
+        up1 = (actions1 == 1) & (self.player1_y > 0)
+        down1 = (actions1 == 2) & (self.player1_y < max_y)
+        self.player1_y += self.PADDLE_SPEED * (down1.astype(np.int64) - up1)
+
+        up2 = (actions2 == 1) & (self.player2_y > 0)
+        down2 = (actions2 == 2) & (self.player2_y < max_y)
+        self.player2_y += self.PADDLE_SPEED * (down2.astype(np.int64) - up2)
+
+    def _move_ball(self):
+        """
+        Aggiorna la posizione della palla in tutte le partite.
+        """
+        self.ball_x += self.ball_dx
+        self.ball_y += self.ball_dy
+
+        # Collisione con bordi superiore/inferiore
+        wall = (self.ball_y <= 0) | (self.ball_y >= self.SCREEN_HEIGHT - self.BALL_SIZE)
+        self.ball_dy[wall] *= -1
+
+    def _collides(self, paddle_x, paddle_y):
+        """
+        Test AABB equivalente a pygame.Rect.colliderect: Rect tronca le coordinate a intero.
+        """
+        bx = np.trunc(self.ball_x)
+        by = np.trunc(self.ball_y)
+        return ((bx < paddle_x + self.PADDLE_WIDTH) & (bx + self.BALL_SIZE > paddle_x) &
+                (by < paddle_y + self.PADDLE_HEIGHT) & (by + self.BALL_SIZE > paddle_y))
+
+    def _bounce(self, hit, paddle_y, new_ball_x, rewards):
+        """
+        Applica il rimbalzo sul paddle alle partite in hit e accumula le ricompense.
+        """
+        dx = -self.ball_dx[hit]
+        touches = self.touches[hit] + 1
+
+        # Incremento velocità ogni 3 tocchi. In PongCore anche ball_dy viene incrementata,
+        # ma il valore è subito sovrascritto dalla deviazione sul punto di impatto
+        speed_up = touches % 3 == 0
+        dx = np.where(speed_up, np.clip(dx + np.where(dx > 0, 1, -1), -self.MAX_BALL_SPEED, self.MAX_BALL_SPEED), dx)
+
+        # Aggiusta la traiettoria basata sul punto di impatto
+        impact_point = (self.ball_y[hit] - paddle_y[hit]) / self.PADDLE_HEIGHT
+        self.ball_dy[hit] = (impact_point - 0.5) * 2 * np.abs(dx)
+        self.ball_dx[hit] = dx
+        self.ball_x[hit] = new_ball_x
+        self.touches[hit] = touches
+
+        rewards[hit] += np.where((impact_point < 0.15) | (impact_point > 0.85), 2, 1)
+
+    def _handle_collisions(self):
+        """
+        Gestisce le collisioni tra la palla e i paddle e calcola le ricompense.
+
+        Returns:
+            tuple: Ricompense (num_envs, 2) e flag di fine partita (num_envs,).
+        """
+        rewards = np.zeros((self.num_envs, 2), dtype=np.int64)
+
+        # Collisione paddle sinistro
+        hit1 = self._collides(0, self.player1_y)
+        if hit1.any():
+            self.paddle1_touched |= hit1
+            self._bounce(hit1, self.player1_y, self.PADDLE_WIDTH, rewards[:, 0])
+
+        # Collisione paddle destro (valutata dopo l'eventuale rimbalzo sul sinistro, come in PongCore)
+        hit2 = self._collides(self.SCREEN_WIDTH - self.PADDLE_WIDTH, self.player2_y)
+        if hit2.any():
+            self.paddle2_touched |= hit2
+            self._bounce(hit2, self.player2_y, self.SCREEN_WIDTH - self.PADDLE_WIDTH - self.BALL_SIZE, rewards[:, 1])
+
+        # Penalità e Reward quando la palla supera i paddle
+        point_p2 = self.ball_x < 0
+        point_p1 = ~point_p2 & (self.ball_x > self.SCREEN_WIDTH)
+
+        # Punto per Player 2: +1 e punteggio solo se il Player 2 ha toccato la palla
+        scored2 = point_p2 & self.paddle2_touched
+        self.score_player2 += scored2
+        rewards[point_p2, 0] -= 5
+        rewards[:, 1] += scored2
+
+        # Punto per Player 1
+        scored1 = point_p1 & self.paddle1_touched
+        self.score_player1 += scored1
+        rewards[point_p1, 1] -= 5
+        rewards[:, 0] += scored1
+
+        return rewards, point_p2 | point_p1
+
+    def close(self):
+        """
+        Nessuna risorsa da rilasciare: presente per compatibilità con PongCore.
+        """
+        pass
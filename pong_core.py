@@ -0,0 +1,318 @@
+import random
+import numpy as np
+
+# Dimensioni del campo e parametri di gioco
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+PADDLE_WIDTH = 10
+PADDLE_HEIGHT = 100
+BALL_SIZE = 25
+PADDLE_SPEED = 5
+BALL_SPEED = 7
+MAX_BALL_SPEED = 15
+
+# Azioni: 0: Stay, 1: Up, 2: Down
+N_ACTIONS = 3
+
+
+def rect_overlap(ax, ay, aw, ah, bx, by, bw, bh):
+    """
+    Test di sovrapposizione AABB equivalente a pygame.Rect.colliderect.
+    Come Rect, le coordinate vengono troncate a intero.
+    :return: True se i due rettangoli si sovrappongono
+    """
+    ax = int(ax)
+    ay = int(ay)
+    return ax < bx + bw and ay < by + bh and ax + aw > bx and ay + ah > by
+
+
+class PongCore:
+    """
+    Fisica del gioco Pong senza dipendenze da Pygame o Gym.
+    Viene usata direttamente per l'addestramento headless ed estesa da PongEnv per la grafica.
+    """
+    def __init__(self, max_steps=None, frame_skip=1, seed=None):
+        """
+        :param max_steps: Se indicato, un episodio che raggiunge max_steps frame senza punti viene troncato
+                          (done True e truncated True)
+        :param frame_skip: Numero di frame di fisica per ogni step: l'azione viene ripetuta e le ricompense sommate
+        :param seed: Se indicato, reset usa un generatore dedicato con questo seed (episodi riproducibili),
+                     altrimenti il modulo random globale
+        """
+        # Dimensioni della finestra
+        self.SCREEN_WIDTH = SCREEN_WIDTH
+        self.SCREEN_HEIGHT = SCREEN_HEIGHT
+        self.PADDLE_WIDTH = PADDLE_WIDTH
+        self.PADDLE_HEIGHT = PADDLE_HEIGHT
+        self.BALL_SIZE = BALL_SIZE
+        self.PADDLE_SPEED = PADDLE_SPEED
+        self.BALL_SPEED = BALL_SPEED
+        self.MAX_BALL_SPEED = MAX_BALL_SPEED
+        self.N_ACTIONS = N_ACTIONS
+
+        # Punteggio
+        self.score_player1 = 0
+        self.score_player2 = 0
+
+        # Numero di tocchi per il progresso della velocità
+        self.touches = 0
+
+        # Flag per verificare se i paddle hanno toccato la palla
+        self.paddle1_touched = False
+        self.paddle2_touched = False
+
+        # Profiler opzionale (profiling.Profiler) per i tempi delle fasi di step
+        self.profiler = None
+
+        # Registratore opzionale (tracce.Registratore) delle traiettorie
+        self.registratore = None
+
+        # Limite di frame per episodio (None: nessun limite) e frame per ogni step
+        self.max_steps = max_steps
+        self.frame_skip = frame_skip
+
+        self.seed(seed)
+        self.reset()
+
+    def seed(self, seed=None):
+        """
+        Imposta il generatore casuale usato da reset per la direzione iniziale della palla.
+        :param seed: Seed di un generatore dedicato, None per il modulo random globale
+        :return: Lista con il seed (come gym.Env.seed)
+        """
+        self.rng = random if seed is None else random.Random(seed)
+        return [seed]
+
+    def reset(self):
+        """
+        Resetta lo stato dell'ambiente all'inizio di un episodio.
+        """
+        self.player1_y = (self.SCREEN_HEIGHT - self.PADDLE_HEIGHT) // 2
+        self.player2_y = (self.SCREEN_HEIGHT - self.PADDLE_HEIGHT) // 2
+        self.ball_x = self.SCREEN_WIDTH // 2
+        self.ball_y = self.SCREEN_HEIGHT // 2
+
+        # Direzione casuale per la palla
+        self.ball_dx = self.rng.choice([-1, 1]) * self.rng.randint(2, 3)
+        self.ball_dy = self.rng.choice([-1, 1]) * self.rng.randint(2, 3)
+
+        self.touches = 0
+        self.paddle1_touched = False
+        self.paddle2_touched = False
+        self.done = False
+        self.truncated = False
+        self.steps = 0
+        if self.registratore is not None:
+            self.registratore.inizio(self)
+        return self._get_obs()
+
+    def step(self, action1, action2):
+        """
+        Esegue un passo nell'ambiente basato sulle azioni fornite.
+        Con frame_skip > 1 le azioni vengono ripetute per frame_skip frame (meno se l'episodio termina prima)
+        e le ricompense dei frame vengono sommate.
+
+        Args:
+            action1 (int): Azione del Player 1.
+            action2 (int): Azione del Player 2.
+
+        Returns:
+            tuple: (osservazione, ricompense, done, info)
+            Se l'episodio è stato troncato da max_steps info contiene "truncated": True
+        """
+        rewards = self._frame(action1, action2)
+
+        if self.frame_skip > 1:
+            reward_player1, reward_player2 = rewards
+            for _ in range(self.frame_skip - 1):
+                if self.done:
+                    break
+                frame_reward1, frame_reward2 = self._frame(action1, action2)
+                reward_player1 += frame_reward1
+                reward_player2 += frame_reward2
+            rewards = (reward_player1, reward_player2)
+
+        if self.registratore is not None:
+            self.registratore.passo(self, action1, action2, rewards)
+
+        if self.truncated:
+            return self._get_obs(), rewards, self.done, {"truncated": True}
+        return self._get_obs(), rewards, self.done, {}
+
+    def _frame(self, action1, action2):
+        """
+        Avanza la fisica di un frame.
+        :return: Ricompense del frame (Player 1, Player 2)
+        """
+        profiler = self.profiler
+        if profiler is None:
+            # Aggiorna le posizioni dei paddle
+            self._update_paddle_position(action1, action2)
+
+            # Muovi la palla
+            self._move_ball()
+
+            # Gestisci le collisioni e aggiorna le ricompense
+            rewards = self._handle_collisions()
+        else:
+            t = profiler.inizio()
+            self._update_paddle_position(action1, action2)
+            t = profiler.misura("step/paddle", t)
+            self._move_ball()
+            t = profiler.misura("step/palla", t)
+            rewards = self._handle_collisions()
+            profiler.misura("step/collisioni", t)
+
+        self.steps += 1
+        if self.max_steps is not None and self.steps >= self.max_steps and not self.done:
+            # Troncamento: l'episodio termina senza punti, lo stato finale non è terminale
+            self.done = True
+            self.truncated = True
+
+        return rewards
+
+    def render(self, mode='human'):
+        """
+        Nessuna grafica nella versione headless.
+        """
+        pass
+
+    def close(self):
+        """
+        Nella versione headless chiude solo l'eventuale registratore.
+        """
+        if self.registratore is not None:
+            self.registratore.chiudi()
+            self.registratore = None
+
+    def _get_obs(self):
+        return (self.player1_y, self.player2_y, self.ball_x, self.ball_y, self.ball_dx, self.ball_dy)
+
+    def _on_paddle_hit(self):
+        """
+        Chiamata quando la palla colpisce un paddle (usata da PongEnv per i suoni).
+        """
+        pass
+
+    def _on_point(self):
+        """
+        Chiamata quando viene segnato un punto (usata da PongEnv per i suoni).
+        """
+        pass
+
+    def _update_paddle_position(self, action1, action2):
+        """
+        Aggiorna la posizione dei paddle in base alle azioni fornite.
+
+        Args:
+            action1 (int): Azione del Player 1.
+            action2 (int): Azione del Player 2.
+        """
+        # Paddle Player 1
+        if action1 == 1 and self.player1_y > 0:
+            self.player1_y -= self.PADDLE_SPEED
+        if action1 == 2 and self.player1_y < self.SCREEN_HEIGHT - self.PADDLE_HEIGHT:
+            self.player1_y += self.PADDLE_SPEED
+
+        # Paddle Player 2
+        if action2 == 1 and self.player2_y > 0:
+            self.player2_y -= self.PADDLE_SPEED
+        if action2 == 2 and self.player2_y < self.SCREEN_HEIGHT - self.PADDLE_HEIGHT:
+            self.player2_y += self.PADDLE_SPEED
+
+    def _move_ball(self):
+        """
+        Aggiorna la posizione della palla.
+        """
+        self.ball_x += self.ball_dx
+        self.ball_y += self.ball_dy
+
+        # Collisione con bordi superiore/inferiore
+        if self.ball_y <= 0 or self.ball_y >= self.SCREEN_HEIGHT - self.BALL_SIZE:
+            self.ball_dy *= -1
+
+    def _handle_collisions(self):
+        """
+        Gestisce le collisioni tra la palla e i paddle e aggiorna le ricompense.
+
+        Returns:
+            tuple: Ricompense per Player 1 e Player 2.
+        """
+        reward_player1 = 0
+        reward_player2 = 0
+
+        # Collisione paddle sinistro
+        if rect_overlap(self.ball_x, self.ball_y, self.BALL_SIZE, self.BALL_SIZE,
+                        0, self.player1_y, self.PADDLE_WIDTH, self.PADDLE_HEIGHT):
+            self.ball_dx *= -1
+            self.ball_x = self.PADDLE_WIDTH  # Evita sovrapposizioni
+            self.touches += 1
+            self.paddle1_touched = True
+            self._on_paddle_hit()
+
+            # Incremento velocità ogni 3 tocchi
+            if self.touches % 3 == 0:
+                self.ball_dx = np.clip(self.ball_dx + (1 if self.ball_dx > 0 else -1), -self.MAX_BALL_SPEED,
+                                       self.MAX_BALL_SPEED)
+                self.ball_dy = np.clip(self.ball_dy + (1 if self.ball_dy > 0 else -1), -self.MAX_BALL_SPEED,
+                                       self.MAX_BALL_SPEED)
+
+            #Aggiusta la traiettoria basata sul punto di impatto
+            impact_point = (self.ball_y - self.player1_y) / self.PADDLE_HEIGHT
+            self.ball_dy = (impact_point - 0.5) * 2 * abs(self.ball_dx)
+
+            if impact_point < 0.15 or impact_point > 0.85:
+                reward_player1 += 2
+            else:
+                reward_player1 += 1
+
+        # Collisione paddle destro
+        if rect_overlap(self.ball_x, self.ball_y, self.BALL_SIZE, self.BALL_SIZE,
+                        self.SCREEN_WIDTH - self.PADDLE_WIDTH, self.player2_y, self.PADDLE_WIDTH, self.PADDLE_HEIGHT):
+            self.ball_dx *= -1
+            self.ball_x = self.SCREEN_WIDTH - self.PADDLE_WIDTH - self.BALL_SIZE  # Evita sovrapposizioni
+            self.touches += 1
+            self.paddle2_touched = True
+            self._on_paddle_hit()
+
+            # Incremento velocità ogni 3 tocchi
+            if self.touches % 3 == 0:
+                self.ball_dx = np.clip(self.ball_dx + (1 if self.ball_dx > 0 else -1), -self.MAX_BALL_SPEED,
+                                       self.MAX_BALL_SPEED)
+                self.ball_dy = np.clip(self.ball_dy + (1 if self.ball_dy > 0 else -1), -self.MAX_BALL_SPEED,
+                                       self.MAX_BALL_SPEED)
+
+            #Aggiusta la traiettoria basata sul punto di impatto
+            impact_point = (self.ball_y - self.player2_y) / self.PADDLE_HEIGHT
+            self.ball_dy = (impact_point - 0.5) * 2 * abs(self.ball_dx)
+
+            # Ricompensa basata sul punto di impatto (bonus per i punti estremi)
+            if impact_point < 0.15 or impact_point > 0.85:
+                reward_player2 += 2
+            else:
+                reward_player2 += 1
+
+        # Penalità e Reward quando la palla supera i paddle
+        if self.ball_x < 0:  # Punto per Player 2
+            self._on_point()
+
+            if self.paddle2_touched:  # Paddle 2 ha toccato, penalità per Player 1
+                self.score_player2 += 1
+                reward_player1 -= 5
+                reward_player2 += 1
+            else:  # Paddle 2 non ha toccato, solo penalità per Player 1
+                reward_player1 -= 5
+            self.done = True
+
+        elif self.ball_x > self.SCREEN_WIDTH:  # Punto per Player 1
+            self._on_point()
+
+            if self.paddle1_touched:  # Paddle 1 ha toccato, penalità per Player 2
+                self.score_player1 += 1
+                reward_player2 -= 5
+                reward_player1 += 1
+            else:  # Paddle 1 non ha toccato, solo penalità per Player 2
+                reward_player2 -= 5
+            self.done = True
+
+        return reward_player1, reward_player2
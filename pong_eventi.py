@@ -0,0 +1,446 @@
+"""
+Simulazione a eventi di episodi greedy, con le stesse regole di PongCore (punteggio, ricompense, accelerazione
+ogni 3 tocchi, troncamento e frame-skip).
+
+Tra un contatto e l'altro la palla si muove in linea retta e i paddle a velocità costante: invece di avanzare
+frame per frame, la simulazione calcola in forma chiusa il prossimo evento significativo e salta direttamente
+lì. Gli eventi sono:
+- l'ingresso della palla nella zona dei paddle (da lì la fisica avanza frame per frame fino al tocco o al punto);
+- il rimbalzo su un bordo (con la regola di PongCore: la direzione si inverte dopo lo spostamento);
+- il troncamento a max_steps frame;
+- la prima decisione in cui cambia lo stato discretizzato di uno dei due player.
+Con politiche greedy, finché lo stato discretizzato non cambia anche le azioni restano le stesse, quindi le
+osservazioni di ogni decisione sono quelle che produrrebbe PongCore. Le posizioni sono calcolate come
+y + n * dy invece che con n somme successive: i risultati coincidono con la simulazione per frame a meno
+di arrotondamenti.
+
+Fornisce anche intercetta e azione_oracolo, che prevedono in forma chiusa dove la palla arriverà sul piano
+di un paddle (bersagli "oracolo" di riferimento).
+"""
+import math
+
+import numpy as np
+
+from compiled_training import _accelera, _azione_greedy, _njit, _overlap, tabelle_discretizer
+from pong_core import (SCREEN_WIDTH, SCREEN_HEIGHT, PADDLE_WIDTH, PADDLE_HEIGHT, BALL_SIZE, PADDLE_SPEED,
+                       MAX_BALL_SPEED, N_ACTIONS)
+
+# Numero di frame "infinito" per gli eventi che non avverranno mai
+MAI = 1 << 62
+
+# Limiti della zona dei paddle per la coordinata x (intera) della palla: da qui si procede frame per frame
+ZONA_SINISTRA = PADDLE_WIDTH - 1
+ZONA_DESTRA = SCREEN_WIDTH - PADDLE_WIDTH - BALL_SIZE + 1
+LIMITE_PARETE = SCREEN_HEIGHT - BALL_SIZE
+LIMITE_PADDLE = SCREEN_HEIGHT - PADDLE_HEIGHT
+
+# Tabelle dei cambi di bin già calcolate, per bins
+_cache = {}
+
+
+@_njit
+def _frames_zona(ball_x, ball_dx):
+    # Primo frame (>= 1) in cui la palla entra nella zona del paddle verso cui si muove (x e dx interi, dx != 0)
+    if ball_dx < 0:
+        n = int(math.ceil((ball_x - ZONA_SINISTRA) / -ball_dx))
+    else:
+        n = int(math.ceil((ZONA_DESTRA - ball_x) / ball_dx))
+    return max(n, 1)
+
+
+@_njit
+def _frames_parete(ball_y, ball_dy):
+    # Primo frame (>= 1) in cui PongCore inverte ball_dy: y + n * dy <= 0 oppure >= LIMITE_PARETE
+    y = ball_y + ball_dy
+    if y <= 0 or y >= LIMITE_PARETE:
+        return 1
+    if ball_dy > 0:
+        n = int(math.ceil((LIMITE_PARETE - ball_y) / ball_dy))
+        while ball_y + n * ball_dy < LIMITE_PARETE:
+            n += 1
+        while n > 1 and ball_y + (n - 1) * ball_dy >= LIMITE_PARETE:
+            n -= 1
+        return n
+    if ball_dy < 0:
+        n = int(math.ceil(ball_y / -ball_dy))
+        while ball_y + n * ball_dy > 0:
+            n += 1
+        while n > 1 and ball_y + (n - 1) * ball_dy <= 0:
+            n -= 1
+        return n
+    return MAI
+
+
+@_njit
+def _frames_bordo(value, velocita, bordi, n_bordi):
+    # Primo frame (>= 1) in cui value + n * velocita attraversa uno dei bordi (cambia il bin di np.digitize)
+    if velocita > 0:
+        for i in range(n_bordi):
+            bordo = bordi[i]
+            if bordo > value:
+                n = max(int(math.ceil((bordo - value) / velocita)), 1)
+                while value + n * velocita < bordo:
+                    n += 1
+                while n > 1 and value + (n - 1) * velocita >= bordo:
+                    n -= 1
+                return n
+    elif velocita < 0:
+        for i in range(n_bordi - 1, -1, -1):
+            bordo = bordi[i]
+            if bordo <= value:
+                n = max(int(math.floor((value - bordo) / -velocita)) + 1, 1)
+                while value + n * velocita >= bordo:
+                    n += 1
+                while n > 1 and value + (n - 1) * velocita < bordo:
+                    n -= 1
+                return n
+    return MAI
+
+
+@_njit
+def _velocita_paddle(action, paddle_y):
+    # Velocità del paddle per l'azione (0 se è fermo contro il bordo, come in PongCore)
+    if action == 1 and paddle_y > 0:
+        return -PADDLE_SPEED
+    if action == 2 and paddle_y < LIMITE_PADDLE:
+        return PADDLE_SPEED
+    return 0
+
+
+@_njit
+def _sposta_paddle(paddle_y, velocita, n):
+    # Posizione dopo n frame a velocità costante, fermandosi ai bordi
+    return min(max(paddle_y + n * velocita, 0), LIMITE_PADDLE)
+
+
+@_njit
+def _tabella_paddle(bordi, n_bordi):
+    """
+    Frame al prossimo cambio di bin di un paddle (dimensioni 0 e 1, cioè entrambe le prospettive) per azione e
+    posizione (multipla di PADDLE_SPEED); MAI se il paddle si ferma al bordo prima di cambiare bin.
+    """
+    tabella = np.full((N_ACTIONS, LIMITE_PADDLE // PADDLE_SPEED + 1), MAI, dtype=np.int64)
+    for action in range(N_ACTIONS):
+        for i in range(tabella.shape[1]):
+            paddle_y = i * PADDLE_SPEED
+            velocita = _velocita_paddle(action, paddle_y)
+            n = min(_frames_bordo(paddle_y, velocita, bordi[0], n_bordi[0]),
+                    _frames_bordo(paddle_y, velocita, bordi[1], n_bordi[1]))
+            if n < MAI and 0 <= paddle_y + n * velocita <= LIMITE_PADDLE:
+                tabella[action, i] = n
+    return tabella
+
+
+@_njit
+def _tabella_x(bordi, n_bordi):
+    """
+    Frame al prossimo cambio di bin di ball_x (per entrambe le prospettive) per posizione intera in
+    [0, SCREEN_WIDTH] e velocità (indice ball_dx + MAX_BALL_SPEED).
+    """
+    tabella = np.full((SCREEN_WIDTH + 1, 2 * MAX_BALL_SPEED + 1), MAI, dtype=np.int64)
+    for x in range(SCREEN_WIDTH + 1):
+        for dx in range(-MAX_BALL_SPEED, MAX_BALL_SPEED + 1):
+            if dx != 0:
+                tabella[x, dx + MAX_BALL_SPEED] = min(
+                    _frames_bordo(float(x), float(dx), bordi[2], n_bordi[2]),
+                    _frames_bordo(float(SCREEN_WIDTH - x), float(-dx), bordi[2], n_bordi[2]))
+    return tabella
+
+
+@_njit
+def intercetta(ball_x, ball_y, ball_dx, ball_dy):
+    """
+    Prevede in forma chiusa l'arrivo della palla nella zona del paddle verso cui si muove, applicando i
+    rimbalzi sui bordi con la regola di PongCore (senza considerare i paddle).
+    :return: (frame all'arrivo, ball_y all'arrivo, ball_dy all'arrivo)
+    """
+    frames = _frames_zona(ball_x, ball_dx)
+    rimanenti = frames
+    while True:
+        n = _frames_parete(ball_y, ball_dy)
+        if n > rimanenti:
+            return frames, ball_y + rimanenti * ball_dy, ball_dy
+        ball_y += n * ball_dy
+        ball_dy = -ball_dy
+        rimanenti -= n
+        if rimanenti == 0:
+            return frames, ball_y, ball_dy
+
+
+def azione_oracolo(obs, player):
+    """
+    Azione di riferimento ("oracolo") per un player: se la palla si avvicina, porta il centro del paddle
+    sul punto di arrivo previsto da intercetta, altrimenti torna al centro del campo.
+    :param obs: Osservazione di PongCore (player1_y, player2_y, ball_x, ball_y, ball_dx, ball_dy)
+    :param player: 1 (paddle sinistro) o 2 (paddle destro)
+    :return: Azione (0: Stay, 1: Up, 2: Down)
+    """
+    player1_y, player2_y, ball_x, ball_y, ball_dx, ball_dy = obs
+    paddle_y = player1_y if player == 1 else player2_y
+    if (ball_dx < 0) == (player == 1):
+        _, arrivo, _ = intercetta(float(ball_x), float(ball_y), float(ball_dx), float(ball_dy))
+        bersaglio = arrivo + BALL_SIZE / 2
+    else:
+        bersaglio = SCREEN_HEIGHT / 2
+
+    centro = paddle_y + PADDLE_HEIGHT / 2
+    if bersaglio < centro - PADDLE_SPEED:
+        return 1
+    if bersaglio > centro + PADDLE_SPEED:
+        return 2
+    return 0
+
+
+@_njit
+def _episodi_eventi(q1, q2, velocita_x, velocita_y, max_steps, frame_skip, scale, k0, k1, thr, lo, hi,
+                    tabella_paddle, tabella_x, bordi_y, rewards1, rewards2, touches_out, lengths, truncated_out,
+                    eventi_out):
+    """
+    Esegue len(velocita_x) episodi greedy a eventi, con le velocità iniziali della palla indicate, e scrive
+    ricompense, tocchi, passi (decisioni), troncamenti ed eventi simulati di ciascuno negli array di uscita.
+    I cambi di bin di paddle e ball_x (valori interi) vengono letti dalle tabelle precalcolate, quelli di ball_y
+    sono calcolati a ogni evento.
+    """
+    osservazioni = np.empty((2, 6))
+
+    for episode in range(len(velocita_x)):
+        # PongCore.reset
+        player1_y = LIMITE_PADDLE // 2
+        player2_y = LIMITE_PADDLE // 2
+        ball_x = float(SCREEN_WIDTH // 2)
+        ball_y = float(SCREEN_HEIGHT // 2)
+        ball_dx = float(velocita_x[episode])
+        ball_dy = float(velocita_y[episode])
+        touches = 0
+        paddle1_touched = False
+        paddle2_touched = False
+
+        done = False
+        troncato = False
+        total_reward1 = 0
+        total_reward2 = 0
+        action1 = 0
+        action2 = 0
+        frames = 0
+        # Frame trascorsi dall'ultima decisione (le decisioni cadono sui multipli di frame_skip)
+        fase = 0
+        eventi = 0
+        # Ultime due decisioni (stato dei paddle, frame, frame del prossimo cambio di bin della palla) e frame
+        # dell'ultimo frame di fisica, per riconoscere i paddle che oscillano attorno a un bordo
+        stato_prec1 = stato_prec2 = -1
+        frame_prec1 = frame_prec2 = -1
+        palla_prec1 = palla_prec2 = -1
+        ultima_fisica = 0
+
+        while True:
+            eventi += 1
+            if fase == 0:
+                # Decisione: osservazioni, discretizzazione e azioni greedy (come _episodi con epsilon = 0)
+                osservazioni[0, 0] = player1_y
+                osservazioni[0, 1] = player2_y
+                osservazioni[0, 2] = ball_x
+                osservazioni[0, 3] = ball_y
+                osservazioni[0, 4] = ball_dx
+                osservazioni[0, 5] = ball_dy
+                osservazioni[1, 0] = player2_y
+                osservazioni[1, 1] = player1_y
+                osservazioni[1, 2] = SCREEN_WIDTH - ball_x
+                osservazioni[1, 3] = ball_y
+                osservazioni[1, 4] = -ball_dx
+                osservazioni[1, 5] = ball_dy
+
+                for p in range(2):
+                    index = 0
+                    for d in range(6):
+                        value = osservazioni[p, d]
+                        k = math.floor(value * scale[d])
+                        if k < k0[d]:
+                            k = k0[d]
+                        elif k > k1[d]:
+                            k = k1[d]
+                        k -= k0[d]
+                        if value >= thr[d, k]:
+                            index += hi[d, k]
+                        else:
+                            index += lo[d, k]
+                    if p == 0:
+                        action1 = _azione_greedy(q1, index)
+                    else:
+                        action2 = _azione_greedy(q2, index)
+
+            velocita1 = _velocita_paddle(action1, player1_y)
+            velocita2 = _velocita_paddle(action2, player2_y)
+
+            # Primo frame con fisica non lineare: zona dei paddle, rimbalzo o troncamento
+            fisica = min(_frames_zona(ball_x, ball_dx), _frames_parete(ball_y, ball_dy))
+            if max_steps > 0:
+                fisica = min(fisica, max_steps - frames)
+
+            # Prima decisione in cui lo stato discretizzato di uno dei due player può essere cambiato.
+            # A metà di una decisione lo stato può essere già cambiato dall'ultimo evento: si decide alla prossima
+            prima = frame_skip - fase
+            decisione = prima
+            if fase == 0:
+                orizzonte_palla = min(tabella_x[int(ball_x), int(ball_dx) + MAX_BALL_SPEED],
+                                      _frames_bordo(ball_y, ball_dy, bordi_y, len(bordi_y)))
+                cambio = min(tabella_paddle[action1, player1_y // PADDLE_SPEED],
+                             tabella_paddle[action2, player2_y // PADDLE_SPEED], orizzonte_palla)
+
+                # Paddle e azioni uguali a due decisioni fa, senza fisica né cambi di bin della palla nel mezzo:
+                # i paddle oscillano con periodo fisso finché la palla resta negli stessi bin, si saltano i
+                # periodi interi
+                stato = ((player1_y * (LIMITE_PADDLE + 1) + player2_y) * N_ACTIONS + action1) * N_ACTIONS + action2
+                if stato == stato_prec2 and ultima_fisica <= frame_prec2 and palla_prec2 > frames:
+                    periodo = frames - frame_prec2
+                    periodi = min(orizzonte_palla // periodo, (fisica - 1) // periodo)
+                    if periodi > 0:
+                        ball_x += periodi * periodo * ball_dx
+                        ball_y += periodi * periodo * ball_dy
+                        frames += periodi * periodo
+                        stato_prec1 = stato_prec2 = -1
+                        continue
+                stato_prec2, frame_prec2, palla_prec2 = stato_prec1, frame_prec1, palla_prec1
+                stato_prec1, frame_prec1, palla_prec1 = stato, frames, frames + orizzonte_palla
+
+                if cambio > prima:
+                    decisione = prima + (cambio - prima + frame_skip - 1) // frame_skip * frame_skip
+
+            # Moto lineare fino all'evento (escluso il frame di fisica)
+            salto = decisione if decisione < fisica else fisica - 1
+            if salto > 0:
+                player1_y = _sposta_paddle(player1_y, velocita1, salto)
+                player2_y = _sposta_paddle(player2_y, velocita2, salto)
+                ball_x += salto * ball_dx
+                ball_y += salto * ball_dy
+                frames += salto
+                fase = (fase + salto) % frame_skip
+            if decisione < fisica:
+                continue
+
+            # Un frame di fisica completo (come _episodi)
+            if action1 == 1 and player1_y > 0:
+                player1_y -= PADDLE_SPEED
+            if action1 == 2 and player1_y < LIMITE_PADDLE:
+                player1_y += PADDLE_SPEED
+            if action2 == 1 and player2_y > 0:
+                player2_y -= PADDLE_SPEED
+            if action2 == 2 and player2_y < LIMITE_PADDLE:
+                player2_y += PADDLE_SPEED
+
+            ball_x += ball_dx
+            ball_y += ball_dy
+            if ball_y <= 0 or ball_y >= LIMITE_PARETE:
+                ball_dy = -ball_dy
+
+            if _overlap(ball_x, ball_y, 0, player1_y):
+                ball_dx = -ball_dx
+                ball_x = float(PADDLE_WIDTH)
+                touches += 1
+                paddle1_touched = True
+                if touches % 3 == 0:
+                    ball_dx, ball_dy = _accelera(ball_dx, ball_dy)
+                impact_point = (ball_y - player1_y) / PADDLE_HEIGHT
+                ball_dy = (impact_point - 0.5) * 2 * abs(ball_dx)
+                if impact_point < 0.15 or impact_point > 0.85:
+                    total_reward1 += 2
+                else:
+                    total_reward1 += 1
+
+            if _overlap(ball_x, ball_y, SCREEN_WIDTH - PADDLE_WIDTH, player2_y):
+                ball_dx = -ball_dx
+                ball_x = float(SCREEN_WIDTH - PADDLE_WIDTH - BALL_SIZE)
+                touches += 1
+                paddle2_touched = True
+                if touches % 3 == 0:
+                    ball_dx, ball_dy = _accelera(ball_dx, ball_dy)
+                impact_point = (ball_y - player2_y) / PADDLE_HEIGHT
+                ball_dy = (impact_point - 0.5) * 2 * abs(ball_dx)
+                if impact_point < 0.15 or impact_point > 0.85:
+                    total_reward2 += 2
+                else:
+                    total_reward2 += 1
+
+            if ball_x < 0:
+                total_reward1 -= 5
+                if paddle2_touched:
+                    total_reward2 += 1
+                done = True
+            elif ball_x > SCREEN_WIDTH:
+                total_reward2 -= 5
+                if paddle1_touched:
+                    total_reward1 += 1
+                done = True
+
+            frames += 1
+            if max_steps > 0 and frames >= max_steps and not done:
+                done = True
+                troncato = True
+            ultima_fisica = frames
+            if done:
+                break
+            fase = (fase + 1) % frame_skip
+
+        rewards1[episode] = total_reward1
+        rewards2[episode] = total_reward2
+        touches_out[episode] = touches
+        # Una decisione ogni frame_skip frame (l'ultima può essere interrotta dal done)
+        lengths[episode] = (frames + frame_skip - 1) // frame_skip
+        truncated_out[episode] = troncato
+        eventi_out[episode] = eventi
+
+
+def velocita_iniziali(episodes, rng):
+    """
+    Velocità iniziali della palla con la stessa distribuzione di PongCore.reset.
+    :param rng: numpy.random.Generator
+    :return: (ball_dx, ball_dy), array (episodes,)
+    """
+    segni = rng.choice(np.array([-1, 1]), (2, episodes))
+    moduli = rng.integers(2, 4, (2, episodes))
+    return segni[0] * moduli[0], segni[1] * moduli[1]
+
+
+def esegui_episodi_eventi(q_table_player1, q_table_player2, discretizer, episodes=None, max_steps=None,
+                          frame_skip=1, seed_eventi=None, velocita=None, conta_eventi=False):
+    """
+    Esegue episodi greedy con la simulazione a eventi (stessi risultati di esegui_episodi con training=False).
+    :param q_table_player1: Array (n_stati, n_azioni) del Player 1
+    :param q_table_player2: Array (n_stati, n_azioni) del Player 2
+    :param discretizer: Discretizer con cui sono indicizzate le Q-Table
+    :param episodes: Numero di episodi (se velocita non è indicato)
+    :param max_steps: Se indicato, numero massimo di frame per episodio
+    :param frame_skip: Frame di fisica per ogni decisione
+    :param seed_eventi: Seed del generatore delle velocità iniziali
+    :param velocita: Velocità iniziali (ball_dx, ball_dy) per episodio (default: estratte come in PongCore.reset)
+    :param conta_eventi: Se True restituisce anche il numero di eventi simulati per episodio
+    :return: Ricompense P1, ricompense P2, tocchi, passi (decisioni) e troncamenti per episodio
+             (più gli eventi se conta_eventi)
+    """
+    if velocita is None:
+        velocita = velocita_iniziali(episodes, np.random.default_rng(seed_eventi))
+    velocita_x, velocita_y = (np.asarray(v, dtype=np.float64) for v in velocita)
+    episodes = len(velocita_x)
+
+    chiave = tuple(b.tobytes() for b in discretizer.bins)
+    if chiave not in _cache:
+        bordi = np.full((len(discretizer.bins), max(len(b) for b in discretizer.bins)), np.inf)
+        n_bordi = np.zeros(len(discretizer.bins), dtype=np.int64)
+        for d, b in enumerate(discretizer.bins):
+            bordi[d, :len(b)] = b
+            n_bordi[d] = len(b)
+        _cache[chiave] = (_tabella_paddle(bordi, n_bordi), _tabella_x(bordi, n_bordi), discretizer.bins[3])
+
+    rewards1 = np.zeros(episodes, dtype=np.int64)
+    rewards2 = np.zeros(episodes, dtype=np.int64)
+    touches = np.zeros(episodes, dtype=np.int64)
+    lengths = np.zeros(episodes, dtype=np.int64)
+    truncated = np.zeros(episodes, dtype=np.bool_)
+    eventi = np.zeros(episodes, dtype=np.int64)
+
+    _episodi_eventi(np.asarray(q_table_player1).reshape(-1, N_ACTIONS),
+                    np.asarray(q_table_player2).reshape(-1, N_ACTIONS), velocita_x, velocita_y,
+                    int(max_steps or 0), int(frame_skip), *tabelle_discretizer(discretizer), *_cache[chiave],
+                    rewards1, rewards2, touches, lengths, truncated, eventi)
+    if conta_eventi:
+        return rewards1, rewards2, touches, lengths, truncated, eventi
+    return rewards1, rewards2, touches, lengths, truncated
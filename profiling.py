@@ -0,0 +1,156 @@
+"""
+Strumentazione opzionale dell'addestramento: tempi per fase, passi/s, episodi/s e lunghezza media degli episodi.
+
+Il Profiler si attiva passando profile a modello (o assegnandolo a env.profiler). Quando è disattivo
+il loop e PongCore.step controllano solo che il profiler sia None, senza altre chiamate.
+Le fasi con nome "step/..." sono sotto-fasi di env.step; le altre sono fasi del loop di modello.
+
+Le metriche vengono esportate periodicamente:
+    - come righe JSON aggiunte al file (formato "jsonl", default)
+    - come file di testo in formato Prometheus, sovrascritto ogni volta (formato "prometheus", estensione .prom)
+"""
+import json
+import os
+import time
+
+FORMATI = ("jsonl", "prometheus")
+
+
+class Profiler:
+    """
+    Contatori e timer a bassa latenza (time.perf_counter_ns) per le fasi di addestramento e test.
+    Uso tipico:
+        t = profiler.inizio()
+        ...fase...
+        t = profiler.misura("fase", t)
+    """
+    def __init__(self, path=None, formato=None, ogni_secondi=10.0):
+        """
+        :param path: File in cui esportare le metriche (None per il solo report finale)
+        :param formato: "jsonl" o "prometheus" (default: dedotto dall'estensione, .prom per Prometheus)
+        :param ogni_secondi: Intervallo tra due esportazioni
+        """
+        if formato is None:
+            formato = "prometheus" if path is not None and path.endswith(".prom") else "jsonl"
+        if formato not in FORMATI:
+            raise ValueError(f"Formato {formato} non supportato ({', '.join(FORMATI)})")
+
+        self.path = path
+        self.formato = formato
+        self.ogni_secondi = ogni_secondi
+
+        self.tempi = {}
+        self.chiamate = {}
+        self.passi = 0
+        self.episodi = 0
+
+        self.inizio_run = time.perf_counter_ns()
+        self.ultima_esportazione = time.monotonic()
+
+    def inizio(self):
+        """
+        :return: Istante corrente in nanosecondi, da passare a misura
+        """
+        return time.perf_counter_ns()
+
+    def misura(self, fase, t0):
+        """
+        Aggiunge alla fase il tempo trascorso da t0.
+        :return: Istante corrente, da usare come inizio della fase successiva
+        """
+        adesso = time.perf_counter_ns()
+        try:
+            self.tempi[fase] += adesso - t0
+            self.chiamate[fase] += 1
+        except KeyError:
+            self.tempi[fase] = adesso - t0
+            self.chiamate[fase] = 1
+        return adesso
+
+    def fine_episodio(self, passi):
+        """
+        Registra un episodio di passi passi ed esporta le metriche se è trascorso l'intervallo.
+        """
+        self.episodi += 1
+        self.passi += passi
+        if self.path is not None and time.monotonic() - self.ultima_esportazione >= self.ogni_secondi:
+            self.esporta()
+
+    def metriche(self):
+        """
+        :return: Dizionario con contatori, throughput e tempi per fase
+        """
+        durata = (time.perf_counter_ns() - self.inizio_run) / 1e9
+        return {
+            "timestamp": time.time(),
+            "durata_s": durata,
+            "episodi": self.episodi,
+            "passi": self.passi,
+            "passi_al_secondo": self.passi / durata if durata > 0 else 0.0,
+            "episodi_al_secondo": self.episodi / durata if durata > 0 else 0.0,
+            "lunghezza_media_episodio": self.passi / self.episodi if self.episodi else 0.0,
+            "fasi": {
+                fase: {"secondi": ns / 1e9, "chiamate": self.chiamate[fase],
+                       "ns_per_chiamata": ns / self.chiamate[fase]}
+                for fase, ns in self.tempi.items()
+            },
+        }
+
+    def esporta(self):
+        """
+        Scrive le metriche correnti su file nel formato scelto.
+        """
+        if self.path is None:
+            return
+        metriche = self.metriche()
+
+        if self.formato == "jsonl":
+            with open(self.path, "a") as f:
+                f.write(json.dumps(metriche) + "\n")
+        else:
+            righe = [
+                "# TYPE pong_episodi_total counter", f"pong_episodi_total {metriche['episodi']}",
+                "# TYPE pong_passi_total counter", f"pong_passi_total {metriche['passi']}",
+                "# TYPE pong_passi_al_secondo gauge", f"pong_passi_al_secondo {metriche['passi_al_secondo']:.3f}",
+                "# TYPE pong_episodi_al_secondo gauge", f"pong_episodi_al_secondo {metriche['episodi_al_secondo']:.3f}",
+                "# TYPE pong_lunghezza_media_episodio gauge",
+                f"pong_lunghezza_media_episodio {metriche['lunghezza_media_episodio']:.3f}",
+                "# TYPE pong_fase_secondi_total counter",
+            ]
+            righe += [f'pong_fase_secondi_total{{fase="{fase}"}} {dati["secondi"]:.6f}'
+                      for fase, dati in metriche["fasi"].items()]
+            righe.append("# TYPE pong_fase_chiamate_total counter")
+            righe += [f'pong_fase_chiamate_total{{fase="{fase}"}} {dati["chiamate"]}'
+                      for fase, dati in metriche["fasi"].items()]
+
+            # Sovrascrittura atomica: chi legge il file (es. node_exporter) non vede mai un file parziale
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write("\n".join(righe) + "\n")
+            os.replace(tmp_path, self.path)
+
+        self.ultima_esportazione = time.monotonic()
+
+    def report(self):
+        """
+        Stampa il riepilogo dei tempi per fase ed esporta le metriche finali.
+        """
+        metriche = self.metriche()
+        durata = metriche["durata_s"]
+
+        print("[INFO] Profilazione:")
+        print(f"       {metriche['episodi']} episodi, {metriche['passi']} passi in {durata:.1f} s "
+              f"({metriche['passi_al_secondo']:,.0f} passi/s, {metriche['episodi_al_secondo']:,.1f} episodi/s, "
+              f"lunghezza media {metriche['lunghezza_media_episodio']:.1f})")
+
+        principali = 0.0
+        for fase, dati in sorted(metriche["fasi"].items()):
+            if "/" not in fase:
+                principali += dati["secondi"]
+            nome = "  " + fase if "/" in fase else fase
+            print(f"       {nome:<22} {dati['secondi']:>9.2f} s {100 * dati['secondi'] / durata:>6.1f}% "
+                  f"{dati['ns_per_chiamata']:>10,.0f} ns/chiamata")
+        print(f"       {'altro':<22} {durata - principali:>9.2f} s {100 * (durata - principali) / durata:>6.1f}%")
+        print("-----------------------------------------------")
+
+        self.esporta()
@@ -0,0 +1,395 @@
+import numpy as np
+
+
+class QTable:
+    """
+    Q-Table piatta e contigua di forma (n_stati, n_azioni), indicizzata dall'indice del Discretizer.
+    Le operazioni batch lavorano su array di indici; quelle scalari sono usate dal loop di modello.
+    """
+    def __init__(self, values):
+        """
+        :param values: Array (n_stati, n_azioni) oppure Q-Table a 7 dimensioni (bins^6 x azioni);
+                       viene usata la stessa memoria quando possibile
+        """
+        values = np.asarray(values)
+        self.state_shape = values.shape[:-1]
+        self.values = np.ascontiguousarray(values).reshape(-1, values.shape[-1])
+        self.n_states, self.n_actions = self.values.shape
+
+        # Tracciamento dei blocchi di stati modificati (per i checkpoint incrementali), disattivo di default
+        self.dirty = None
+        self.block_states = None
+
+    @classmethod
+    def random(cls, n_states, n_actions, dtype=np.float64, low=-1, high=1):
+        """
+        Crea una Q-Table inizializzata uniformemente in [low, high), come in modello.
+        :param dtype: Tipo dei valori (np.float32 dimezza la memoria)
+        """
+        values = np.random.uniform(low=low, high=high, size=(n_states, n_actions))
+        return cls(values.astype(dtype, copy=False))
+
+    @property
+    def dtype(self):
+        return self.values.dtype
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def as_array(self):
+        """
+        Restituisce la Q-Table nella forma originale (ad esempio bins^6 x azioni) per il salvataggio.
+        """
+        return self.values.reshape(self.state_shape + (self.n_actions,))
+
+    def traccia_modifiche(self, block_states=4096):
+        """
+        Attiva il tracciamento dei blocchi di block_states stati modificati da update/td_update.
+        """
+        self.block_states = block_states
+        self.dirty = np.zeros(-(-self.n_states // block_states), dtype=bool)
+
+    def blocchi_modificati(self):
+        """
+        Restituisce gli indici dei blocchi modificati dall'ultima chiamata e azzera il tracciamento.
+        """
+        blocchi = np.flatnonzero(self.dirty)
+        self.dirty[:] = False
+        return blocchi
+
+    def greedy_action(self, state):
+        """
+        Azione greedy per un singolo stato.
+        """
+        return self.values[state].argmax()
+
+    def update(self, state, action, reward, next_state, alpha, gamma, done=False):
+        """
+        Aggiornamento TD (Q-learning) di una singola transizione, identico a quello di modello.
+        Se done è True la transizione è finale e il target non usa il valore dello stato successivo.
+        """
+        values = self.values
+        max_future_q = 0.0 if done else values[next_state].max()
+        current_q = values[state, action]
+        values[state, action] = current_q + alpha * (reward + gamma * max_future_q - current_q)
+        if self.dirty is not None:
+            self.dirty[state // self.block_states] = True
+
+    def greedy_actions(self, states):
+        """
+        Azioni greedy per un array di stati.
+        :param states: Array (N,) di indici di stato
+        :return: Array (N,) di azioni
+        """
+        return self.values[states].argmax(axis=1)
+
+    def max_values(self, states):
+        """
+        Valore massimo sulle azioni per un array di stati.
+        """
+        return self.values[states].max(axis=1)
+
+    def td_update(self, states, actions, rewards, next_states, alpha, gamma, dones=None):
+        """
+        Aggiornamento TD vettorizzato di un batch di transizioni.
+        Tutti i target sono calcolati sui valori precedenti al batch; se la stessa coppia
+        (stato, azione) compare più volte, si applica una sola volta alpha per l'errore TD medio
+        (sommare gli incrementi calcolati dallo stesso valore equivarrebbe a un alpha k volte più grande).
+        :param states: Array (N,) di indici di stato
+        :param actions: Array (N,) di azioni
+        :param rewards: Array (N,) di ricompense
+        :param next_states: Array (N,) di indici degli stati successivi
+        :param alpha: Learning rate
+        :param gamma: Fattore di sconto
+        :param dones: Array (N,) di booleani: se indicato, le transizioni finali non usano il valore futuro
+        :return: Errori TD (N,)
+        """
+        states = np.asarray(states, dtype=np.int64)
+        actions = np.asarray(actions, dtype=np.int64)
+
+        flat = states * self.n_actions + actions
+        table = self.values.reshape(-1)
+        max_future_q = self.max_values(next_states)
+        if dones is not None:
+            max_future_q[dones] = 0.0
+        td_error = rewards + gamma * max_future_q - table[flat]
+        flat, media = _media_per_indice(flat, td_error)
+        table[flat] += (alpha * media).astype(self.values.dtype, copy=False)
+        if self.dirty is not None:
+            self.dirty[states // self.block_states] = True
+        return td_error
+
+
+def _media_per_indice(flat, td_error):
+    """
+    Raggruppa gli errori TD per indice piatto (stato, azione).
+    :return: Indici distinti ed errore TD medio di ciascuno
+    """
+    unici, inversi, conteggi = np.unique(flat, return_inverse=True, return_counts=True)
+    return unici, np.bincount(inversi, weights=td_error, minlength=len(unici)) / conteggi
+
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+
+
+def _splitmix64(z):
+    """
+    Hash splitmix64 su array uint64 (le moltiplicazioni si riducono modulo 2^64).
+    """
+    z = z + np.uint64(_GOLDEN)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def _splitmix64_int(z):
+    """
+    Versione scalare di _splitmix64 su interi Python.
+    """
+    z = (z + _GOLDEN) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+
+class SparseQTable:
+    """
+    Q-Table sparsa: tabella hash a indirizzamento aperto (probing lineare) sull'indice piatto dello stato,
+    con chiavi e valori in array NumPy. Gli stati mai aggiornati non occupano memoria: il loro valore
+    iniziale è uniforme in [low, high) e deterministico (hash di seed, stato e azione), oppure costante
+    se default è indicato. Espone la stessa interfaccia greedy/update di QTable.
+    """
+    def __init__(self, n_states, n_actions, capacity=1 << 16, dtype=np.float64, default=None, low=-1, high=1,
+                 seed=0, max_load=0.5):
+        self.n_states = n_states
+        self.n_actions = n_actions
+        self.default = default
+        self.low = low
+        self.high = high
+        self.seed = seed
+        self.max_load = max_load
+        self.dirty = None
+
+        capacity = 1 << max(4, (capacity - 1).bit_length())
+        self._alloca(capacity, np.dtype(dtype))
+
+    def _alloca(self, capacity, dtype):
+        self.capacity = capacity
+        self._bits = capacity.bit_length() - 1
+        self._mask = capacity - 1
+        self.keys = np.full(capacity, -1, dtype=np.int64)
+        self.rows = np.zeros((capacity, self.n_actions), dtype=dtype)
+        self.size = 0
+
+    @property
+    def dtype(self):
+        return self.rows.dtype
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + self.rows.nbytes
+
+    @property
+    def visited_states(self):
+        """
+        Numero di stati effettivamente aggiornati (memorizzati nella tabella).
+        """
+        return self.size
+
+    # Valori iniziali
+
+    def default_values(self, states):
+        """
+        Valori iniziali (N, n_azioni) per un array di stati.
+        """
+        states = np.asarray(states, dtype=np.int64)
+        if self.default is not None:
+            return np.full((len(states), self.n_actions), self.default, dtype=self.dtype)
+
+        z = (states.astype(np.uint64)[:, None] * np.uint64(self.n_actions) + np.arange(self.n_actions, dtype=np.uint64)
+             + np.uint64((self.seed * _GOLDEN) & _MASK64))
+        u = (_splitmix64(z) >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+        return (self.low + (self.high - self.low) * u).astype(self.dtype)
+
+    def _default_row(self, state):
+        if self.default is not None:
+            return [self.default] * self.n_actions
+
+        base = (int(state) * self.n_actions + self.seed * _GOLDEN) & _MASK64
+        scala = (self.high - self.low) * 2.0 ** -53
+        return [self.low + scala * (_splitmix64_int(base + a) >> 11) for a in range(self.n_actions)]
+
+    # Tabella hash
+
+    def _hash(self, states):
+        return ((states.astype(np.uint64) * np.uint64(_GOLDEN)) >> np.uint64(64 - self._bits)).astype(np.int64)
+
+    def _find(self, state):
+        """
+        Slot dello stato o -1 se non presente.
+        """
+        state = int(state)
+        keys = self.keys
+        mask = self._mask
+        slot = ((state * _GOLDEN) & _MASK64) >> (64 - self._bits)
+        while True:
+            key = keys.item(slot)
+            if key == state:
+                return slot
+            if key == -1:
+                return -1
+            slot = (slot + 1) & mask
+
+    def _insert(self, state):
+        """
+        Inserisce uno stato non presente con i valori iniziali e ne restituisce lo slot.
+        """
+        if self.size + 1 > self.capacity * self.max_load:
+            self._grow()
+
+        state = int(state)
+        keys = self.keys
+        mask = self._mask
+        slot = ((state * _GOLDEN) & _MASK64) >> (64 - self._bits)
+        while keys.item(slot) != -1:
+            slot = (slot + 1) & mask
+        keys[slot] = state
+        self.rows[slot] = self._default_row(state)
+        self.size += 1
+        return slot
+
+    def _lookup(self, states):
+        """
+        Ricerca vettorizzata: slot di ogni stato o -1 se non presente.
+        """
+        slots = np.full(len(states), -1, dtype=np.int64)
+        h = self._hash(states)
+        pending = np.arange(len(states))
+        while pending.size:
+            key = self.keys[h[pending]]
+            found = key == states[pending]
+            slots[pending[found]] = h[pending[found]]
+            pending = pending[~found & (key != -1)]
+            h[pending] = (h[pending] + 1) & self._mask
+        return slots
+
+    def _insert_batch(self, states):
+        """
+        Inserimento vettorizzato di stati distinti e non presenti.
+        """
+        while self.size + len(states) > self.capacity * self.max_load:
+            self._grow()
+
+        h = self._hash(states)
+        pending = np.arange(len(states))
+        while pending.size:
+            slots = h[pending]
+            liberi = self.keys[slots] == -1
+            # Tra più stati che puntano allo stesso slot libero vince il primo
+            _, primi = np.unique(slots[liberi], return_index=True)
+            vincitori = pending[liberi][primi]
+            self.keys[h[vincitori]] = states[vincitori]
+            self.rows[h[vincitori]] = self.default_values(states[vincitori])
+
+            inseriti = np.zeros(len(states), dtype=bool)
+            inseriti[vincitori] = True
+            pending = pending[~inseriti[pending]]
+            h[pending] = (h[pending] + 1) & self._mask
+        self.size += len(states)
+
+    def _grow(self):
+        occupati = self.keys != -1
+        keys = self.keys[occupati]
+        rows = self.rows[occupati]
+        self._alloca(self.capacity * 2, self.dtype)
+
+        self._insert_batch(keys)
+        self.rows[self._lookup(keys)] = rows
+
+    def _rows(self, states):
+        states = np.asarray(states, dtype=np.int64)
+        slots = self._lookup(states)
+        values = self.rows[np.maximum(slots, 0)]
+        mancanti = slots < 0
+        if mancanti.any():
+            values[mancanti] = self.default_values(states[mancanti])
+        return values
+
+    # Interfaccia comune con QTable
+
+    def greedy_action(self, state):
+        """
+        Azione greedy per un singolo stato.
+        """
+        slot = self._find(state)
+        if slot < 0:
+            row = self._default_row(state)
+            return row.index(max(row))
+        return int(self.rows[slot].argmax())
+
+    def update(self, state, action, reward, next_state, alpha, gamma, done=False):
+        """
+        Aggiornamento TD (Q-learning) di una singola transizione; lo stato viene inserito se necessario.
+        """
+        if done:
+            max_future_q = 0.0
+        else:
+            slot = self._find(next_state)
+            max_future_q = max(self._default_row(next_state)) if slot < 0 else self.rows[slot].max()
+        slot = self._find(state)
+        if slot < 0:
+            slot = self._insert(state)
+        current_q = self.rows[slot, action]
+        self.rows[slot, action] = current_q + alpha * (reward + gamma * max_future_q - current_q)
+
+    def greedy_actions(self, states):
+        """
+        Azioni greedy per un array di stati.
+        """
+        return np.argmax(self._rows(states), axis=1)
+
+    def max_values(self, states):
+        """
+        Valore massimo sulle azioni per un array di stati.
+        """
+        return np.max(self._rows(states), axis=1)
+
+    def td_update(self, states, actions, rewards, next_states, alpha, gamma, dones=None):
+        """
+        Aggiornamento TD vettorizzato, con la stessa semantica di QTable.td_update.
+        :return: Errori TD (N,)
+        """
+        states = np.asarray(states, dtype=np.int64)
+        actions = np.asarray(actions, dtype=np.int64)
+
+        current_q = self._rows(states)[np.arange(len(states)), actions]
+        max_future_q = self.max_values(next_states)
+        if dones is not None:
+            max_future_q[dones] = 0.0
+        td_error = rewards + gamma * max_future_q - current_q
+
+        slots = self._lookup(states)
+        if (slots < 0).any():
+            self._insert_batch(np.unique(states[slots < 0]))
+            slots = self._lookup(states)
+        flat, media = _media_per_indice(slots * self.n_actions + actions, td_error)
+        self.rows[flat // self.n_actions, flat % self.n_actions] += (alpha * media).astype(self.dtype, copy=False)
+        return td_error
+
+    def items(self):
+        """
+        Stati memorizzati e relativi valori.
+        :return: (stati (K,), valori (K, n_azioni))
+        """
+        occupati = self.keys != -1
+        return self.keys[occupati], self.rows[occupati]
+
+    def carica_items(self, states, values):
+        """
+        Inserisce stati e valori (ad esempio letti da file).
+        """
+        states = np.asarray(states, dtype=np.int64)
+        self._insert_batch(states)
+        self.rows[self._lookup(states)] = values
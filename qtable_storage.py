@@ -0,0 +1,240 @@
+"""
+Formato su file delle Q-Table (.npq) al posto di pickle.
+
+Struttura del file:
+    - magic b"PONGQTAB" (8 byte)
+    - lunghezza dell'header JSON (uint32 little endian)
+    - header JSON (versione, forma, bins, azioni, dtype, alpha/gamma/episodi, checksum, offset dei dati)
+    - padding fino a un multiplo di 64 byte
+    - array grezzo in ordine C (n_stati x n_azioni)
+
+I dati possono essere aperti con np.memmap senza copie: più processi di test/demo che leggono
+la stessa tabella condividono le pagine tramite la page cache del sistema operativo.
+
+Le Q-Table sparse (SparseQTable) si salvano invece in un archivio .npqs (npz) con i soli stati
+visitati, i relativi valori e lo stesso header JSON.
+
+Uso da riga di comando per convertire i vecchi .pkl:
+    python qtable_storage.py qTable/p1/p1_120k_alpha0.100_gamma0.990_decayEpisodico.pkl [...]
+"""
+import json
+import os
+import pickle
+import re
+import struct
+import sys
+import zlib
+
+import numpy as np
+
+from qtable import QTable, SparseQTable
+
+MAGIC = b"PONGQTAB"
+VERSIONE = 1
+ESTENSIONE = ".npq"
+ESTENSIONE_SPARSA = ".npqs"
+ALLINEAMENTO = 64
+
+
+def _checksum(values):
+    return format(zlib.crc32(memoryview(np.ascontiguousarray(values)).cast("B")), "08x")
+
+
+def scrivi_header(f, header):
+    """
+    Scrive magic e header JSON, con padding fino all'inizio allineato dei dati.
+    :return: Offset dei dati nel file
+    """
+    # L'offset dipende dalla lunghezza dell'header: si calcola con un segnaposto a lunghezza fissa
+    header = dict(header, data_offset=0)
+    raw = json.dumps(header).encode("utf-8")
+    offset = -(-(len(MAGIC) + 4 + len(raw) + 32) // ALLINEAMENTO) * ALLINEAMENTO
+    header["data_offset"] = offset
+    raw = json.dumps(header).encode("utf-8")
+
+    f.write(MAGIC)
+    f.write(struct.pack("<I", len(raw)))
+    f.write(raw)
+    f.write(b"\0" * (offset - len(MAGIC) - 4 - len(raw)))
+    return offset
+
+
+def leggi_header(path):
+    """
+    Legge l'header di un file .npq senza caricare i dati.
+    :return: Dizionario dell'header
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} non è un file Q-Table {ESTENSIONE}")
+        (lunghezza,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(lunghezza).decode("utf-8"))
+
+    if header["version"] > VERSIONE:
+        raise ValueError(f"Versione {header['version']} del formato non supportata (massima {VERSIONE})")
+    return header
+
+
+def salva_npq(path, q_table, bins=None, **metadata):
+    """
+    Salva una Q-Table nel formato .npq con scrittura atomica (file temporaneo + rename).
+    :param path: Percorso del file
+    :param q_table: QTable o array (bins^6 x azioni)
+    :param bins: Bordi dei bins usati per la discretizzazione (salvati nell'header)
+    :param metadata: Metadati aggiuntivi (es. alpha, gamma, episodes, decay)
+    """
+    if not isinstance(q_table, QTable):
+        q_table = QTable(q_table)
+    values = np.ascontiguousarray(q_table.values)
+
+    header = {
+        "version": VERSIONE,
+        "state_shape": list(q_table.state_shape),
+        "n_states": q_table.n_states,
+        "n_actions": q_table.n_actions,
+        "dtype": values.dtype.str,
+        "bins": [np.asarray(b, dtype=np.float64).tolist() for b in bins] if bins is not None else None,
+        "metadata": metadata,
+        "checksum": _checksum(values),
+    }
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        scrivi_header(f, header)
+        values.tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def carica_npq(path, mmap_mode="r", verifica=False):
+    """
+    Apre una Q-Table .npq.
+    :param path: Percorso del file
+    :param mmap_mode: "r" sola lettura senza copie, "c" copy-on-write (modificabile in memoria),
+                      None per caricare tutto in memoria
+    :param verifica: Se True controlla il checksum (legge l'intero file)
+    :return: (QTable, header)
+    """
+    header = leggi_header(path)
+    dtype = np.dtype(header["dtype"])
+    shape = (header["n_states"], header["n_actions"])
+
+    if mmap_mode is None:
+        with open(path, "rb") as f:
+            f.seek(header["data_offset"])
+            values = np.fromfile(f, dtype=dtype, count=shape[0] * shape[1]).reshape(shape)
+    else:
+        values = np.memmap(path, dtype=dtype, mode=mmap_mode, offset=header["data_offset"], shape=shape)
+
+    if verifica and _checksum(values) != header["checksum"]:
+        raise ValueError(f"Checksum non valido per {path}")
+
+    q_table = QTable(values.reshape(tuple(header["state_shape"]) + (header["n_actions"],)))
+    return q_table, header
+
+
+def salva_sparsa(path, q_table, bins=None, **metadata):
+    """
+    Salva una SparseQTable in un archivio .npqs con scrittura atomica.
+    :param path: Percorso del file
+    :param q_table: SparseQTable
+    :param bins: Bordi dei bins usati per la discretizzazione (salvati nell'header)
+    :param metadata: Metadati aggiuntivi (es. alpha, gamma, episodes, decay)
+    """
+    keys, values = q_table.items()
+
+    header = {
+        "version": VERSIONE,
+        "state_shape": [len(b) for b in bins] if bins is not None else None,
+        "n_states": q_table.n_states,
+        "n_actions": q_table.n_actions,
+        "dtype": values.dtype.str,
+        "default": q_table.default,
+        "low": q_table.low,
+        "high": q_table.high,
+        "seed": q_table.seed,
+        "visited_states": len(keys),
+        "bins": [np.asarray(b, dtype=np.float64).tolist() for b in bins] if bins is not None else None,
+        "metadata": metadata,
+        "checksum": _checksum(values),
+    }
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, header=np.array(json.dumps(header)), keys=keys, values=values)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def carica_sparsa(path, verifica=False):
+    """
+    Carica una SparseQTable da un archivio .npqs.
+    :param path: Percorso del file
+    :param verifica: Se True controlla il checksum dei valori
+    :return: (SparseQTable, header)
+    """
+    with np.load(path) as archivio:
+        header = json.loads(str(archivio["header"]))
+        keys = archivio["keys"]
+        values = archivio["values"]
+
+    if header["version"] > VERSIONE:
+        raise ValueError(f"Versione {header['version']} del formato non supportata (massima {VERSIONE})")
+    if verifica and _checksum(values) != header["checksum"]:
+        raise ValueError(f"Checksum non valido per {path}")
+
+    q_table = SparseQTable(header["n_states"], header["n_actions"], capacity=2 * len(keys) + 1,
+                           dtype=np.dtype(header["dtype"]), default=header["default"], low=header["low"],
+                           high=header["high"], seed=header["seed"])
+    q_table.carica_items(keys, values)
+    return q_table, header
+
+
+def metadati_da_nome(nome):
+    """
+    Ricava episodi, alpha, gamma e decay dal nome dei file generati da modello
+    (es. p1_120k_alpha0.100_gamma0.990_decayEpisodico.pkl).
+    """
+    match = re.search(r"_(\d+)k_alpha([\d.]+)_gamma([\d.]+?)(_decayEpisodico)?(?:_bins\d+)?(?:_skip\d+)?\.(pkl|npqs?)$", os.path.basename(nome))
+    if not match:
+        return {}
+    return {"episodes": int(match.group(1)) * 1000, "alpha": float(match.group(2)), "gamma": float(match.group(3)),
+            "decay": match.group(4) is not None}
+
+
+def converti_pkl(pkl_path, npq_path=None, bins=None):
+    """
+    Converte una Q-Table salvata con pickle nel formato .npq.
+    :param pkl_path: Percorso del file .pkl
+    :param npq_path: Percorso di destinazione (default: stesso nome con estensione .npq)
+    :param bins: Bordi dei bins (default: bins uniformi di modello)
+    :return: Percorso del file creato
+    """
+    from discretizer import crea_bins
+
+    with open(pkl_path, "rb") as f:
+        q_table = pickle.load(f)
+
+    if npq_path is None:
+        npq_path = os.path.splitext(pkl_path)[0] + ESTENSIONE
+    if bins is None:
+        bins = crea_bins(q_table.shape[0])
+
+    salva_npq(npq_path, q_table, bins, **metadati_da_nome(pkl_path))
+
+    # Verifica che il contenuto sia identico
+    convertita, _ = carica_npq(npq_path, verifica=True)
+    if not np.array_equal(convertita.as_array(), q_table):
+        raise ValueError(f"Conversione di {pkl_path} non riuscita")
+    return npq_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python qtable_storage.py file1.pkl [file2.pkl ...]")
+        sys.exit(1)
+
+    for pkl_path in sys.argv[1:]:
+        print(f"[INFO] {pkl_path} convertita in {converti_pkl(pkl_path)}")
@@ -0,0 +1,264 @@
+"""
+Grafica di Pong disaccoppiata dalla simulazione.
+
+Disegnatore disegna uno stato (istantanea) su una superficie Pygame con uno sfondo statico prerenderizzato
+(colore e linea centrale) e i testi in cache, ridisegnati solo quando cambiano punteggio o tocchi.
+
+RendererAsincrono apre la finestra in un processo separato: la simulazione pubblica a ogni passo un'istantanea
+in un piccolo buffer condiviso protetto da un seqlock (nessun lock: chi scrive incrementa un contatore prima e
+dopo la scrittura, chi legge riprova se il contatore è dispari o è cambiato durante la copia) e prosegue senza
+attendere. Il processo del renderer mostra l'ultima istantanea al ritmo di fps, gestisce gli eventi della
+finestra e riproduce i suoni quando aumentano i contatori di colpi e punti. PongEnv può anche registrare tutte
+le istantanee in un file .npy (salva_registrazione), da rivedere con riproduci.
+
+Esempio:
+    python renderer.py riproduci demo.npy --fps 60
+"""
+import argparse
+import ctypes
+import multiprocessing as mp
+import os
+import time
+
+import numpy as np
+
+from pong_core import BALL_SIZE, PADDLE_HEIGHT, PADDLE_WIDTH, SCREEN_HEIGHT, SCREEN_WIDTH
+
+# Campi di un'istantanea: colpi e punti sono contatori cumulativi, usati per i suoni
+CAMPI = ("player1_y", "player2_y", "ball_x", "ball_y", "score_player1", "score_player2", "touches", "colpi", "punti")
+
+# Buffer condiviso: sequenza del seqlock, stato della finestra, campi dell'istantanea
+_SEQUENZA, _STATO, _DATI = 0, 1, 2
+APERTO, CHIUSO, RICHIESTA_CHIUSURA = 0, 1, 2
+
+SUONI = {"colpo": "envSound/paddleTouch.wav", "punto": "envSound/pointScored.wav"}
+MUSICA = "envSound/PongAI_ost.wav"
+
+
+def istantanea(env, colpi=0, punti=0):
+    """
+    Stato di gioco da disegnare.
+    :param env: Ambiente (PongCore o PongEnv)
+    :param colpi: Colpi dei paddle dall'inizio (per i suoni)
+    :param punti: Punti segnati dall'inizio (per i suoni)
+    :return: Tupla con i valori di CAMPI
+    """
+    return (env.player1_y, env.player2_y, env.ball_x, env.ball_y, env.score_player1, env.score_player2, env.touches,
+            colpi, punti)
+
+
+def carica_audio():
+    """
+    Carica i suoni e avvia la musica di sottofondo in loop (i file mancanti vengono ignorati).
+    :return: Dizionario nome -> pygame.mixer.Sound (vuoto senza dispositivo audio)
+    """
+    import pygame
+
+    if pygame.mixer.get_init() is None:
+        return {}
+    suoni = {nome: pygame.mixer.Sound(path) for nome, path in SUONI.items() if os.path.exists(path)}
+    if os.path.exists(MUSICA):
+        pygame.mixer.music.load(MUSICA)
+        pygame.mixer.music.play(-1)
+    return suoni
+
+
+class Disegnatore:
+    """
+    Disegna le istantanee su una superficie Pygame con sfondo prerenderizzato e font e testi in cache.
+    """
+    def __init__(self, screen):
+        import pygame
+
+        self.screen = screen
+        self.font = pygame.font.SysFont("Arial", 30)
+
+        # Sfondo statico: colore e linea centrale tratteggiata, disegnati una volta sola
+        self.sfondo = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        self.sfondo.fill((30, 30, 30))
+        for y in range(0, SCREEN_HEIGHT, 40):
+            pygame.draw.line(self.sfondo, (100, 100, 100), (SCREEN_WIDTH // 2, y), (SCREEN_WIDTH // 2, y + 20), 2)
+
+        self._testi = {}
+
+    def _testo(self, riga, testo):
+        # Renderizza il testo solo se è cambiato dall'ultima volta
+        if riga not in self._testi or self._testi[riga][0] != testo:
+            self._testi[riga] = (testo, self.font.render(testo, True, (255, 255, 255)))
+        return self._testi[riga][1]
+
+    def disegna(self, stato):
+        """
+        Disegna un'istantanea e aggiorna la finestra.
+        :param stato: Valori di CAMPI (tupla o array)
+        """
+        import pygame
+
+        player1_y, player2_y, ball_x, ball_y, score_player1, score_player2, touches = stato[:7]
+        self.screen.blit(self.sfondo, (0, 0))
+
+        # Paddle e palla
+        pygame.draw.rect(self.screen, (255, 0, 0), (0, player1_y, PADDLE_WIDTH, PADDLE_HEIGHT))
+        pygame.draw.rect(self.screen, (0, 200, 255),
+                         (SCREEN_WIDTH - PADDLE_WIDTH, player2_y, PADDLE_WIDTH, PADDLE_HEIGHT))
+        pygame.draw.ellipse(self.screen, (160, 32, 240), (ball_x, ball_y, BALL_SIZE, BALL_SIZE))
+
+        # Punteggio e tocchi
+        for riga, (testo, y) in enumerate(((f"Player 1: {int(score_player1)}   Player 2: {int(score_player2)}", 20),
+                                           (f"Touches: {int(touches)}", 50))):
+            superficie = self._testo(riga, testo)
+            self.screen.blit(superficie, (SCREEN_WIDTH // 2 - superficie.get_width() // 2, y))
+
+        pygame.display.flip()
+
+
+def _apri_finestra():
+    import pygame
+
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("PongAI")
+    return pygame, screen
+
+
+def _leggi(vista):
+    """
+    Copia coerente dell'ultima istantanea (lato lettore del seqlock).
+    :return: (sequenza, array dei campi)
+    """
+    while True:
+        inizio = vista[_SEQUENZA]
+        if inizio % 2 == 0:
+            dati = vista[_DATI:].copy()
+            if vista[_SEQUENZA] == inizio:
+                return inizio, dati
+        time.sleep(0)
+
+
+def _processo_renderer(buffer, fps, audio):
+    """
+    Processo del renderer: mostra l'ultima istantanea pubblicata fino alla chiusura della finestra o a una
+    richiesta di chiusura.
+    """
+    vista = np.frombuffer(buffer, dtype=np.float64)
+    pygame, screen = _apri_finestra()
+    disegnatore = Disegnatore(screen)
+    suoni = carica_audio() if audio else {}
+    clock = pygame.time.Clock()
+
+    ultima, colpi, punti = -1, 0, 0
+    while vista[_STATO] == APERTO:
+        if any(event.type == pygame.QUIT for event in pygame.event.get()):
+            vista[_STATO] = CHIUSO
+            break
+
+        sequenza, stato = _leggi(vista)
+        if sequenza != ultima and sequenza > 0:
+            ultima = sequenza
+            disegnatore.disegna(stato)
+            if stato[-2] > colpi and "colpo" in suoni:
+                suoni["colpo"].play()
+            if stato[-1] > punti and "punto" in suoni:
+                suoni["punto"].play()
+            colpi, punti = stato[-2], stato[-1]
+        clock.tick(fps)
+    pygame.quit()
+
+
+def salva_registrazione(path, frames):
+    """
+    Salva le istantanee registrate.
+    :param path: File .npy
+    :param frames: Lista di istantanee
+    :return: Percorso del file
+    """
+    np.save(path, np.array(frames, dtype=np.float64).reshape(-1, len(CAMPI)))
+    print(f"[INFO] Registrate {len(frames)} istantanee in {path}")
+    return path
+
+
+class RendererAsincrono:
+    """
+    Finestra di gioco in un processo separato che mostra l'ultima istantanea pubblicata.
+    La simulazione non attende mai il renderer: le istantanee pubblicate tra due frame vengono saltate.
+    """
+    def __init__(self, fps=120, audio=True):
+        """
+        :param fps: Frame al secondo della finestra
+        :param audio: Se False nessun suono né musica
+        """
+        # spawn: Pygame viene inizializzato solo nel processo del renderer
+        ctx = mp.get_context("spawn")
+        self._buffer = ctx.RawArray(ctypes.c_double, _DATI + len(CAMPI))
+        self._vista = np.frombuffer(self._buffer, dtype=np.float64)
+        self._processo = ctx.Process(target=_processo_renderer, args=(self._buffer, fps, audio), daemon=True)
+        self._processo.start()
+
+    def pubblica(self, stato):
+        """
+        Pubblica un'istantanea (lato scrittore del seqlock), senza attendere il renderer.
+        :param stato: Valori di CAMPI
+        """
+        vista = self._vista
+        vista[_SEQUENZA] += 1
+        vista[_DATI:] = stato
+        vista[_SEQUENZA] += 1
+
+    @property
+    def chiuso(self):
+        """
+        True se la finestra è stata chiusa dall'utente (o il processo del renderer è terminato).
+        """
+        return self._vista[_STATO] == CHIUSO or not self._processo.is_alive()
+
+    def chiudi(self):
+        """
+        Chiude la finestra e attende la fine del processo del renderer.
+        """
+        if self._vista[_STATO] == APERTO:
+            self._vista[_STATO] = RICHIESTA_CHIUSURA
+        self._processo.join(timeout=5)
+        if self._processo.is_alive():
+            self._processo.terminate()
+
+
+def riproduci(path, fps=120, audio=True):
+    """
+    Riproduce una registrazione di PongEnv a fps frame al secondo (chiudendo la finestra si interrompe).
+    :param path: File .npy con un'istantanea per riga
+    :param fps: Frame al secondo
+    :param audio: Se False nessun suono né musica
+    """
+    frames = np.load(path)
+    pygame, screen = _apri_finestra()
+    disegnatore = Disegnatore(screen)
+    suoni = carica_audio() if audio else {}
+    clock = pygame.time.Clock()
+
+    precedente = None
+    for stato in frames:
+        if any(event.type == pygame.QUIT for event in pygame.event.get()):
+            break
+        disegnatore.disegna(stato)
+        if precedente is not None:
+            if stato[-2] > precedente[-2] and "colpo" in suoni:
+                suoni["colpo"].play()
+            if stato[-1] > precedente[-1] and "punto" in suoni:
+                suoni["punto"].play()
+        precedente = stato
+        clock.tick(fps)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grafica di Pong disaccoppiata dalla simulazione")
+    comandi = parser.add_subparsers(dest="comando", required=True)
+
+    riproduzione = comandi.add_parser("riproduci", help="Riproduce una registrazione .npy di PongEnv")
+    riproduzione.add_argument("registrazione", help="File .npy")
+    riproduzione.add_argument("--fps", type=int, default=120, help="Frame al secondo")
+    riproduzione.add_argument("--muto", action="store_true", help="Nessun suono né musica")
+    args = parser.parse_args()
+
+    if args.comando == "riproduci":
+        riproduci(args.registrazione, args.fps, not args.muto)
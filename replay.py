@@ -0,0 +1,70 @@
+import numpy as np
+
+
+class ReplayBuffer:
+    """
+    Memoria di replay circolare per l'apprendimento tabellare: le transizioni (stato, azione, ricompensa,
+    stato successivo, done) sono scritte in array NumPy preallocati, senza allocazioni per transizione.
+    Gli stati sono indici piatti del Discretizer; i mini-batch campionati uniformemente vengono applicati
+    con l'aggiornamento TD vettorizzato di QTable/SparseQTable.
+    """
+    def __init__(self, capacity, n_states, seed=None):
+        """
+        :param capacity: Numero massimo di transizioni (le più vecchie vengono sovrascritte)
+        :param n_states: Numero di stati discretizzati (per scegliere il tipo degli indici)
+        :param seed: Seed del generatore usato per il campionamento
+        """
+        stato_dtype = np.int32 if n_states < 2 ** 31 else np.int64
+        self.capacity = capacity
+        self.states = np.zeros(capacity, dtype=stato_dtype)
+        self.actions = np.zeros(capacity, dtype=np.uint8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros(capacity, dtype=stato_dtype)
+        self.dones = np.zeros(capacity, dtype=bool)
+
+        self.pos = 0
+        self.n = 0
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def nbytes(self):
+        return (self.states.nbytes + self.actions.nbytes + self.rewards.nbytes + self.next_states.nbytes
+                + self.dones.nbytes)
+
+    def aggiungi(self, state, action, reward, next_state, done):
+        """
+        Registra una transizione, sovrascrivendo la più vecchia se la memoria è piena.
+        """
+        pos = self.pos
+        self.states[pos] = state
+        self.actions[pos] = action
+        self.rewards[pos] = reward
+        self.next_states[pos] = next_state
+        self.dones[pos] = done
+
+        pos += 1
+        self.pos = 0 if pos == self.capacity else pos
+        if self.n < self.capacity:
+            self.n += 1
+
+    def campiona(self, batch_size):
+        """
+        Campiona uniformemente (con ripetizione) un mini-batch di transizioni.
+        :return: (stati, azioni, ricompense, stati successivi, done), array (batch_size,)
+        """
+        # Più veloce di rng.integers per batch piccoli
+        indici = (self.rng.random(batch_size) * self.n).astype(np.int64)
+        return (self.states[indici], self.actions[indici], self.rewards[indici], self.next_states[indici],
+                self.dones[indici])
+
+    def aggiorna(self, q_table, batch_size, alpha, gamma):
+        """
+        Campiona un mini-batch e lo applica alla Q-Table con un aggiornamento TD vettorizzato.
+        :param q_table: QTable o SparseQTable
+        :return: Errori TD del batch
+        """
+        states, actions, rewards, next_states, dones = self.campiona(batch_size)
+        return q_table.td_update(states, actions, rewards, next_states, alpha, gamma, dones=dones)
@@ -0,0 +1,241 @@
+"""
+Sweep degli iperparametri: griglia o ricerca casuale su alpha, gamma, decay di epsilon, discrete_bins ed episodi.
+
+Ogni configurazione è un job (addestramento + test con modello) eseguito in un pool di processi con un seed
+proprio. Le configurazioni già presenti nella tabella dei risultati vengono saltate; se le Q-Table esistono già
+in qTable/p1 e qTable/p2 si esegue solo il test. L'output di ogni job (comprese le barre di avanzamento) va in
+<output>/log/<job>.log.
+
+Risultati:
+    - <output>/risultati.csv: una riga per configurazione (percentuale di vittorie, tocchi e ricompense medie...)
+    - <output>/curve.npz: media mobile delle ricompense di addestramento per job (<job>_p1, <job>_p2)
+
+Esempi:
+    python sweep.py --alpha 0.05 0.1 0.2 --gamma 0.9 0.99 --decay 1 0 --episodes 20000 --test-episodes 5000
+    python sweep.py --random 16 --alpha 0.01 0.5 --gamma 0.8 0.999 --bins 8 10 12 --episodes 50000
+"""
+import argparse
+import contextlib
+import csv
+import itertools
+import multiprocessing as mp
+import os
+import random
+import time
+
+import numpy as np
+
+from parallel_training import worker_seeds
+from valutazione import intervallo_wilson
+
+CAMPI = ["job", "episodes", "alpha", "gamma", "decay", "discrete_bins", "seed", "test_episodes", "win_rate_p1",
+         "win_rate_p1_ci95", "touches_medi", "reward_medio_p1", "reward_medio_p2", "reward_finale_training_p1",
+         "reward_finale_training_p2", "durata_s", "q_table_p1", "q_table_p2"]
+PUNTI_CURVA = 1000
+
+
+def griglia(alpha=(0.1,), gamma=(0.99,), decay=(True,), discrete_bins=(10,), episodes=(120000,)):
+    """
+    Tutte le combinazioni dei valori indicati.
+    :return: Lista di configurazioni (dizionari)
+    """
+    return [{"alpha": a, "gamma": g, "decay": d, "discrete_bins": b, "episodes": e}
+            for a, g, d, b, e in itertools.product(alpha, gamma, decay, discrete_bins, episodes)]
+
+
+def ricerca_casuale(n, alpha=(0.01, 0.5), gamma=(0.8, 0.999), decay=(True, False), discrete_bins=(10,),
+                    episodes=(120000,), seed=0):
+    """
+    n configurazioni casuali: alpha log-uniforme e gamma uniforme negli intervalli indicati,
+    decay, discrete_bins ed episodes scelti tra i valori indicati.
+    Alpha e gamma sono arrotondati a 3 decimali, come nei nomi dei file delle Q-Table.
+    :return: Lista di configurazioni (dizionari)
+    """
+    rng = random.Random(seed)
+    configurazioni = []
+    for _ in range(n):
+        configurazioni.append({
+            "alpha": round(10 ** rng.uniform(np.log10(alpha[0]), np.log10(alpha[1])), 3),
+            "gamma": round(rng.uniform(gamma[0], gamma[1]), 3),
+            "decay": rng.choice(decay),
+            "discrete_bins": rng.choice(discrete_bins),
+            "episodes": rng.choice(episodes),
+        })
+    return configurazioni
+
+
+def nome_job(config):
+    nome = f"{config['episodes'] // 1000}k_alpha{config['alpha']:.3f}_gamma{config['gamma']:.3f}"
+    if config["decay"]:
+        nome += "_decayEpisodico"
+    if config["discrete_bins"] != 10:
+        nome += f"_bins{config['discrete_bins']}"
+    return nome
+
+
+def esegui_job(argomenti):
+    """
+    Addestra e testa una configurazione (eseguito nei processi del pool).
+    :return: (riga della tabella dei risultati, curve delle ricompense di addestramento o None)
+    """
+    config, seeds, test_episodes, sparse, output = argomenti
+    from pongAI import modello, nomi_q_tables
+    from grafici_utils import moving_average, sottocampiona
+
+    job = nome_job(config)
+    # Generatori dedicati di modello (ambiente, esplorazione e Q-Table iniziali): niente stato globale condiviso
+    seed_training, seed_test = seeds
+    start = time.perf_counter()
+
+    with open(os.path.join(output, "log", f"{job}.log"), "w") as log, contextlib.redirect_stdout(log), \
+            contextlib.redirect_stderr(log):
+        nomi = nomi_q_tables(config["episodes"], config["alpha"], config["gamma"], config["decay"],
+                             config["discrete_bins"], sparse)
+        curve = None
+        if all(os.path.exists(f"qTable/p{i + 1}/{nome}") for i, nome in enumerate(nomi)):
+            print(f"[INFO] Q-Table già presenti ({nomi[0]}, {nomi[1]}): solo test.")
+            reward_finale = (float("nan"), float("nan"))
+        else:
+            *nomi, training = modello(config["episodes"], True, config["alpha"], config["gamma"], "nulla", "nulla",
+                                      False, config["decay"], discrete_bins=config["discrete_bins"], sparse=sparse,
+                                      plots=False, return_metrics=True, seed=seed_training)
+            coda = max(1, len(training) // 10)
+            reward_finale = (float(training.rewards_player1[-coda:].mean()),
+                             float(training.rewards_player2[-coda:].mean()))
+            finestra = min(200, max(1, len(training)))
+            curve = {f"{job}_p1": sottocampiona(moving_average(training.rewards_player1, finestra), PUNTI_CURVA)[1],
+                     f"{job}_p2": sottocampiona(moving_average(training.rewards_player2, finestra), PUNTI_CURVA)[1]}
+
+        test = modello(test_episodes, False, config["alpha"], config["gamma"], nomi[0], nomi[1], False,
+                       config["decay"], discrete_bins=config["discrete_bins"], sparse=sparse, plots=False,
+                       seed=seed_test)
+
+    n = len(test)
+    minimo, massimo = intervallo_wilson(test.wins_p1, n)
+    riga = {
+        "job": job,
+        **config,
+        "seed": seed_training,
+        "test_episodes": n,
+        "win_rate_p1": test.wins_p1 / n if n else float("nan"),
+        "win_rate_p1_ci95": f"{minimo:.4f}-{massimo:.4f}",
+        "touches_medi": float(test.touches.mean()) if n else float("nan"),
+        "reward_medio_p1": float(test.rewards_player1.mean()) if n else float("nan"),
+        "reward_medio_p2": float(test.rewards_player2.mean()) if n else float("nan"),
+        "reward_finale_training_p1": reward_finale[0],
+        "reward_finale_training_p2": reward_finale[1],
+        "durata_s": round(time.perf_counter() - start, 1),
+        "q_table_p1": nomi[0],
+        "q_table_p2": nomi[1],
+    }
+    return riga, curve
+
+
+def leggi_risultati(path):
+    """
+    Legge la tabella dei risultati di uno sweep precedente.
+    :return: Dizionario job -> riga
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, newline="") as f:
+        return {riga["job"]: riga for riga in csv.DictReader(f)}
+
+
+def sweep(configurazioni, test_episodes=20000, n_workers=None, seed=0, sparse=False, output="sweep"):
+    """
+    Esegue le configurazioni in un pool di processi e aggiorna la tabella dei risultati man mano.
+    :param configurazioni: Lista di configurazioni (da griglia o ricerca_casuale)
+    :param test_episodes: Episodi di test per ogni configurazione
+    :param n_workers: Numero di processi (default: numero di core)
+    :param seed: Seed da cui derivare i seed dei job
+    :param sparse: Se True usa Q-Table sparse (consigliato con molti bins)
+    :param output: Cartella dei risultati
+    :return: Righe della tabella dei risultati
+    """
+    os.makedirs(os.path.join(output, "log"), exist_ok=True)
+    os.makedirs("qTable/p1", exist_ok=True)
+    os.makedirs("qTable/p2", exist_ok=True)
+    path_risultati = os.path.join(output, "risultati.csv")
+    path_curve = os.path.join(output, "curve.npz")
+
+    risultati = leggi_risultati(path_risultati)
+    curve = dict(np.load(path_curve)) if os.path.exists(path_curve) else {}
+
+    # Il seed di un job dipende solo dalla sua posizione nell'elenco delle configurazioni
+    seeds = worker_seeds(seed, len(configurazioni))
+    # Configurazioni ripetute (frequenti con ricerca_casuale) scriverebbero in parallelo le stesse Q-Table e lo
+    # stesso log: ogni job viene eseguito una volta sola, con il seed della prima occorrenza
+    jobs = []
+    nomi = set()
+    for i, config in enumerate(configurazioni):
+        nome = nome_job(config)
+        if nome in risultati:
+            print(f"[INFO] {nome} già presente in {path_risultati}, saltato.")
+        elif nome in nomi:
+            print(f"[INFO] {nome} ripetuto nelle configurazioni, eseguito una volta sola.")
+        else:
+            nomi.add(nome)
+            jobs.append((config, seeds[i], test_episodes, sparse, output))
+
+    # I job più lunghi per primi, per bilanciare il carico sui processi
+    jobs.sort(key=lambda job: -job[0]["episodes"] * job[0]["discrete_bins"])
+
+    n_workers = min(n_workers or mp.cpu_count(), max(1, len(jobs)))
+    print(f"[INFO] Sweep di {len(jobs)} configurazioni su {n_workers} processi...")
+    print("-----------------------------------------------")
+
+    ctx = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else "spawn")
+    with ctx.Pool(n_workers) as pool:
+        for riga, curva in pool.imap_unordered(esegui_job, jobs):
+            risultati[riga["job"]] = riga
+            if curva is not None:
+                curve.update(curva)
+            scrivi_risultati(path_risultati, risultati.values())
+            np.savez(path_curve, **curve)
+            print(f"[INFO] {riga['job']}: vittorie P1 {float(riga['win_rate_p1']):.1%} "
+                  f"(IC 95% {riga['win_rate_p1_ci95']}), tocchi medi {float(riga['touches_medi']):.2f}, "
+                  f"{riga['durata_s']} s")
+
+    print("-----------------------------------------------")
+    print(f"[INFO] Risultati salvati in {path_risultati} e {path_curve}")
+    return list(risultati.values())
+
+
+def scrivi_risultati(path, righe):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CAMPI)
+        writer.writeheader()
+        writer.writerows(sorted(righe, key=lambda riga: riga["job"]))
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep degli iperparametri di modello")
+    parser.add_argument("--alpha", type=float, nargs="+", default=[0.1],
+                        help="Valori di alpha (con --random: minimo e massimo)")
+    parser.add_argument("--gamma", type=float, nargs="+", default=[0.99],
+                        help="Valori di gamma (con --random: minimo e massimo)")
+    parser.add_argument("--decay", type=int, nargs="+", default=[1], choices=[0, 1],
+                        help="Decay di epsilon: 1 basato sugli episodi, 0 fisso a 0.999")
+    parser.add_argument("--bins", type=int, nargs="+", default=[10], help="Valori di discrete_bins")
+    parser.add_argument("--episodes", type=int, nargs="+", default=[120000], help="Episodi di addestramento")
+    parser.add_argument("--test-episodes", type=int, default=20000, help="Episodi di test per configurazione")
+    parser.add_argument("--random", type=int, default=0, help="Numero di configurazioni casuali (0 = griglia)")
+    parser.add_argument("--workers", type=int, default=None, help="Numero di processi (default: core)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed dello sweep")
+    parser.add_argument("--sparse", action="store_true", help="Usa Q-Table sparse")
+    parser.add_argument("--output", default="sweep", help="Cartella dei risultati")
+    args = parser.parse_args()
+
+    decay = [bool(d) for d in args.decay]
+    if args.random:
+        if len(args.alpha) != 2 or len(args.gamma) != 2:
+            parser.error("con --random indicare minimo e massimo di --alpha e --gamma")
+        configurazioni = ricerca_casuale(args.random, tuple(args.alpha), tuple(args.gamma), decay, args.bins,
+                                         args.episodes, args.seed)
+    else:
+        configurazioni = griglia(args.alpha, args.gamma, decay, args.bins, args.episodes)
+
+    sweep(configurazioni, args.test_episodes, args.workers, args.seed, args.sparse, args.output)
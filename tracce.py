@@ -0,0 +1,258 @@
+"""
+Registrazione compatta delle traiettorie e riproduzione degli episodi.
+
+Un Registratore collegato a PongCore/PongEnv (env.registratore) riceve ogni passo e lo salva in un record a
+larghezza fissa di 19 byte (PASSO): osservazione prima del passo in punto fisso int16 (1/SCALA di pixel),
+azioni e ricompense int8, tocchi uint16 e flag. Alla fine di ogni episodio segue un record con l'osservazione
+finale (flag FINALE), così le transizioni di un episodio sono coppie di record consecutivi.
+
+I record vengono accumulati in memoria e scritti a blocchi nei segmenti segmento_NNNNN.bin (RECORD_PER_SEGMENTO
+record ciascuno, letti con np.memmap); indice.bin contiene per ogni episodio completato il primo record, il
+numero di record e il punteggio all'inizio, quindi un episodio si trova in O(1) senza scorrere la traccia.
+header.json descrive il formato e i metadati della sessione.
+
+Esempi:
+    python tracce.py info tracce/demo
+    python tracce.py riproduci tracce/demo 42 --fps 60
+"""
+import argparse
+import itertools
+import json
+import os
+
+import numpy as np
+
+VERSIONE_TRACCIA = 1
+
+# Punto fisso delle osservazioni: 1/32 di pixel (palla e velocità non sono intere dopo i rimbalzi sui paddle)
+SCALA = 32
+
+PASSO = np.dtype([("obs", "<i2", 6), ("azioni", "i1", 2), ("ricompense", "i1", 2), ("touches", "<u2"),
+                  ("flag", "u1")])
+INDICE = np.dtype([("inizio", "<i8"), ("lunghezza", "<i8"), ("score_player1", "<i8"), ("score_player2", "<i8")])
+
+# Flag di un record
+DONE, TRONCATO, FINALE = 1, 2, 4
+
+RECORD_PER_SEGMENTO = 1 << 20
+RECORD_PER_SCRITTURA = 1 << 16
+
+
+def _segmento(path, numero):
+    return os.path.join(path, f"segmento_{numero:05d}.bin")
+
+
+class Registratore:
+    """
+    Registra i passi di un ambiente in una traccia (cartella con segmenti, indice e header).
+    Collegato come env.registratore, viene chiamato da reset (inizio) e da step (passo).
+    """
+    def __init__(self, path, **metadati):
+        """
+        :param path: Cartella della traccia (creata se non esiste, non deve contenere un'altra traccia)
+        :param metadati: Metadati della sessione salvati nell'header (es. frame_skip, q_table_p1)
+        """
+        if os.path.exists(os.path.join(path, "header.json")):
+            raise FileExistsError(f"Traccia già esistente: {path}")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        with open(os.path.join(path, "header.json"), "w") as f:
+            json.dump({"versione": VERSIONE_TRACCIA, "scala": SCALA, "record_per_segmento": RECORD_PER_SEGMENTO,
+                       "passo": PASSO.descr, "indice": INDICE.descr, **metadati}, f, indent=2)
+
+        self.record = 0             # Record già scritti su disco
+        self._righe = []            # Record in attesa di scrittura
+        self._episodi = []          # Episodi completati in attesa di scrittura nell'indice
+        self._obs = None            # Osservazione prima del prossimo passo
+        self._inizio = None         # Primo record e punteggio dell'episodio in corso
+        self._touches = 0
+        self._indice = open(os.path.join(path, "indice.bin"), "ab")
+
+    def inizio(self, env):
+        """
+        Inizio di un episodio (chiamata da reset). Un episodio precedente non concluso viene chiuso come troncato.
+        """
+        if self._inizio is not None:
+            self._fine(TRONCATO)
+        self._obs = env._get_obs()
+        self._touches = env.touches
+        self._inizio = (self.record + len(self._righe), env.score_player1, env.score_player2)
+
+    def passo(self, env, action1, action2, rewards):
+        """
+        Registra un passo (chiamata da step dopo la fisica).
+        """
+        if self._inizio is None:
+            self.inizio(env)
+            return
+        flag = (DONE if env.done else 0) | (TRONCATO if env.truncated else 0)
+        self._righe.append(self._obs + (action1, action2) + tuple(rewards) + (self._touches, flag))
+        self._obs = env._get_obs()
+        self._touches = env.touches
+        if env.done:
+            self._fine(0)
+        elif len(self._righe) >= RECORD_PER_SCRITTURA:
+            self.scrivi()
+
+    def _fine(self, flag):
+        # Record con l'osservazione finale e voce dell'indice
+        self._righe.append(self._obs + (0, 0, 0, 0, self._touches, FINALE | flag))
+        inizio, score1, score2 = self._inizio
+        self._episodi.append((inizio, self.record + len(self._righe) - inizio, score1, score2))
+        self._inizio = None
+        if len(self._righe) >= RECORD_PER_SCRITTURA:
+            self.scrivi()
+
+    def scrivi(self):
+        """
+        Scrive su disco i record in attesa (a blocchi, divisi tra i segmenti) e le voci dell'indice.
+        """
+        if not self._righe:
+            return
+        # fromiter evita la conversione riga per riga di np.array (più lenta con scalari NumPy nelle tuple)
+        righe = np.fromiter(itertools.chain.from_iterable(self._righe), dtype=np.float64,
+                            count=len(self._righe) * 12).reshape(-1, 12)
+        dati = np.empty(len(righe), dtype=PASSO)
+        dati["obs"] = np.rint(righe[:, :6] * SCALA)
+        dati["azioni"] = righe[:, 6:8]
+        dati["ricompense"] = righe[:, 8:10]
+        dati["touches"] = righe[:, 10]
+        dati["flag"] = righe[:, 11]
+
+        scritti = 0
+        while scritti < len(dati):
+            numero, posizione = divmod(self.record, RECORD_PER_SEGMENTO)
+            n = min(len(dati) - scritti, RECORD_PER_SEGMENTO - posizione)
+            with open(_segmento(self.path, numero), "ab") as f:
+                f.write(dati[scritti:scritti + n].tobytes())
+            scritti += n
+            self.record += n
+        self._righe = []
+
+        # L'indice viene scritto dopo i record: una traccia interrotta resta leggibile
+        if self._episodi:
+            self._indice.write(np.array(self._episodi, dtype="<i8").tobytes())
+            self._indice.flush()
+            self._episodi = []
+
+    def chiudi(self):
+        """
+        Chiude l'eventuale episodio in corso (come troncato) e scrive i record rimasti.
+        """
+        if self._inizio is not None:
+            self._fine(TRONCATO)
+        self.scrivi()
+        self._indice.close()
+
+
+class Traccia:
+    """
+    Lettura di una traccia: i segmenti sono mappati in memoria e gli episodi si trovano tramite l'indice.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "header.json")) as f:
+            self.header = json.load(f)
+        if self.header["versione"] > VERSIONE_TRACCIA:
+            raise ValueError(f"Versione della traccia non supportata: {self.header['versione']}")
+        self.scala = self.header["scala"]
+        self.record_per_segmento = self.header["record_per_segmento"]
+        self.indice = np.fromfile(os.path.join(path, "indice.bin"), dtype=INDICE)
+
+        self.segmenti = []
+        while os.path.exists(_segmento(path, len(self.segmenti))):
+            self.segmenti.append(np.memmap(_segmento(path, len(self.segmenti)), dtype=PASSO, mode="r"))
+        self.record = sum(len(segmento) for segmento in self.segmenti)
+
+    def __len__(self):
+        return len(self.indice)
+
+    @property
+    def nbytes(self):
+        return self.record * PASSO.itemsize
+
+    def records(self, inizio, fine):
+        """
+        Record [inizio, fine) della traccia (vista sul segmento, oppure copia se attraversa più segmenti).
+        """
+        primo, ultimo = inizio // self.record_per_segmento, (fine - 1) // self.record_per_segmento
+        if primo == ultimo:
+            base = primo * self.record_per_segmento
+            return self.segmenti[primo][inizio - base:fine - base]
+        return np.concatenate([self.records(max(inizio, n * self.record_per_segmento),
+                                            min(fine, (n + 1) * self.record_per_segmento))
+                               for n in range(primo, ultimo + 1)])
+
+    def episodio(self, numero):
+        """
+        Record di un episodio: i passi seguiti dal record con l'osservazione finale.
+        """
+        voce = self.indice[numero]
+        return self.records(int(voce["inizio"]), int(voce["inizio"] + voce["lunghezza"]))
+
+    def blocchi(self, record_per_blocco=1 << 20):
+        """
+        Scorre i record degli episodi completati a blocchi; ogni blocco ripete come ultimo record il primo del
+        successivo, così ogni record non finale ha nel blocco il record seguente (transizione).
+        :param record_per_blocco: Transizioni candidate per blocco
+        :return: Generatore di array di record (al più record_per_blocco + 1)
+        """
+        fine = int(self.indice["inizio"][-1] + self.indice["lunghezza"][-1]) if len(self) else 0
+        for inizio in range(0, fine - 1, record_per_blocco):
+            yield self.records(inizio, min(inizio + record_per_blocco, fine - 1) + 1)
+
+    def osservazioni(self, records):
+        """
+        Osservazioni dei record in float64 (pixel).
+        """
+        return records["obs"].astype(np.float64) / self.scala
+
+
+def riproduci(path, numero, fps=120):
+    """
+    Riproduce un episodio di una traccia con PongEnv.render, senza simulare: lo stato dell'ambiente viene
+    impostato dai record (chiudendo la finestra si interrompe).
+    :param path: Cartella della traccia
+    :param numero: Numero dell'episodio
+    :param fps: Frame al secondo
+    """
+    from pong import PongEnv
+
+    traccia = Traccia(path)
+    voce = traccia.indice[numero]
+    records = traccia.episodio(numero)
+    print(f"[INFO] Episodio {numero} di {len(traccia)}: {len(records) - 1} passi, "
+          f"ricompense P1 {records['ricompense'][:, 0].sum()}, P2 {records['ricompense'][:, 1].sum()}")
+
+    env = PongEnv(render_mode=True, fps=fps)
+    env.score_player1, env.score_player2 = int(voce["score_player1"]), int(voce["score_player2"])
+    for record, obs in zip(records, traccia.osservazioni(records)):
+        env.player1_y, env.player2_y, env.ball_x, env.ball_y, env.ball_dx, env.ball_dy = obs
+        env.touches = int(record["touches"])
+        env._handle_events()
+        env.render()
+    env.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tracce compatte degli episodi")
+    comandi = parser.add_subparsers(dest="comando", required=True)
+
+    info = comandi.add_parser("info", help="Riepilogo di una traccia")
+    info.add_argument("traccia", help="Cartella della traccia")
+
+    riproduzione = comandi.add_parser("riproduci", help="Riproduce un episodio con PongEnv.render")
+    riproduzione.add_argument("traccia", help="Cartella della traccia")
+    riproduzione.add_argument("episodio", type=int, help="Numero dell'episodio")
+    riproduzione.add_argument("--fps", type=int, default=120, help="Frame al secondo")
+    args = parser.parse_args()
+
+    if args.comando == "info":
+        traccia = Traccia(args.traccia)
+        print(f"[INFO] Traccia {args.traccia}: {len(traccia)} episodi, {traccia.record} record "
+              f"({traccia.nbytes / 2 ** 20:.1f} MB, {PASSO.itemsize} byte per passo)")
+        for chiave, valore in traccia.header.items():
+            if chiave not in ("passo", "indice"):
+                print(f"    {chiave}: {valore}")
+    else:
+        riproduci(args.traccia, args.episodio, args.fps)
@@ -0,0 +1,361 @@
+"""
+Valutazione veloce di coppie di Q-Table addestrate: episodi puramente greedy (epsilon = 0, nessun aggiornamento)
+distribuiti su più processi, senza grafici.
+
+Ogni processo apre le Q-Table una sola volta (i file .npq sono mappati in memoria e condivisi tra i processi)
+e gioca il proprio blocco di episodi con il loop compilato di compiled_training (in Python puro se Numba non è
+installato), oppure con la simulazione a eventi di pong_eventi (--eventi). Le Q-Table sparse (.npqs) sono
+valutate con PongCore e SparseQTable.greedy_action.
+
+Restituisce la percentuale di vittorie con intervallo di confidenza (Wilson, 95%), la distribuzione della
+lunghezza degli scambi (tocchi per episodio), la lunghezza degli episodi in passi e le statistiche delle
+ricompense. Supporta anche tornei round-robin tra tutte le Q-Table salvate in qTable/p1 e qTable/p2.
+
+Esempi:
+    python valutazione.py p1_120k_alpha0.100_gamma0.990.npq p2_120k_alpha0.100_gamma0.990.npq --workers 4
+    python valutazione.py --torneo --episodes 5000 --output torneo.csv
+"""
+import argparse
+import csv
+import multiprocessing as mp
+import os
+import pickle
+import random
+import time
+
+import numpy as np
+
+from compiled_training import esegui_episodi, seed
+from discretizer import Discretizer, crea_bins, process_observation_player1, process_observation_player2
+from parallel_training import worker_seeds
+from pong_core import PongCore
+from pong_eventi import esegui_episodi_eventi
+from qtable import QTable
+from qtable_storage import ESTENSIONE, ESTENSIONE_SPARSA, carica_npq, carica_sparsa
+
+# Q-Table già aperte nel processo corrente, una voce (versione del file, risultato) per path: i tornei riusano le
+# stesse tabelle in molte partite e con fork i processi del pool ereditano quelle aperte dal processo principale
+_cache = {}
+
+
+def intervallo_wilson(vittorie, n, z=1.96):
+    """
+    Intervallo di confidenza di Wilson per una proporzione.
+    :return: (minimo, massimo)
+    """
+    if n == 0:
+        return 0.0, 1.0
+    p = vittorie / n
+    centro = (p + z ** 2 / (2 * n)) / (1 + z ** 2 / n)
+    ampiezza = z * np.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / (1 + z ** 2 / n)
+    return max(0.0, centro - ampiezza), min(1.0, centro + ampiezza)
+
+
+def percorso(player, nome):
+    """
+    Percorso di una Q-Table: nome di un file in qTable/p1 o qTable/p2, oppure percorso esistente.
+    """
+    return nome if os.path.exists(nome) else f"qTable/p{player}/{nome}"
+
+
+def carica_politica(path):
+    """
+    Apre una Q-Table per la valutazione (.npq, .npqs o pickle).
+    :return: (tabella, bins, frame_skip) con tabella array (n_stati, n_azioni) oppure SparseQTable e frame_skip
+             quello usato in addestramento (1 se non salvato)
+    """
+    # Una voce per file: se il file è cambiato (data in ns, dimensione o inode, nuovo a ogni salvataggio atomico)
+    # la voce viene sostituita, così la tabella precedente (e la sua mappa in memoria) viene rilasciata
+    info = os.stat(path)
+    versione = (info.st_mtime_ns, info.st_size, info.st_ino)
+    voce = _cache.get(path)
+    if voce is not None and voce[0] == versione:
+        return voce[1]
+    _cache.pop(path, None)
+
+    if path.endswith(ESTENSIONE_SPARSA):
+        q_table, header = carica_sparsa(path)
+    elif path.endswith(ESTENSIONE):
+        # Copy-on-write: Numba richiede array scrivibili, ma la valutazione non li modifica mai
+        q_table, header = carica_npq(path, mmap_mode="c")
+        q_table = q_table.values
+    else:
+        with open(path, "rb") as f:
+            q_table = pickle.load(f)
+        header = {}
+    bins = header.get("bins")
+    frame_skip = header.get("metadata", {}).get("frame_skip", 1)
+
+    if isinstance(q_table, np.ndarray):
+        if bins is None:
+            bins = crea_bins(q_table.shape[0] if q_table.ndim == 7 else round(q_table.shape[0] ** (1 / 6)))
+        q_table = q_table.reshape(-1, q_table.shape[-1])
+    elif bins is None:
+        bins = crea_bins(round(q_table.n_states ** (1 / 6)))
+
+    risultato = (q_table, [np.asarray(b, dtype=np.float64) for b in bins], frame_skip)
+    _cache[path] = (versione, risultato)
+    return risultato
+
+
+def compatibili(bins1, bins2):
+    """
+    True se le due Q-Table usano la stessa discretizzazione (e quindi possono giocare tra loro).
+    """
+    return len(bins1) == len(bins2) and all(len(a) == len(b) and np.array_equal(a, b) for a, b in zip(bins1, bins2))
+
+
+def _episodi_sparsi(q_player1, q_player2, discretizer, episodes, max_steps=None, frame_skip=1):
+    """
+    Episodi greedy con PongCore per Q-Table sparse.
+    :return: Ricompense P1, ricompense P2, tocchi, passi e troncamenti per episodio
+    """
+    env = PongCore(max_steps, frame_skip)
+    risultati = np.zeros((5, episodes), dtype=np.int64)
+    for episode in range(episodes):
+        obs = env.reset()
+        done = False
+        steps = 0
+        while not done:
+            action1 = q_player1.greedy_action(discretizer.discretize(process_observation_player1(obs)))
+            action2 = q_player2.greedy_action(discretizer.discretize(process_observation_player2(obs)))
+            obs, (reward_player1, reward_player2), done, _ = env.step(action1, action2)
+            risultati[0, episode] += reward_player1
+            risultati[1, episode] += reward_player2
+            steps += 1
+        risultati[2, episode] = env.touches
+        risultati[3, episode] = steps
+        risultati[4, episode] = env.truncated
+    return (*risultati[:4], risultati[4].astype(bool))
+
+
+def _gioca(argomenti):
+    """
+    Gioca un blocco di episodi greedy tra due Q-Table (eseguito nei processi del pool).
+    :return: Ricompense P1, ricompense P2, tocchi, passi e troncamenti per episodio
+    """
+    path_p1, path_p2, episodes, seed_blocco, max_steps, frame_skip, eventi = argomenti
+    q_player1, bins, _ = carica_politica(path_p1)
+    q_player2, _, _ = carica_politica(path_p2)
+    discretizer = Discretizer(bins)
+
+    if isinstance(q_player1, np.ndarray) and isinstance(q_player2, np.ndarray):
+        if eventi:
+            return esegui_episodi_eventi(q_player1, q_player2, discretizer, episodes, max_steps, frame_skip,
+                                         seed_eventi=seed_blocco)
+        seed(seed_blocco)
+        return esegui_episodi(q_player1, q_player2, np.zeros(episodes), 0.0, 0.0, discretizer, training=False,
+                              max_steps=max_steps, frame_skip=frame_skip)
+
+    random.seed(seed_blocco)
+    if isinstance(q_player1, np.ndarray):
+        q_player1 = QTable(q_player1)
+    if isinstance(q_player2, np.ndarray):
+        q_player2 = QTable(q_player2)
+    return _episodi_sparsi(q_player1, q_player2, discretizer, episodes, max_steps, frame_skip)
+
+
+def statistiche(rewards1, rewards2, touches, lengths, truncated=None):
+    """
+    Statistiche di una serie di episodi. In caso di parità la vittoria va al Player 2, come in modello.
+    Gli episodi troncati sono contati a parte e sono esclusi dalle vittorie.
+    :return: Dizionario con vittorie, intervalli di confidenza, ricompense, scambi e lunghezze
+    """
+    if truncated is None:
+        truncated = np.zeros(len(rewards1), dtype=bool)
+    troncati = int(truncated.sum())
+    n = len(rewards1)
+    decisi = n - troncati
+    wins_p1 = int(np.sum((rewards1 > rewards2) & ~truncated))
+    minimo, massimo = intervallo_wilson(wins_p1, decisi)
+
+    def riassunto(valori):
+        if n == 0:
+            return {"media": float("nan"), "std": float("nan"), "min": 0, "max": 0}
+        return {"media": float(valori.mean()), "std": float(valori.std()), "min": int(valori.min()),
+                "max": int(valori.max())}
+
+    def distribuzione(valori):
+        percentili = np.percentile(valori, [50, 90, 99]) if n else [float("nan")] * 3
+        return {**riassunto(valori), "mediana": float(percentili[0]), "p90": float(percentili[1]),
+                "p99": float(percentili[2])}
+
+    return {
+        "episodi": n,
+        "troncati": troncati,
+        "wins_p1": wins_p1,
+        "wins_p2": decisi - wins_p1,
+        "win_rate_p1": wins_p1 / decisi if decisi else float("nan"),
+        "win_rate_p1_ci95": (minimo, massimo),
+        "reward_p1": riassunto(rewards1),
+        "reward_p2": riassunto(rewards2),
+        # Scambi: tocchi per episodio, con l'istogramma completo (indice = numero di tocchi)
+        "scambi": {**distribuzione(touches), "istogramma": np.bincount(touches).tolist() if n else []},
+        "passi": distribuzione(lengths),
+    }
+
+
+def _pool(n_workers):
+    ctx = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else "spawn")
+    return ctx.Pool(n_workers)
+
+
+def valuta(q_table_p1, q_table_p2, episodes=20000, n_workers=None, seed_valutazione=0, max_steps=None,
+           frame_skip=None, eventi=False):
+    """
+    Valuta una coppia di Q-Table con episodi greedy distribuiti su n_workers processi.
+    :param q_table_p1: Nome del file della Q-Table del Player 1 (in qTable/p1) o percorso
+    :param q_table_p2: Nome del file della Q-Table del Player 2 (in qTable/p2) o percorso
+    :param episodes: Numero di episodi
+    :param n_workers: Numero di processi (default: numero di core)
+    :param seed_valutazione: Seed da cui derivare i seed dei blocchi
+    :param max_steps: Se indicato, numero massimo di frame per episodio (gli episodi troncati sono riportati a parte)
+    :param frame_skip: Frame per decisione (default: quello salvato con la Q-Table del Player 1)
+    :param eventi: Se True usa la simulazione a eventi (solo Q-Table dense)
+    :return: Dizionario delle statistiche (vedi statistiche)
+    """
+    path_p1, path_p2 = percorso(1, q_table_p1), percorso(2, q_table_p2)
+    _, bins1, frame_skip1 = carica_politica(path_p1)
+    if not compatibili(bins1, carica_politica(path_p2)[1]):
+        raise ValueError(f"{q_table_p1} e {q_table_p2} usano discretizzazioni diverse")
+    if frame_skip is None:
+        frame_skip = frame_skip1
+
+    n_workers = max(1, min(n_workers or mp.cpu_count(), episodes))
+    blocchi = np.array_split(np.arange(episodes), n_workers)
+    seeds = worker_seeds(seed_valutazione, n_workers)
+    jobs = [(path_p1, path_p2, len(blocco), seeds[i][0], max_steps, frame_skip, eventi)
+            for i, blocco in enumerate(blocchi)]
+
+    if n_workers == 1:
+        risultati = [_gioca(jobs[0])]
+    else:
+        with _pool(n_workers) as pool:
+            risultati = pool.map(_gioca, jobs)
+
+    return statistiche(*(np.concatenate(r) for r in zip(*risultati)))
+
+
+def stampa(risultato, titolo=None):
+    """
+    Stampa il riepilogo di una valutazione.
+    """
+    minimo, massimo = risultato["win_rate_p1_ci95"]
+    if titolo is not None:
+        print(f"[INFO] {titolo}")
+    print(f"[INFO] Episodi: {risultato['episodi']} ({risultato['troncati']} troncati)")
+    print(f"[INFO] Vittorie P1: {risultato['wins_p1']} ({risultato['win_rate_p1']:.2%}, "
+          f"IC 95% {minimo:.2%}-{massimo:.2%}), vittorie P2: {risultato['wins_p2']}")
+    for player in (1, 2):
+        r = risultato[f"reward_p{player}"]
+        print(f"[INFO] Reward P{player}: media {r['media']:.3f}, std {r['std']:.3f}, min {r['min']}, max {r['max']}")
+    for nome, chiave in (("Tocchi per episodio", "scambi"), ("Passi per episodio", "passi")):
+        d = risultato[chiave]
+        print(f"[INFO] {nome}: media {d['media']:.2f}, mediana {d['mediana']:.0f}, p90 {d['p90']:.0f}, "
+              f"p99 {d['p99']:.0f}, max {d['max']}")
+    print("-----------------------------------------------")
+
+
+def torneo(q_tables_p1=None, q_tables_p2=None, episodes=5000, n_workers=None, seed_torneo=0, max_steps=None,
+           frame_skip=None, eventi=False):
+    """
+    Torneo round-robin: ogni Q-Table del Player 1 gioca contro ogni Q-Table del Player 2.
+    Le partite sono distribuite sui processi; le coppie con discretizzazioni diverse vengono saltate (nan).
+    :param q_tables_p1: Nomi dei file del Player 1 (default: tutte le Q-Table in qTable/p1)
+    :param q_tables_p2: Nomi dei file del Player 2 (default: tutte le Q-Table in qTable/p2)
+    :param episodes: Episodi per partita
+    :param n_workers: Numero di processi (default: numero di core)
+    :param seed_torneo: Seed da cui derivare i seed delle partite
+    :param max_steps: Se indicato, numero massimo di frame per episodio
+    :param frame_skip: Frame per decisione (default: quello salvato con la Q-Table del Player 1 di ogni partita)
+    :param eventi: Se True usa la simulazione a eventi (solo Q-Table dense)
+    :return: (nomi P1, nomi P2, matrice (n_p1, n_p2) delle percentuali di vittoria di P1, statistiche per coppia)
+    """
+    # Solo i file di Q-Table: restano fuori i temporanei dei salvataggi atomici e gli altri file
+    estensioni = (ESTENSIONE, ESTENSIONE_SPARSA, ".pkl")
+    if q_tables_p1 is None:
+        q_tables_p1 = sorted(nome for nome in os.listdir("qTable/p1") if nome.endswith(estensioni))
+    if q_tables_p2 is None:
+        q_tables_p2 = sorted(nome for nome in os.listdir("qTable/p2") if nome.endswith(estensioni))
+
+    paths_p1 = [percorso(1, nome) for nome in q_tables_p1]
+    paths_p2 = [percorso(2, nome) for nome in q_tables_p2]
+    seeds = worker_seeds(seed_torneo, len(paths_p1) * len(paths_p2))
+
+    jobs, coppie = [], []
+    for i, path_p1 in enumerate(paths_p1):
+        for j, path_p2 in enumerate(paths_p2):
+            if compatibili(carica_politica(path_p1)[1], carica_politica(path_p2)[1]):
+                jobs.append((path_p1, path_p2, episodes, seeds[i * len(paths_p2) + j][0], max_steps,
+                             frame_skip if frame_skip is not None else carica_politica(path_p1)[2], eventi))
+                coppie.append((i, j))
+
+    print(f"[INFO] Torneo: {len(q_tables_p1)} x {len(q_tables_p2)} Q-Table, {len(jobs)} partite da {episodes} episodi")
+    print("-----------------------------------------------")
+
+    win_rate = np.full((len(paths_p1), len(paths_p2)), np.nan)
+    risultati = {}
+    with _pool(max(1, min(n_workers or mp.cpu_count(), len(jobs)))) as pool:
+        for (i, j), partita in zip(coppie, pool.imap(_gioca, jobs)):
+            risultati[(q_tables_p1[i], q_tables_p2[j])] = statistiche(*partita)
+            win_rate[i, j] = risultati[(q_tables_p1[i], q_tables_p2[j])]["win_rate_p1"]
+
+    return q_tables_p1, q_tables_p2, win_rate, risultati
+
+
+def salva_torneo(path, risultati):
+    """
+    Salva i risultati di un torneo in CSV, una riga per partita.
+    """
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["q_table_p1", "q_table_p2", "episodi", "troncati", "win_rate_p1", "ci95_min", "ci95_max",
+                         "reward_medio_p1", "reward_medio_p2", "tocchi_medi", "tocchi_p90", "passi_medi"])
+        for (nome_p1, nome_p2), r in risultati.items():
+            writer.writerow([nome_p1, nome_p2, r["episodi"], r["troncati"], r["win_rate_p1"], *r["win_rate_p1_ci95"],
+                             r["reward_p1"]["media"], r["reward_p2"]["media"], r["scambi"]["media"],
+                             r["scambi"]["p90"], r["passi"]["media"]])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Valutazione greedy di Q-Table addestrate")
+    parser.add_argument("q_tables", nargs="*", help="Q-Table del Player 1 e del Player 2 (nomi in qTable/p1, "
+                                                    "qTable/p2 o percorsi)")
+    parser.add_argument("--torneo", action="store_true", help="Torneo round-robin tra le Q-Table salvate")
+    parser.add_argument("--episodes", type=int, default=None, help="Episodi (default 20000, 5000 per partita "
+                                                                   "nel torneo)")
+    parser.add_argument("--workers", type=int, default=None, help="Numero di processi (default: core)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed della valutazione")
+    parser.add_argument("--output", default=None, help="CSV dei risultati del torneo")
+    parser.add_argument("--max-steps", type=int, default=None, help="Numero massimo di frame per episodio")
+    parser.add_argument("--frame-skip", type=int, default=None,
+                        help="Frame per decisione (default: quello salvato con le Q-Table)")
+    parser.add_argument("--eventi", action="store_true", help="Simulazione a eventi (Q-Table dense)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.torneo:
+        nomi_p1, nomi_p2, win_rate, risultati = torneo(episodes=args.episodes or 5000, n_workers=args.workers,
+                                                       seed_torneo=args.seed, max_steps=args.max_steps,
+                                                       frame_skip=args.frame_skip, eventi=args.eventi)
+        for (nome_p1, nome_p2), r in risultati.items():
+            minimo, massimo = r["win_rate_p1_ci95"]
+            print(f"[INFO] {nome_p1} vs {nome_p2}: vittorie P1 {r['win_rate_p1']:.2%} "
+                  f"(IC 95% {minimo:.2%}-{massimo:.2%}), tocchi medi {r['scambi']['media']:.2f}")
+        print("-----------------------------------------------")
+        # Classifica dei Player 1 per percentuale media di vittorie sulle partite giocate
+        giocate = ~np.isnan(win_rate)
+        medie = np.where(giocate, win_rate, 0).sum(axis=1) / np.maximum(giocate.sum(axis=1), 1)
+        for i in np.argsort(-medie):
+            if giocate[i].any():
+                print(f"[INFO] P1 {nomi_p1[i]}: {medie[i]:.2%} di vittorie medie ({giocate[i].sum()} partite)")
+        if args.output is not None:
+            salva_torneo(args.output, risultati)
+            print(f"[INFO] Risultati salvati in {args.output}")
+    else:
+        if len(args.q_tables) != 2:
+            parser.error("indicare le Q-Table del Player 1 e del Player 2 (oppure --torneo)")
+        stampa(valuta(args.q_tables[0], args.q_tables[1], args.episodes or 20000, args.workers, args.seed,
+                      args.max_steps, args.frame_skip, args.eventi),
+               f"{args.q_tables[0]} vs {args.q_tables[1]}")
+    print(f"[INFO] Valutazione completata in {time.perf_counter() - start:.1f} s")